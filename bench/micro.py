@@ -0,0 +1,177 @@
+"""Microbenchmarks for the scoring, persistence and dashboard-aggregation hot paths.
+
+    python bench/micro.py                                  # default cohort sizes
+    python bench/micro.py --sizes 100 1000 10000 --save-baseline
+    python bench/micro.py --baseline bench/baseline.json --fail-on-regression
+
+Results are written to bench/results/micro-<timestamp>.json. With a baseline, each case is
+printed with its ratio to the baseline and cases slower than --threshold are flagged.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import db  # noqa: E402
+import synthetic  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+
+def _measure(fn, repeat, setup=None):
+    """Run fn() `repeat` times, each after an untimed setup(); return (median, min) wall seconds."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), min(times)
+
+
+def build_cases(app, size, tmp):
+    """Yield (name, setup, fn); setup() runs untimed before each repeat of fn()."""
+    rows = synthetic.cohort(size)
+    lc_payloads = [synthetic.leetcode_profile(r[0]) for r in rows]
+    cf_payloads = [synthetic.codeforces_profile(r[0]) for r in rows]
+    dbs = {}
+    fresh = itertools.count()
+
+    def use_db(name):
+        db.DB_PATH = dbs[name]
+
+    def use_fresh_db(name):
+        dbs[name] = db.DB_PATH = os.path.join(tmp, f"{name}-{size}-{next(fresh)}.db")
+
+    def save_lc():
+        for (uname, college, batch, name), data in zip(rows, lc_payloads):
+            app.save_profile_to_db(uname, data, college=college, batch=batch, student_name=name)
+
+    def save_cf():
+        for (uname, college, batch, name), data in zip(rows, cf_payloads):
+            app.save_cf_profile_to_db(uname, data, college=college, batch=batch, student_name=name)
+
+    yield ('calculate_leetcode_score', None,
+           lambda: [app.calculate_leetcode_score(d) for d in lc_payloads])
+    yield ('calculate_codeforces_score', None,
+           lambda: [app.calculate_codeforces_score(d) for d in cf_payloads])
+    yield ('save_profile_to_db', lambda: use_fresh_db('lc'), save_lc)
+    yield ('save_cf_profile_to_db', lambda: use_fresh_db('cf'), save_cf)
+    yield ('save_profile_to_db_unchanged', lambda: use_db('lc'), save_lc)
+    yield ('save_cf_profile_to_db_unchanged', lambda: use_db('cf'), save_cf)
+
+    frames = {}
+
+    def load_lc():
+        frames['lc'] = app.load_all_profiles()
+
+    def load_cf():
+        frames['cf'] = app.load_all_cf_profiles()
+
+    yield ('load_all_profiles', lambda: use_db('lc'), load_lc)
+    yield ('load_all_cf_profiles', lambda: use_db('cf'), load_cf)
+    # the dashboard reads its cohort summary from the maintained aggregates...
+    _, college, batch = rows[0][:3]
+    yield ('load_cohort_summary', lambda: use_db('lc'), lambda: app.load_cohort_summary('leetcode'))
+    yield ('load_cf_cohort_summary', lambda: use_db('cf'), lambda: app.load_cohort_summary('codeforces'))
+    yield ('load_cohort_summary_filtered', lambda: use_db('lc'),
+           lambda: app.load_cohort_summary('leetcode', college, batch))
+    # ...and only summarizes a loaded frame on the Top-% path, which the aggregates cannot answer
+    yield ('summarize_leetcode_cohort', None, lambda: app.summarize_leetcode_cohort(frames['lc']))
+    yield ('summarize_codeforces_cohort', None, lambda: app.summarize_codeforces_cohort(frames['cf']))
+
+
+def run(sizes, repeat, write_repeat):
+    warnings.filterwarnings('ignore')
+    logging.disable(logging.WARNING)
+    import leetcode as app
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            for name, setup, fn in build_cases(app, size, tmp):
+                n = write_repeat if name.startswith('save_') else repeat
+                median, best = _measure(fn, n, setup)
+                results.setdefault(name, {})[str(size)] = {
+                    'median_s': round(median, 6),
+                    'min_s': round(best, 6),
+                    'per_profile_us': round(median / size * 1e6, 2),
+                    'repeat': n,
+                }
+                print(f"{name:<34}{size:>8}  median {median * 1000:>10.2f} ms"
+                      f"  {median / size * 1e6:>10.2f} us/profile", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print ratios against the baseline; return the list of regressed (name, size)."""
+    regressions = []
+    print(f"\n{'case':<34}{'size':>8}{'baseline ms':>14}{'now ms':>12}{'ratio':>8}")
+    for name, by_size in results.items():
+        for size, now in by_size.items():
+            base = baseline.get(name, {}).get(size)
+            if not base:
+                continue
+            ratio = now['median_s'] / base['median_s'] if base['median_s'] else float('inf')
+            flag = "  REGRESSION" if ratio > threshold else ""
+            if flag:
+                regressions.append((name, size))
+            print(f"{name:<34}{size:>8}{base['median_s'] * 1000:>14.2f}{now['median_s'] * 1000:>12.2f}"
+                  f"{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--repeat', type=int, default=5, help="runs per in-memory case")
+    parser.add_argument('--write-repeat', type=int, default=1, help="runs per save_* case")
+    parser.add_argument('--out', help="results file (default bench/results/micro-<timestamp>.json)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="also write results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=1.25, help="ratio above which a case counts as regressed")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.write_repeat)
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+    out = args.out or os.path.join(RESULTS_DIR, f"micro-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
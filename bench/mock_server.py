@@ -0,0 +1,142 @@
+"""Local stand-in for the LeetCode GraphQL and Codeforces REST endpoints.
+
+    python bench/mock_server.py --port 8765 --latency-ms 80 --rate-429 0.02
+
+Point the app or a benchmark at it with
+    LEETCODE_GRAPHQL_URL=http://127.0.0.1:8765/graphql
+    CODEFORCES_API_URL=http://127.0.0.1:8765/api
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic  # noqa: E402
+
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # overridden per server by make_server()
+    latency_ms = 0.0
+    jitter_ms = 0.0
+    rate_429 = 0.0
+    missing_rate = 0.0
+    submissions = 100
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _delay_and_maybe_throttle(self):
+        delay = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        if delay:
+            time.sleep(delay)
+        if self.rate_429 and random.random() < self.rate_429:
+            self._send(429, {'status': 'FAILED', 'comment': 'Too many requests'}, {'Retry-After': '0'})
+            return True
+        return False
+
+    def _missing(self, username):
+        return self.missing_rate and synthetic.rng_for('missing', username).random() < self.missing_rate
+
+    def _send(self, status, body, extra_headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if urlparse(self.path).path != '/graphql':
+            return self._send(404, {'errors': [{'message': 'not found'}]})
+        if self._delay_and_maybe_throttle():
+            return
+
+        variables = request.get('variables') or {}
+        if 'username' in variables:
+            username = variables['username']
+            if self._missing(username):
+                return self._send(200, {'data': {'matchedUser': None}})
+            return self._send(200, {'data': synthetic.leetcode_profile(username)})
+
+        # aliased contest-only query: u0, u1, ... -> userContestRanking or userContestRankingHistory
+        if 'userContestRankingHistory' in request.get('query', ''):
+            return self._send(200, {'data': {alias: synthetic.leetcode_profile(username)['userContestRankingHistory']
+                                             for alias, username in variables.items()}})
+        return self._send(200, {'data': {alias: synthetic.leetcode_contest(username)
+                                         for alias, username in variables.items()}})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if self._delay_and_maybe_throttle():
+            return
+
+        method = url.path.rsplit('/', 1)[-1]
+        handle = query.get('handle') or query.get('handles', '')
+        if method != 'problemset.problems' and self._missing(handle):
+            return self._send(400, {'status': 'FAILED', 'comment': f"handle: User with handle {handle} not found"})
+
+        if method == 'user.info':
+            return self._send(200, {'status': 'OK', 'result': [synthetic.codeforces_user(handle)]})
+        if method == 'user.rating':
+            return self._send(200, {'status': 'OK', 'result': synthetic.codeforces_rating(handle)})
+        if method == 'user.status':
+            count = int(query.get('count', self.submissions))
+            return self._send(200, {'status': 'OK', 'result': synthetic.codeforces_submissions(handle, count)})
+        if method == 'problemset.problems':
+            return self._send(200, {'status': 'OK', 'result': synthetic.codeforces_problemset()})
+        return self._send(404, {'status': 'FAILED', 'comment': f"unknown method {method}"})
+
+
+def make_server(host='127.0.0.1', port=8765, latency_ms=0.0, jitter_ms=0.0, rate_429=0.0,
+                missing_rate=0.0, submissions=100):
+    handler = type('ConfiguredMockAPIHandler', (MockAPIHandler,), {
+        'latency_ms': latency_ms, 'jitter_ms': jitter_ms, 'rate_429': rate_429,
+        'missing_rate': missing_rate, 'submissions': submissions,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(**kwargs):
+    """Start a server on a background thread; returns (server, base_url)."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="mean added latency per request")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="stddev of the added latency")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--missing-rate', type=float, default=0.0, help="fraction of usernames that do not exist")
+    parser.add_argument('--submissions', type=int, default=100, help="default Codeforces user.status size")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency_ms, args.jitter_ms, args.rate_429,
+                         args.missing_rate, args.submissions)
+    print(f"Mock API listening on http://{args.host}:{args.port} (graphql: /graphql, codeforces: /api)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""End-to-end throughput benchmark: fetch -> save -> load -> dashboard, against the local mock API.
+
+    python bench/pipeline.py --sizes 1000 10000 --platform leetcode --latency-ms 50 --concurrency 16
+    python bench/pipeline.py --sizes 50000 --skip-fetch          # persistence/dashboard only
+
+Each stage reports profiles/second, p50/p99 per-profile latency and peak RSS. Pass --json to
+keep the numbers for comparison between runs.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import db  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def _peak_rss_kb():
+    """Peak resident set size since the last _reset_peak_rss() (VmHWM on Linux)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass  # not Linux: peak stays process-wide
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def _stage_result(name, n, wall, latencies, failures=0):
+    latencies = sorted(latencies)
+    return {
+        'stage': name,
+        'profiles': n,
+        'failures': failures,
+        'wall_s': round(wall, 4),
+        'profiles_per_s': round(n / wall, 1) if wall else None,
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        'peak_rss_mb': round(_peak_rss_kb() / 1024, 1),
+    }
+
+
+def _timed_each(fn, items, concurrency=1):
+    latencies, results = [], []
+
+    def run(item):
+        start = time.perf_counter()
+        result = fn(item)
+        return time.perf_counter() - start, result
+
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for elapsed, result in pool.map(run, items):
+                latencies.append(elapsed)
+                results.append(result)
+    else:
+        for item in items:
+            elapsed, result = run(item)
+            latencies.append(elapsed)
+            results.append(result)
+    return latencies, results
+
+
+def run_size(app, platform, n, concurrency, skip_fetch):
+    rows = synthetic.cohort(n)
+    fetch = app.fetch_leetcode_data if platform == 'leetcode' else app.fetch_codeforces_data
+    save = app.save_profile_to_db if platform == 'leetcode' else app.save_cf_profile_to_db
+    load = app.load_all_profiles if platform == 'leetcode' else app.load_all_cf_profiles
+    dashboard = (app.display_batch_dashboard_from_db if platform == 'leetcode'
+                 else app.display_cf_batch_dashboard_from_db)
+    make_payload = synthetic.leetcode_profile if platform == 'leetcode' else synthetic.codeforces_profile
+    results = []
+
+    _reset_peak_rss()
+    start = time.perf_counter()
+    if skip_fetch:
+        payloads = [make_payload(r[0]) for r in rows]
+        latencies = []
+        name = 'synthesize'
+    else:
+        latencies, payloads = _timed_each(lambda r: fetch(r[0]), rows, concurrency)
+        name = 'fetch'
+    failures = sum(1 for p in payloads if not p)
+    results.append(_stage_result(name, n, time.perf_counter() - start, latencies, failures))
+
+    _reset_peak_rss()
+    fetched = [(r, p) for r, p in zip(rows, payloads) if p]
+    start = time.perf_counter()
+    latencies, _ = _timed_each(
+        lambda rp: save(rp[0][0], rp[1], college=rp[0][1], batch=rp[0][2], student_name=rp[0][3]), fetched)
+    results.append(_stage_result('save', len(fetched), time.perf_counter() - start, latencies))
+    del payloads, fetched
+
+    _reset_peak_rss()
+    start = time.perf_counter()
+    df = load()
+    wall = time.perf_counter() - start
+    results.append(_stage_result('load', len(df), wall, [wall / max(len(df), 1)] * len(df)))
+
+    _reset_peak_rss()
+    start = time.perf_counter()
+    dashboard(df)
+    wall = time.perf_counter() - start
+    results.append(_stage_result('dashboard', len(df), wall, [wall / max(len(df), 1)] * len(df)))
+    return results
+
+
+def _print_table(size, results):
+    print(f"\n== {size} students ==")
+    print(f"{'stage':<11}{'profiles':>9}{'fail':>6}{'wall s':>10}{'prof/s':>11}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'peak RSS MB':>13}")
+    for r in results:
+        print(f"{r['stage']:<11}{r['profiles']:>9}{r['failures']:>6}{r['wall_s']:>10.3f}"
+              f"{(r['profiles_per_s'] or 0):>11.1f}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['peak_rss_mb']:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--platform', choices=['leetcode', 'codeforces'], default='leetcode')
+    parser.add_argument('--concurrency', type=int, default=16, help="parallel fetches against the mock server")
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--missing-rate', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--skip-fetch', action='store_true', help="synthesize payloads locally instead of fetching")
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    server = None
+    if not args.skip_fetch:
+        server = subprocess.Popen([
+            sys.executable, os.path.join(BENCH_DIR, 'mock_server.py'), '--port', str(args.port),
+            '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+            '--rate-429', str(args.rate_429), '--missing-rate', str(args.missing_rate),
+        ], stdout=subprocess.DEVNULL)
+        time.sleep(0.5)
+        os.environ['LEETCODE_GRAPHQL_URL'] = f"http://127.0.0.1:{args.port}/graphql"
+        os.environ['CODEFORCES_API_URL'] = f"http://127.0.0.1:{args.port}/api"
+    os.environ['HTTP_CACHE_MODE'] = 'off'
+
+    # streamlit runs in "bare" mode here; silence its missing-runtime chatter
+    warnings.filterwarnings('ignore')
+    logging.disable(logging.WARNING)
+    import leetcode as app
+
+    report = {'platform': args.platform, 'concurrency': args.concurrency,
+              'latency_ms': args.latency_ms, 'rate_429': args.rate_429, 'runs': {}}
+    try:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                db.DB_PATH = os.path.join(tmp, 'bench.db')
+                results = run_size(app, args.platform, size, args.concurrency, args.skip_fetch)
+            report['runs'][str(size)] = results
+            _print_table(size, results)
+    finally:
+        if server:
+            server.terminate()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Deterministic synthetic LeetCode / Codeforces payloads for the mock server and benchmarks.
+
+The same username always produces the same profile, so runs are comparable.
+"""
+import hashlib
+import json
+import random
+
+COLLEGES = ["ADYPU, Pune", "SAGE, Indore", "GDG, Gurugram", "SSU, Gurugram"]
+BATCHES = ["2023", "2024", "2025"]
+CF_RANKS = [(0, 'newbie'), (1200, 'pupil'), (1400, 'specialist'), (1600, 'expert'),
+            (1900, 'candidate master'), (2100, 'master'), (2300, 'international master'),
+            (2400, 'grandmaster'), (2600, 'international grandmaster'), (3000, 'legendary grandmaster')]
+LANGS = ['python3', 'cpp', 'java', 'javascript']
+STATUSES = ['Accepted', 'Accepted', 'Accepted', 'Wrong Answer', 'Time Limit Exceeded', 'Runtime Error']
+NOW = 1_760_000_000  # fixed "now" so payloads never drift between runs
+
+
+def rng_for(kind, username):
+    seed = int(hashlib.md5(f"{kind}:{username}".encode()).hexdigest()[:12], 16)
+    return random.Random(seed)
+
+
+def usernames(n, prefix="student"):
+    return [f"{prefix}{i:06d}" for i in range(n)]
+
+
+def cohort(n, prefix="student"):
+    """[(username, college, batch, student_name)] spread over the real college/batch options."""
+    rows = []
+    for i, uname in enumerate(usernames(n, prefix)):
+        rows.append((uname, COLLEGES[i % len(COLLEGES)], BATCHES[i % len(BATCHES)], f"Student {i}"))
+    return rows
+
+
+def leetcode_contest(username):
+    rng = rng_for('lc-contest', username)
+    attended = rng.choice([0, 0, 1, 2, 5, 10, 25, 60])
+    if not attended:
+        return None
+    return {
+        'attendedContestsCount': attended,
+        'rating': round(rng.uniform(1200, 2600), 3),
+        'globalRanking': rng.randint(1, 600_000),
+        'totalParticipants': 650_000,
+        'topPercentage': round(rng.uniform(0.5, 95), 2),
+    }
+
+
+def leetcode_calendar(username):
+    """submissionCalendar: JSON object of UTC-midnight unix seconds -> submissions, last 365 days."""
+    rng = rng_for('lc-calendar', username)
+    activity = rng.choice([0.02, 0.1, 0.3, 0.6])
+    today = NOW - NOW % 86400
+    days = {str(today - d * 86400): rng.randint(1, 12) for d in range(365) if rng.random() < activity}
+    return json.dumps(days)
+
+
+def leetcode_profile(username):
+    """Body of `data` for the getUserProfile query."""
+    rng = rng_for('lc', username)
+    easy, medium, hard = rng.randint(0, 300), rng.randint(0, 400), rng.randint(0, 120)
+    contest = leetcode_contest(username)
+    attended = contest['attendedContestsCount'] if contest else 0
+
+    history = []
+    rating = 1500.0
+    start = NOW - attended * 7 * 86400
+    for c in range(attended):
+        rating += rng.uniform(-60, 80)
+        history.append({
+            'attended': True,
+            'rating': round(rating, 3),
+            'ranking': rng.randint(1, 30_000),
+            'contest': {'title': f"Weekly Contest {300 + c}", 'startTime': start + c * 7 * 86400},
+        })
+
+    submissions = []
+    last_active = NOW - rng.choice([0, 1, 3, 10, 40, 200]) * 86400
+    for k in range(20):
+        slug = f"problem-{rng.randint(1, 3000)}"
+        submissions.append({
+            'title': slug.replace('-', ' ').title(),
+            'titleSlug': slug,
+            'timestamp': str(last_active - k * rng.randint(600, 86400)),
+            'statusDisplay': rng.choice(STATUSES),
+            'lang': rng.choice(LANGS),
+        })
+
+    ac = [{'difficulty': 'All', 'count': easy + medium + hard, 'submissions': 0},
+          {'difficulty': 'Easy', 'count': easy, 'submissions': 0},
+          {'difficulty': 'Medium', 'count': medium, 'submissions': 0},
+          {'difficulty': 'Hard', 'count': hard, 'submissions': 0}]
+    total = [{'difficulty': d['difficulty'], 'count': int(d['count'] * 1.4) + 1, 'submissions': 0} for d in ac]
+
+    return {
+        'matchedUser': {
+            'username': username,
+            'profile': {
+                'ranking': rng.randint(1, 5_000_000), 'reputation': 0, 'starRating': 0,
+                'realName': f"Student {username}", 'aboutMe': '', 'userAvatar': '',
+                'skillTags': [], 'countryName': 'India',
+            },
+            'submissionCalendar': leetcode_calendar(username),
+            'submitStats': {'acSubmissionNum': ac, 'totalSubmissionNum': total},
+            'badges': [],
+            'upcomingBadges': [],
+        },
+        'userContestRanking': contest,
+        'userContestRankingHistory': history,
+        'recentSubmissionList': submissions,
+        'matchedUserStats': {'submitStatsGlobal': {'acSubmissionNum': ac}},
+    }
+
+
+def codeforces_user(username):
+    rng = rng_for('cf', username)
+    rating = rng.choice([0, rng.randint(800, 2800)])
+    rank = 'unrated'
+    if rating:
+        rank = [name for floor, name in CF_RANKS if rating >= floor][-1]
+    return {
+        'handle': username, 'rating': rating, 'maxRating': rating + rng.randint(0, 150),
+        'rank': rank, 'maxRank': rank, 'country': 'India', 'titlePhoto': '',
+        'firstName': 'Student', 'lastName': username,
+    }
+
+
+def codeforces_rating(username):
+    rng = rng_for('cf-rating', username)
+    contests = rng.choice([0, 1, 3, 8, 20, 50])
+    rating, history = 0, []
+    for c in range(contests):
+        new = max(0, rating + rng.randint(-80, 150))
+        history.append({
+            'contestId': 1500 + c, 'contestName': f"Codeforces Round {900 + c}", 'handle': username,
+            'rank': rng.randint(1, 20_000), 'ratingUpdateTimeSeconds': NOW - (contests - c) * 10 * 86400,
+            'oldRating': rating, 'newRating': new,
+        })
+        rating = new
+    return history
+
+
+CF_PROBLEM_CONTESTS = 2000
+CF_PROBLEM_INDEXES = 'ABCDEF'
+CF_TAGS = ['math', 'greedy', 'dp', 'graphs', 'strings', 'implementation']
+
+
+def codeforces_problem(contest_id, index):
+    """problemset.problems entry; the same (contest, index) always has the same rating and tags."""
+    rng = rng_for('cf-problem', f"{contest_id}{index}")
+    return {'contestId': contest_id, 'index': index, 'name': f"Problem {contest_id}{index}",
+            'type': 'PROGRAMMING', 'rating': rng.choice(range(800, 3000, 100)), 'tags': rng.sample(CF_TAGS, 2)}
+
+
+def codeforces_problemset():
+    """Result body of problemset.problems."""
+    problems = [codeforces_problem(c, i) for c in range(1, CF_PROBLEM_CONTESTS + 1) for i in CF_PROBLEM_INDEXES]
+    return {'problems': problems, 'problemStatistics': []}
+
+
+def codeforces_submissions(username, count=100):
+    """user.status entries; about a fifth omit the problem rating, as unrated problems do upstream."""
+    rng = rng_for('cf-status', username)
+    subs = []
+    for k in range(count):
+        contest_id = rng.randint(1, CF_PROBLEM_CONTESTS)
+        problem = codeforces_problem(contest_id, rng.choice(CF_PROBLEM_INDEXES))
+        if rng.random() >= 0.8:
+            del problem['rating']
+        subs.append({
+            'id': 100_000 + k, 'contestId': contest_id, 'creationTimeSeconds': NOW - k * rng.randint(3600, 5 * 86400),
+            'problem': problem, 'programmingLanguage': 'GNU C++17',
+            'verdict': rng.choice(['OK', 'OK', 'WRONG_ANSWER', 'TIME_LIMIT_EXCEEDED']),
+        })
+    return subs
+
+
+def codeforces_profile(username, count=100):
+    """Payload in the shape returned by fetch_codeforces_data."""
+    return {
+        'user': codeforces_user(username),
+        'ratingHistory': codeforces_rating(username),
+        'submissions': codeforces_submissions(username, count),
+    }
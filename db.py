@@ -0,0 +1,13 @@
+"""The SQLite database shared by the dashboard, the fetch queue and the exporters."""
+import os
+import sqlite3
+
+DB_PATH = os.environ.get(
+    'LEETCODE_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), "leetcode_cache.db"))
+
+def connect():
+    # WAL lets the Streamlit process read while fetch workers write
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,153 @@
+"""Fetch work queue shared by fetch_workers.py processes, kept in the dashboard database.
+
+Jobs are leased to one worker at a time; a lease that expires (the worker died) makes the job
+claimable again until it has used WORKER_MAX_ATTEMPTS. All workers draw from one token bucket
+per platform so together they stay under the API rate limits.
+"""
+import json
+import time
+
+import db
+
+# Profiles per second across *all* worker processes, per platform
+WORKER_RATE_LIMITS = {'leetcode': 0.5, 'codeforces': 0.5}
+WORKER_MAX_ATTEMPTS = 3
+
+def _get_queue_db():
+    conn = db.connect()
+    conn.isolation_level = None  # explicit BEGIN IMMEDIATE for claims
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fetch_queue (
+            id INTEGER PRIMARY KEY,
+            platform TEXT NOT NULL,
+            username TEXT NOT NULL,
+            college TEXT DEFAULT '',
+            batch TEXT DEFAULT '',
+            student_name TEXT DEFAULT '',
+            state TEXT DEFAULT 'pending',
+            lease_owner TEXT,
+            lease_expires REAL DEFAULT 0,
+            attempts INTEGER DEFAULT 0,
+            enqueued_at REAL,
+            finished_at REAL,
+            UNIQUE(platform, username)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fetch_queue_claim ON fetch_queue(platform, state, lease_expires)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rate_budget (
+            platform TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    return conn
+
+def enqueue_fetch_jobs(platform, rows):
+    """Queue (username, college, batch, student_name) rows; re-queues usernames already present."""
+    rows = list(rows)
+    now = time.time()
+    conn = _get_queue_db()
+    conn.execute("BEGIN IMMEDIATE")
+    conn.executemany("""
+        INSERT INTO fetch_queue (platform, username, college, batch, student_name, state, enqueued_at)
+        VALUES (?, ?, ?, ?, ?, 'pending', ?)
+        ON CONFLICT(platform, username) DO UPDATE SET
+            college=excluded.college, batch=excluded.batch, student_name=excluded.student_name,
+            state='pending', lease_owner=NULL, lease_expires=0, attempts=0,
+            enqueued_at=excluded.enqueued_at, finished_at=NULL
+    """, [(platform, username, college, batch, student_name, now)
+          for username, college, batch, student_name in rows])
+    conn.execute("COMMIT")
+    conn.close()
+    return len(rows)
+
+def claim_fetch_jobs(platform, worker_id, limit, lease_seconds):
+    """Atomically lease up to `limit` pending or lease-expired jobs to `worker_id`."""
+    now = time.time()
+    conn = _get_queue_db()
+    conn.execute("BEGIN IMMEDIATE")
+    # an expired lease that already used its last attempt is a failure, not a retry
+    conn.execute("""
+        UPDATE fetch_queue SET state='failed', lease_owner=NULL, lease_expires=0, finished_at=?
+        WHERE platform = ? AND state = 'leased' AND lease_expires < ? AND attempts >= ?
+    """, (now, platform, now, WORKER_MAX_ATTEMPTS))
+    jobs = conn.execute("""
+        UPDATE fetch_queue
+        SET state='leased', lease_owner=?, lease_expires=?, attempts=attempts + 1
+        WHERE id IN (
+            SELECT id FROM fetch_queue
+            WHERE platform = ? AND (state = 'pending' OR (state = 'leased' AND lease_expires < ?))
+            ORDER BY id
+            LIMIT ?
+        )
+        RETURNING id, username, college, batch, student_name, attempts
+    """, (worker_id, now + lease_seconds, platform, now, limit)).fetchall()
+    conn.execute("COMMIT")
+    conn.close()
+    return jobs
+
+def renew_fetch_jobs(worker_id, job_ids, lease_seconds):
+    """Extend `worker_id`'s leases on `job_ids`; returns the ids it still holds."""
+    conn = _get_queue_db()
+    conn.execute("BEGIN IMMEDIATE")
+    held = {row[0] for row in conn.execute("""
+        UPDATE fetch_queue SET lease_expires = ?
+        WHERE id IN (SELECT value FROM json_each(?)) AND state = 'leased' AND lease_owner = ?
+        RETURNING id
+    """, (time.time() + lease_seconds, json.dumps(list(job_ids)), worker_id))}
+    conn.execute("COMMIT")
+    conn.close()
+    return held
+
+def complete_fetch_jobs(worker_id, done_ids, failed_ids):
+    """Mark leased jobs done, or pending again (failed after WORKER_MAX_ATTEMPTS)."""
+    now = time.time()
+    conn = _get_queue_db()
+    conn.execute("BEGIN IMMEDIATE")
+    # jobs whose lease another worker has taken over are left alone
+    conn.executemany(
+        "UPDATE fetch_queue SET state='done', finished_at=? WHERE id=? AND lease_owner=?",
+        [(now, job_id, worker_id) for job_id in done_ids])
+    conn.executemany("""
+        UPDATE fetch_queue
+        SET state=CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+            lease_owner=NULL, lease_expires=0, finished_at=?
+        WHERE id=? AND lease_owner=?
+    """, [(WORKER_MAX_ATTEMPTS, now, job_id, worker_id) for job_id in failed_ids])
+    conn.execute("COMMIT")
+    conn.close()
+
+def acquire_rate_token(platform, rate, burst=1.0):
+    """Block until the token bucket shared by every worker process allows one more fetch."""
+    conn = _get_queue_db()
+    try:
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM rate_budget WHERE platform=?",
+                               (platform,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute("""
+                INSERT INTO rate_budget (platform, tokens, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(platform) DO UPDATE SET tokens=excluded.tokens, updated_at=excluded.updated_at
+            """, (platform, tokens, now))
+            conn.execute("COMMIT")
+            if not wait:
+                return
+            time.sleep(wait)
+    finally:
+        conn.close()
+
+def load_queue_status(platform):
+    """Job counts per state for the platform."""
+    conn = _get_queue_db()
+    counts = dict(conn.execute(
+        "SELECT state, COUNT(*) FROM fetch_queue WHERE platform=? GROUP BY state", (platform,)).fetchall())
+    conn.close()
+    return counts
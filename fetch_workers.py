@@ -0,0 +1,125 @@
+"""Process the fetch queue with several worker processes.
+
+    python fetch_workers.py --platform leetcode --workers 4
+    python fetch_workers.py --platform codeforces --workers 2 --enqueue-csv students.csv
+    python fetch_workers.py --platform leetcode --due          # e.g. hourly from cron
+
+Workers claim username batches from the `fetch_queue` table in leetcode_cache.db using
+lease semantics, share one per-platform rate budget and write results through the bulk
+upsert path, so throughput scales with cores without exceeding the API limits.
+Queue jobs from the dashboard ("Queue for Background Workers") or with --enqueue-csv.
+--due queues the stored profiles whose activity-based refresh time has passed.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import time
+import warnings
+
+from fetch_queue import (WORKER_RATE_LIMITS, acquire_rate_token, claim_fetch_jobs, complete_fetch_jobs,
+                         enqueue_fetch_jobs, load_queue_status, renew_fetch_jobs)
+
+
+def _import_app():
+    # leetcode.py is a Streamlit script; importing it outside `streamlit run` is fine but noisy
+    warnings.filterwarnings('ignore')
+    logging.disable(logging.WARNING)
+    import leetcode
+    return leetcode
+
+
+def run_fetch_worker(platform, worker_id, batch_size=5, lease_seconds=300, rate=None):
+    """Claim batches from the queue until it is empty, saving results through the bulk upsert path."""
+    app = _import_app()
+    fetch = app.fetch_leetcode_data if platform == 'leetcode' else app.fetch_codeforces_data
+    save = app.save_profiles_to_db if platform == 'leetcode' else app.save_cf_profiles_to_db
+    found = (lambda d: d and d.get('matchedUser')) if platform == 'leetcode' else (lambda d: d and d.get('user'))
+    rate = rate or WORKER_RATE_LIMITS[platform]
+    processed = 0
+
+    while True:
+        jobs = claim_fetch_jobs(platform, worker_id, batch_size, lease_seconds)
+        if not jobs:
+            break
+
+        results, failed_ids = [], []
+        held = {job[0] for job in jobs}
+        for job_id, username, college, batch, student_name, _ in jobs:
+            acquire_rate_token(platform, rate)
+            # the rate wait can outlast the lease; jobs another worker has reclaimed are its to fetch
+            held = renew_fetch_jobs(worker_id, held, lease_seconds)
+            if job_id not in held:
+                continue
+            try:
+                data = fetch(username)
+            except Exception:
+                data = None
+            if found(data):
+                results.append((job_id, (username, data, college, batch, student_name)))
+            else:
+                failed_ids.append(job_id)
+
+        held = renew_fetch_jobs(worker_id, held, lease_seconds)
+        done_ids = [job_id for job_id, _ in results if job_id in held]
+        try:
+            save([result for job_id, result in results if job_id in held])
+        except Exception:
+            # nothing was stored; retry the whole batch like failed fetches
+            failed_ids, done_ids = failed_ids + done_ids, []
+        complete_fetch_jobs(worker_id, done_ids, failed_ids)
+        processed += len(done_ids) + len(failed_ids)
+    return processed
+
+
+def _worker(platform, index, batch_size, lease_seconds, rate):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    processed = run_fetch_worker(platform, worker_id, batch_size=batch_size,
+                                 lease_seconds=lease_seconds, rate=rate)
+    print(f"[{worker_id}] processed {processed} job(s)", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--platform', choices=['leetcode', 'codeforces'], required=True)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--batch-size', type=int, default=5, help="jobs claimed per lease")
+    parser.add_argument('--lease-seconds', type=int, default=300)
+    parser.add_argument('--rate', type=float, help="profiles/second across all workers (default per platform)")
+    parser.add_argument('--enqueue-csv', help="CSV with name, college, batch, profile columns to queue first")
+    parser.add_argument('--due', action='store_true', help="queue stored profiles whose refresh is due first")
+    parser.add_argument('--due-limit', type=int, help="queue at most this many due profiles, most overdue first")
+    args = parser.parse_args()
+
+    if args.enqueue_csv:
+        import pandas as pd
+        csv_df = pd.read_csv(args.enqueue_csv)
+        csv_df.columns = [c.strip().lower() for c in csv_df.columns]
+        csv_df = csv_df.dropna(subset=['profile'])
+        for col in ('profile', 'name', 'college', 'batch'):
+            csv_df[col] = csv_df[col].astype(str).str.strip()
+        csv_df = csv_df[csv_df['profile'] != ''].drop_duplicates(subset='profile')
+        queued = enqueue_fetch_jobs(
+            args.platform, csv_df[['profile', 'college', 'batch', 'name']].itertuples(index=False, name=None))
+        print(f"Queued {queued} profile(s)")
+
+    if args.due:
+        app = _import_app()
+        print(f"Queued {app.enqueue_due_refreshes(args.platform, args.due_limit)} due profile(s)")
+
+    print(f"Queue before: {load_queue_status(args.platform)}")
+    start = time.time()
+    ctx = multiprocessing.get_context('spawn')
+    procs = [ctx.Process(target=_worker,
+                         args=(args.platform, i, args.batch_size, args.lease_seconds, args.rate))
+             for i in range(args.workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    print(f"Queue after: {load_queue_status(args.platform)} in {time.time() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""On-disk cache of upstream API responses, one JSON file per (endpoint, variables).
+
+    HTTP_CACHE_MODE=record streamlit run leetcode.py    # reuse fresh responses, store new ones
+    HTTP_CACHE_MODE=replay python bench/pipeline.py     # recorded responses only, no network
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# off:    always hit the network
+# record: serve cached responses younger than HTTP_CACHE_TTL, store fresh ones
+# replay: serve recorded responses only, never touch the network
+HTTP_CACHE_MODE = os.environ.get('HTTP_CACHE_MODE', 'off')
+HTTP_CACHE_DIR = os.environ.get(
+    'HTTP_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache"))
+HTTP_CACHE_TTL = int(os.environ.get('HTTP_CACHE_TTL', 6 * 3600))
+
+def response_key(endpoint, variables):
+    blob = json.dumps([endpoint, variables], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def _path(key):
+    return os.path.join(HTTP_CACHE_DIR, key[:2], f"{key}.json")
+
+def get(key, ttl):
+    try:
+        with open(_path(key)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if ttl is not None and time.time() - entry['stored_at'] > ttl:
+        return None
+    return entry['body']
+
+def put(key, endpoint, variables, body):
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # one tmp file per call: the lookup pool's threads store responses concurrently
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'endpoint': endpoint, 'variables': variables,
+                       'stored_at': time.time(), 'body': body}, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def clear():
+    """Delete every recorded response."""
+    shutil.rmtree(HTTP_CACHE_DIR, ignore_errors=True)
@@ -1,26 +1,496 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import plotly.graph_objects as go
 import plotly.express as px
-import sqlite3
+import atexit
+import codecs
+import functools
+import hashlib
 import json
 import os
+import re
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+import db
+import http_cache
+from fetch_queue import enqueue_fetch_jobs, load_queue_status
+from profile_export import EXPORT_DIR, EXPORT_FORMATS, ensure_profile_versions, export_tables
+from metrics import display_metrics_panel, increment, stage_clock, timed, write_metrics_file
 
 st.set_page_config(page_title="Coding Profile Viewer", page_icon="💻", layout="wide")
 
 # ---- SQLite helpers ----
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "leetcode_cache.db")
+def _ensure_students_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS students (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            college TEXT DEFAULT '',
+            batch TEXT DEFAULT '',
+            UNIQUE(name, college, batch)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_students_cohort ON students(college, batch)")
+
+def _ensure_profile_checks_table(conn):
+    # kept apart from the profile tables: SQLite rewrites the whole record (raw_json included)
+    # on any UPDATE, so bumping a timestamp there would cost as much as a full save
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS profile_checks (
+            profile_table TEXT NOT NULL,
+            username TEXT NOT NULL,
+            content_hash TEXT,
+            last_checked_at TEXT,
+            PRIMARY KEY (profile_table, username)
+        ) WITHOUT ROWID
+    """)
+
+# stat columns whose changes are recorded in profile_changes
+CHANGE_FEED_FIELDS = {
+    'leetcode_profiles': ['easy', 'medium', 'hard', 'total_solved', 'contest_rating', 'contests_attended'],
+    'codeforces_profiles': ['rating', 'max_rating', 'rank', 'problems_solved', 'contests_attended'],
+}
+# unix seconds inside SQLite 3.40, which has no unixepoch('subsec')
+_SQL_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+def _ensure_change_feed(conn, platform, table):
+    """Append-only profile_changes log of stat changes, inserts and deletes, filled by triggers on `table`."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS profile_changes (
+            id INTEGER PRIMARY KEY,
+            platform TEXT NOT NULL,
+            username TEXT NOT NULL,
+            field TEXT NOT NULL,
+            old_value,
+            new_value,
+            changed_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_profile_changes_at ON profile_changes(changed_at)")
+    fields = CHANGE_FEED_FIELDS[table]
+    values = ' UNION ALL '.join(f"SELECT '{f}' AS field, OLD.{f} AS old_value, NEW.{f} AS new_value"
+                                for f in fields)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_changes AFTER UPDATE OF {', '.join(fields)} ON {table}
+        BEGIN
+            INSERT INTO profile_changes (platform, username, field, old_value, new_value, changed_at)
+            SELECT '{platform}', NEW.username, field, old_value, new_value, {_SQL_NOW}
+            FROM ({values}) WHERE old_value IS NOT new_value;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_added AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO profile_changes (platform, username, field, old_value, new_value, changed_at)
+            VALUES ('{platform}', NEW.username, 'added', NULL, NEW.score, {_SQL_NOW});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_removed AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO profile_changes (platform, username, field, old_value, new_value, changed_at)
+            VALUES ('{platform}', OLD.username, 'removed', OLD.score, NULL, {_SQL_NOW});
+        END
+    """)
+
+# Refresh scheduling: profiles with activity in the last REFRESH_ACTIVE_WINDOW are refreshed
+# every REFRESH_MIN_INTERVAL; each refresh that finds them idle doubles the interval up to
+# REFRESH_MAX_INTERVAL.
+REFRESH_MIN_INTERVAL = 3600
+REFRESH_MAX_INTERVAL = 7 * 86400
+REFRESH_ACTIVE_WINDOW = 86400
+
+def _ensure_refresh_schedule(conn, platform, table):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS refresh_schedule (
+            platform TEXT NOT NULL,
+            username TEXT NOT NULL,
+            last_active_at REAL,
+            interval_s REAL NOT NULL,
+            next_refresh_at REAL NOT NULL,
+            PRIMARY KEY (platform, username)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_refresh_due ON refresh_schedule(platform, next_refresh_at)")
+    # profiles saved before scheduling existed are due straight away
+    if not conn.execute("SELECT 1 FROM refresh_schedule WHERE platform = ? LIMIT 1", (platform,)).fetchone():
+        conn.execute(f"""
+            INSERT OR IGNORE INTO refresh_schedule (platform, username, interval_s, next_refresh_at)
+            SELECT ?, username, ?, 0 FROM {table}
+        """, (platform, REFRESH_MIN_INTERVAL))
+
+def _schedule_refreshes(conn, platform, activity):
+    """Set the next refresh time of each (username, last_active_at) just fetched."""
+    now = time.time()
+    previous = dict(conn.execute(
+        "SELECT username, interval_s FROM refresh_schedule "
+        "WHERE platform = ? AND username IN (SELECT value FROM json_each(?))",
+        (platform, json.dumps([username for username, _ in activity]))).fetchall())
+    rows = []
+    for username, last_active in activity:
+        if last_active and last_active >= now - REFRESH_ACTIVE_WINDOW:
+            interval = REFRESH_MIN_INTERVAL
+        else:
+            interval = min(max(previous.get(username, REFRESH_MIN_INTERVAL), REFRESH_MIN_INTERVAL) * 2,
+                           REFRESH_MAX_INTERVAL)
+        rows.append((platform, username, last_active, interval, now + interval))
+    conn.executemany("INSERT OR REPLACE INTO refresh_schedule VALUES (?, ?, ?, ?, ?)", rows)
+
+def _content_hash(row):
+    """Hash of everything a profile row stores except fetched_at (the last element)."""
+    return hashlib.sha256('\x1f'.join(map(str, row[:-1])).encode()).hexdigest()
+
+def _drop_unchanged(conn, table, rows):
+    """Record a content-hash check per row and return only the rows that differ from the stored profile."""
+    stored = dict(conn.execute(f"""
+        SELECT c.username, c.content_hash FROM profile_checks c
+        JOIN {table} p ON p.username = c.username
+        WHERE c.profile_table = ? AND c.username IN (SELECT value FROM json_each(?))
+    """, (table, json.dumps([row[0] for row in rows]))).fetchall())
+    now = datetime.now().isoformat()
+    checks = [(table, row[0], _content_hash(row), now) for row in rows]
+    conn.executemany("INSERT OR REPLACE INTO profile_checks VALUES (?, ?, ?, ?)", checks)
+    return [row for row, check in zip(rows, checks) if stored.get(row[0]) != check[2]]
+
+def _forget_checks(conn, table, usernames=None):
+    """Drop stored content hashes so the next save rewrites those profiles (all when None)."""
+    if usernames is None:
+        conn.execute("DELETE FROM profile_checks WHERE profile_table = ?", (table,))
+    else:
+        conn.execute("DELETE FROM profile_checks WHERE profile_table = ? AND username IN "
+                     "(SELECT value FROM json_each(?))", (table, json.dumps(list(usernames))))
+
+def _delete_profiles(conn, platform, usernames):
+    """Delete stored usernames (case-insensitive) with everything derived from them; the caller commits."""
+    table = PROFILE_TABLES[platform]
+    matches = conn.execute(
+        f"SELECT username, college, batch FROM {table} "
+        "WHERE LOWER(username) IN (SELECT LOWER(value) FROM json_each(?))",
+        (json.dumps(list(usernames)),)).fetchall()
+    if not matches:
+        return 0
+    names = json.dumps([username for username, _, _ in matches])
+    conn.execute(f"DELETE FROM {table} WHERE username IN (SELECT value FROM json_each(?))", (names,))
+    conn.execute(f"DELETE FROM {CONTEST_HISTORY[platform][0]} WHERE username IN (SELECT value FROM json_each(?))",
+                 (names,))
+    conn.execute("DELETE FROM refresh_schedule WHERE platform = ? AND username IN (SELECT value FROM json_each(?))",
+                 (platform, names))
+    conn.execute(f"DELETE FROM {CALENDAR_TABLES[platform]} WHERE username IN (SELECT value FROM json_each(?))",
+                 (names,))
+    if platform == 'codeforces':
+        conn.execute("DELETE FROM cf_solved WHERE username IN (SELECT value FROM json_each(?))", (names,))
+    _forget_checks(conn, table, [username for username, _, _ in matches])
+    _drop_orphan_students(conn)
+    _refresh_cohort_ranks(conn, table, {(college, batch) for _, college, batch in matches})
+    return len(matches)
+
+def _ensure_profile_id(conn, table):
+    """Rebuild a `username TEXT PRIMARY KEY` profile table with an `id INTEGER PRIMARY KEY` carrying over its rowids."""
+    # VACUUM may renumber implicit rowids but never an INTEGER PRIMARY KEY, and profile_search rows are keyed on it
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    if re.search(r'\bid INTEGER PRIMARY KEY\b', sql):
+        return
+    columns = ', '.join(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+    sql = re.sub(rf'^CREATE TABLE "?{table}"?\s*\(', f'CREATE TABLE {table}_rebuild (\n    id INTEGER PRIMARY KEY,', sql)
+    conn.execute(sql.replace('username TEXT PRIMARY KEY', 'username TEXT NOT NULL UNIQUE', 1))
+    conn.execute(f"INSERT INTO {table}_rebuild (id, {columns}) SELECT rowid, {columns} FROM {table}")
+    # dropping the table drops its triggers and indexes; the _ensure_* helpers that follow recreate them
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_rebuild RENAME TO {table}")
+    # search rows were keyed on the old rowids, which VACUUM may already have renumbered
+    conn.execute("DROP TABLE IF EXISTS profile_search")
+
+def _ensure_profile_search(conn, platform, table):
+    """FTS5 index over username, student name and college of both profile tables, kept in sync by triggers."""
+    # FTS rowid = profile id * 2 (+1 for Codeforces), so an update touches one row
+    new_index = not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'profile_search'").fetchone()
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS profile_search USING fts5(
+            platform UNINDEXED, username, student_name, college, prefix = '2 3'
+        )
+    """)
+    offset = PROFILE_SEARCH_OFFSETS[platform]
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_search_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO profile_search (rowid, platform, username, student_name, college)
+            VALUES (NEW.id * 2 + {offset}, '{platform}', NEW.username, NEW.student_name, NEW.college);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_search_update AFTER UPDATE OF username, student_name, college ON {table}
+        WHEN OLD.username IS NOT NEW.username OR OLD.student_name IS NOT NEW.student_name
+             OR OLD.college IS NOT NEW.college
+        BEGIN
+            DELETE FROM profile_search WHERE rowid = OLD.id * 2 + {offset};
+            INSERT INTO profile_search (rowid, platform, username, student_name, college)
+            VALUES (NEW.id * 2 + {offset}, '{platform}', NEW.username, NEW.student_name, NEW.college);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_search_delete AFTER DELETE ON {table}
+        BEGIN
+            DELETE FROM profile_search WHERE rowid = OLD.id * 2 + {offset};
+        END
+    """)
+    if new_index:
+        existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for other, other_table in PROFILE_TABLES.items():
+            if other_table in existing:
+                # rowid is the id of a rebuilt table; one not yet rebuilt drops this index again when it is
+                conn.execute(f"""
+                    INSERT INTO profile_search (rowid, platform, username, student_name, college)
+                    SELECT rowid * 2 + {PROFILE_SEARCH_OFFSETS[other]}, '{other}', username, student_name, college
+                    FROM {other_table}
+                """)
+
+PROFILE_SEARCH_OFFSETS = {'leetcode': 0, 'codeforces': 1}
+
+def _link_students(conn, table, usernames=None):
+    """Add students rows for the profiles in `table` (all, or just `usernames`) and link the profiles to them."""
+    where = "" if usernames is None else "WHERE username IN (SELECT value FROM json_each(?))"
+    params = () if usernames is None else (json.dumps(list(usernames)),)
+    conn.execute(f"""
+        INSERT OR IGNORE INTO students (name, college, batch)
+        SELECT COALESCE(NULLIF(student_name, ''), username), college, batch FROM {table} {where}
+    """, params)
+    conn.execute(f"""
+        UPDATE {table} SET student_id = (
+            SELECT s.id FROM students s
+            WHERE s.name = COALESCE(NULLIF({table}.student_name, ''), {table}.username)
+              AND s.college = {table}.college AND s.batch = {table}.batch)
+        {where}
+    """, params)
+
+def _profile_cohorts(conn, table, usernames):
+    """Distinct (college, batch) pairs currently holding any of `usernames`."""
+    return set(conn.execute(
+        f"SELECT DISTINCT college, batch FROM {table} WHERE username IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(usernames)),)).fetchall())
+
+def _refresh_cohort_ranks(conn, table, cohorts=None):
+    """Recompute cohort_rank / cohort_percentile (CUME_DIST * 100) for the given (college, batch) groups, or all."""
+    if cohorts is None:
+        cohorts = conn.execute(f"SELECT DISTINCT college, batch FROM {table}").fetchall()
+    conn.executemany(f"""
+        UPDATE {table} SET cohort_rank = r.rnk, cohort_percentile = r.pct
+        FROM (
+            SELECT username,
+                   RANK() OVER (ORDER BY score DESC) AS rnk,
+                   ROUND(100.0 * CUME_DIST() OVER (ORDER BY score), 2) AS pct
+            FROM {table} WHERE college = ? AND batch = ?
+        ) AS r
+        WHERE {table}.username = r.username
+          AND ({table}.cohort_rank IS NOT r.rnk OR {table}.cohort_percentile IS NOT r.pct)
+    """, list(cohorts))
+
+def _replace_contest_history(conn, table, usernames, rows):
+    """Swap the stored per-user rows of `usernames` for `rows` inside the caller's transaction."""
+    conn.execute(f"DELETE FROM {table} WHERE username IN (SELECT value FROM json_each(?))",
+                 (json.dumps(list(usernames)),))
+    if rows:
+        placeholders = ', '.join('?' * len(rows[0]))
+        conn.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", rows)
+
+def _ensure_data_version(conn, platform, table):
+    """data_versions.version for `platform`, bumped by triggers on every write to `table`."""
+    conn.execute("CREATE TABLE IF NOT EXISTS data_versions (platform TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO data_versions VALUES (?, 0)", (platform,))
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()} AFTER {event} ON {table}
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE platform = '{platform}';
+            END
+        """)
+
+# cohort_aggregates column -> profile column per platform (None: not tracked on that platform)
+AGGREGATE_COLUMNS = {
+    'leetcode': {'solved': 'total_solved', 'rating': 'contest_rating', 'max_rating': None, 'score': 'score',
+                 'contests': 'contests_attended', 'easy': 'easy', 'medium': 'medium', 'hard': 'hard'},
+    'codeforces': {'solved': 'problems_solved', 'rating': 'rating', 'max_rating': 'max_rating', 'score': 'score',
+                   'contests': 'contests_attended', 'easy': None, 'medium': None, 'hard': None},
+}
+AGGREGATE_BUCKETS = 5
+
+def _aggregate_values(platform, ref, sign):
+    """SQL value list adding (sign '+') or removing (sign '-') one profile row `ref` (NEW/OLD/p)."""
+    columns = AGGREGATE_COLUMNS[platform]
+    buckets = LC_SOLVED_BUCKETS if platform == 'leetcode' else CF_SOLVED_BUCKETS
+    solved = f"COALESCE({ref}.{columns['solved']}, 0)"
+    values = [f"{sign}1"]
+    values += [f"{sign}COALESCE({ref}.{col}, 0)" if col else "0" for col in columns.values()]
+    for _, lower, upper in buckets:
+        bounds = [f"{solved} >= {lower}" if lower is not None else "1",
+                  f"{solved} < {upper}" if upper is not None else "1"]
+        values.append(f"{sign}({' AND '.join(bounds)})")
+    return values
+
+def _ensure_cohort_aggregates(conn, platform, table):
+    """Per-(college, batch) counts, sums and solved buckets, kept current by triggers on `table`."""
+    columns = list(AGGREGATE_COLUMNS[platform])
+    sums = [f"sum_{col}" for col in columns]
+    bucket_cols = [f"bucket_{i}" for i in range(AGGREGATE_BUCKETS)]
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS cohort_aggregates (
+            platform TEXT NOT NULL,
+            college TEXT NOT NULL,
+            batch TEXT NOT NULL,
+            students INTEGER NOT NULL,
+            {', '.join(f'{col} REAL NOT NULL' for col in sums)},
+            {', '.join(f'{col} INTEGER NOT NULL' for col in bucket_cols)},
+            PRIMARY KEY (platform, college, batch)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cohort_rank_counts (
+            college TEXT NOT NULL,
+            batch TEXT NOT NULL,
+            rank TEXT NOT NULL,
+            students INTEGER NOT NULL,
+            PRIMARY KEY (college, batch, rank)
+        ) WITHOUT ROWID
+    """)
+    all_cols = ['students'] + sums + bucket_cols
+    upsert = f"""
+        ON CONFLICT(platform, college, batch) DO UPDATE SET
+            {', '.join(f'{col} = {col} + excluded.{col}' for col in all_cols)}
+    """
+
+    def apply(ref, sign):
+        sql = f"""
+            INSERT INTO cohort_aggregates (platform, college, batch, {', '.join(all_cols)})
+            VALUES ('{platform}', COALESCE({ref}.college, ''), COALESCE({ref}.batch, ''),
+                    {', '.join(_aggregate_values(platform, ref, sign))})
+            {upsert};
+        """
+        if platform == 'codeforces':
+            sql += f"""
+                INSERT INTO cohort_rank_counts VALUES
+                    (COALESCE({ref}.college, ''), COALESCE({ref}.batch, ''), LOWER(COALESCE({ref}.rank, '')), {sign}1)
+                ON CONFLICT(college, batch, rank) DO UPDATE SET students = students + excluded.students;
+            """
+        return sql
+
+    prune = f"""
+        DELETE FROM cohort_aggregates WHERE platform = '{platform}' AND students = 0;
+        {"DELETE FROM cohort_rank_counts WHERE students = 0;" if platform == 'codeforces' else ""}
+    """
+    watched = ['college', 'batch'] + [col for col in AGGREGATE_COLUMNS[platform].values() if col]
+    if platform == 'codeforces':
+        watched.append('rank')
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_agg_insert AFTER INSERT ON {table}
+        BEGIN {apply('NEW', '+')} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_agg_delete AFTER DELETE ON {table}
+        BEGIN {apply('OLD', '-')} {prune} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_agg_update AFTER UPDATE OF {', '.join(watched)} ON {table}
+        BEGIN {apply('OLD', '-')} {apply('NEW', '+')} {prune} END
+    """)
+    if not conn.execute("SELECT 1 FROM cohort_aggregates WHERE platform = ? LIMIT 1", (platform,)).fetchone():
+        values = _aggregate_values(platform, 'p', '')
+        conn.execute(f"""
+            INSERT OR REPLACE INTO cohort_aggregates (platform, college, batch, {', '.join(all_cols)})
+            SELECT '{platform}', COALESCE(p.college, ''), COALESCE(p.batch, ''),
+                   {', '.join(f'SUM({value})' for value in values)}
+            FROM {table} p GROUP BY 2, 3
+        """)
+        if platform == 'codeforces':
+            conn.execute(f"""
+                INSERT OR REPLACE INTO cohort_rank_counts
+                SELECT COALESCE(college, ''), COALESCE(batch, ''), LOWER(COALESCE(rank, '')), COUNT(*)
+                FROM {table} GROUP BY 1, 2, 3
+            """)
+
+CALENDAR_TABLES = {'leetcode': 'leetcode_calendar', 'codeforces': 'codeforces_calendar'}
+CALENDAR_DAYS = 366
+# (username, unix seconds, submissions) pairs already inside raw_json, for the first-run backfill
+CALENDAR_BACKFILL_SQL = {
+    'leetcode': """
+        SELECT p.username, CAST(c.key AS INTEGER), c.value
+        FROM leetcode_profiles p, json_each(json_extract(p.raw_json, '$.matchedUser.submissionCalendar')) c
+        WHERE json_valid(p.raw_json) AND json_valid(json_extract(p.raw_json, '$.matchedUser.submissionCalendar'))
+    """,
+    'codeforces': """
+        SELECT p.username, json_extract(s.value, '$.creationTimeSeconds'), 1
+        FROM codeforces_profiles p, json_each(p.raw_json, '$.submissions') s
+        WHERE json_valid(p.raw_json) AND json_extract(s.value, '$.creationTimeSeconds') IS NOT NULL
+    """,
+}
+
+def _calendar_counts(pairs):
+    """{year: uint16[CALENDAR_DAYS]} daily UTC submission counts from (unix seconds, count) pairs."""
+    if not pairs:
+        return {}
+    ts, counts = np.asarray(pairs, dtype=np.int64).reshape(-1, 2).T
+    days = (ts // 86400).astype('datetime64[D]')
+    years = days.astype('datetime64[Y]')
+    day_of_year = (days - years.astype('datetime64[D]')).astype(np.int64)
+    calendars = {}
+    for year in np.unique(years):
+        in_year = years == year
+        row = np.zeros(CALENDAR_DAYS, dtype=np.int64)
+        np.add.at(row, day_of_year[in_year], counts[in_year])
+        calendars[int(year.astype(np.int64)) + 1970] = np.minimum(row, 0xFFFF).astype('<u2')
+    return calendars
+
+def _merge_calendars(conn, platform, calendars):
+    """Fold {username: {year: day counts}} into the stored calendars, keeping the larger count per day."""
+    # the APIs only return a recent window, so older days must survive a refresh
+    table = CALENDAR_TABLES[platform]
+    keys = [[username, year] for username, years in calendars.items() for year in years]
+    if not keys:
+        return
+    stored = {(username, year): np.frombuffer(counts, dtype='<u2') for username, year, counts in conn.execute(f"""
+        SELECT username, year, counts FROM {table}
+        WHERE (username, year) IN (SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?))
+    """, (json.dumps(keys),))}
+    rows = []
+    for username, year in keys:
+        counts = calendars[username][year]
+        if (username, year) in stored:
+            counts = np.maximum(counts, stored[username, year])
+        rows.append((username, year, counts.tobytes()))
+    conn.executemany(f"INSERT OR REPLACE INTO {table} (username, year, counts) VALUES (?, ?, ?)", rows)
+
+def _ensure_calendar_table(conn, platform):
+    """Packed per-year calendars (one little-endian uint16 per day), backfilled from raw_json when created."""
+    table = CALENDAR_TABLES[platform]
+    new_table = not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            username TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            counts BLOB NOT NULL,
+            PRIMARY KEY (username, year)
+        )
+    """)
+    if new_table:
+        pairs = {}
+        for username, ts, count in conn.execute(CALENDAR_BACKFILL_SQL[platform]):
+            pairs.setdefault(username, []).append((ts, count))
+        _merge_calendars(conn, platform, {username: _calendar_counts(p) for username, p in pairs.items()})
 
 def _get_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = db.connect()
     conn.execute("""
         CREATE TABLE IF NOT EXISTS leetcode_profiles (
-            username TEXT PRIMARY KEY,
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
             college TEXT DEFAULT '',
             batch TEXT DEFAULT '',
             easy INTEGER DEFAULT 0,
@@ -44,75 +514,230 @@ def _get_db():
         conn.execute("ALTER TABLE leetcode_profiles ADD COLUMN batch TEXT DEFAULT ''")
     if 'student_name' not in existing_cols:
         conn.execute("ALTER TABLE leetcode_profiles ADD COLUMN student_name TEXT DEFAULT ''")
+    _ensure_profile_id(conn, 'leetcode_profiles')
+    _ensure_students_table(conn)
+    _ensure_profile_checks_table(conn)
+    _ensure_change_feed(conn, 'leetcode', 'leetcode_profiles')
+    _ensure_refresh_schedule(conn, 'leetcode', 'leetcode_profiles')
+    _ensure_profile_search(conn, 'leetcode', 'leetcode_profiles')
+    _ensure_data_version(conn, 'leetcode', 'leetcode_profiles')
+    _ensure_cohort_aggregates(conn, 'leetcode', 'leetcode_profiles')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lc_username_nocase ON leetcode_profiles(LOWER(username))")
+    if 'student_id' not in existing_cols:
+        conn.execute("ALTER TABLE leetcode_profiles ADD COLUMN student_id INTEGER REFERENCES students(id)")
+        _link_students(conn, 'leetcode_profiles')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lc_student ON leetcode_profiles(student_id)")
+    if 'cohort_rank' not in existing_cols:
+        conn.execute("ALTER TABLE leetcode_profiles ADD COLUMN cohort_rank INTEGER")
+        conn.execute("ALTER TABLE leetcode_profiles ADD COLUMN cohort_percentile REAL")
+        _refresh_cohort_ranks(conn, 'leetcode_profiles')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lc_cohort_score ON leetcode_profiles(college, batch, score DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lc_cohort_pct ON leetcode_profiles(college, batch, cohort_percentile)")
+    # contest history, one row per attended contest; backfilled from raw_json on first run
+    new_history = not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leetcode_contest_history'").fetchone()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS leetcode_contest_history (
+            username TEXT NOT NULL,
+            contest_title TEXT NOT NULL,
+            start_time INTEGER,
+            rating REAL,
+            ranking INTEGER,
+            PRIMARY KEY (username, contest_title)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lc_history_time ON leetcode_contest_history(start_time, contest_title)")
+    if new_history:
+        conn.execute("""
+            INSERT OR IGNORE INTO leetcode_contest_history
+            SELECT p.username, json_extract(h.value, '$.contest.title'), json_extract(h.value, '$.contest.startTime'),
+                   json_extract(h.value, '$.rating'), json_extract(h.value, '$.ranking')
+            FROM leetcode_profiles p, json_each(p.raw_json, '$.userContestRankingHistory') h
+            WHERE json_valid(p.raw_json) AND json_extract(h.value, '$.attended')
+        """)
+    _ensure_calendar_table(conn, 'leetcode')
+    ensure_profile_versions(conn, 'leetcode_profiles')
     conn.commit()
     return conn
 
+def _student_key(row):
+    """(name, college, batch) of the student behind a profile row; the username stands in for a missing name."""
+    username, college, batch, student_name = row[:4]
+    return (student_name or username, college, batch)
+
+def _leetcode_profile_row(username, data, college, batch, student_name):
+    stats = _lc_stats(data)
+    score = _leetcode_score_from_stats(stats['easy'], stats['medium'], stats['hard'], stats['contest_rating'],
+                                       stats['contests_attended'], stats['ranking'])
+
+    return (username, college, batch, student_name, stats['easy'], stats['medium'], stats['hard'],
+            stats['total_solved'], round(stats['contest_rating'], 2), stats['contests_attended'],
+            stats['ranking'] or 0, score, json.dumps(data), datetime.now().isoformat())
+
+def _lc_history_rows(history):
+    """(contest_title, start_time, rating, ranking) per attended contest, oldest first."""
+    return [(h['contest']['title'], h['contest']['startTime'], h.get('rating'), h.get('ranking'))
+            for h in history or [] if h.get('attended')]
+
+def _lc_calendar_pairs(data):
+    """(unix seconds, submissions) pairs from matchedUser.submissionCalendar, a JSON-encoded object."""
+    calendar = json.loads((data.get('matchedUser') or {}).get('submissionCalendar') or '{}')
+    return [(int(ts), count) for ts, count in calendar.items()]
+
+def _lc_last_activity(data):
+    """Unix time of the newest recent submission or attended contest, or None."""
+    times = [int(sub['timestamp']) for sub in data.get('recentSubmissionList') or []]
+    times += [start for _, start, _, _ in _lc_history_rows(data.get('userContestRankingHistory'))]
+    return max(times, default=None)
+
+@timed('db.save_leetcode')
 def save_profile_to_db(username, data, college='', batch='', student_name=''):
     """Extract stats from API data and upsert into SQLite."""
-    if not data or not data.get('matchedUser'):
-        return
-
-    user = data['matchedUser']
-    contest = data.get('userContestRanking')
-    solved_stats = {item['difficulty']: item['count']
-                    for item in user['submitStats']['acSubmissionNum']}
-
-    easy = solved_stats.get('Easy', 0)
-    medium = solved_stats.get('Medium', 0)
-    hard = solved_stats.get('Hard', 0)
-    total = easy + medium + hard
-    contest_rating = round(contest['rating'], 2) if contest and contest.get('rating') else 0
-    contests_attended = contest.get('attendedContestsCount', 0) if contest else 0
-    ranking = user['profile'].get('ranking', 0) or 0
-    score = calculate_leetcode_score(data)
+    save_profiles_to_db([(username, data, college, batch, student_name)])
+
+@timed('db.save_leetcode_bulk')
+def save_profiles_to_db(items):
+    """Bulk upsert of (username, data, college, batch, student_name) tuples, skipping unchanged profiles."""
+    items = [item for item in items if item[1] and item[1].get('matchedUser')]
+    rows = [_leetcode_profile_row(username, data, college, batch, student_name)
+            for username, data, college, batch, student_name in items]
+    if not rows:
+        return 0
 
     conn = _get_db()
-    conn.execute("""
+    _schedule_refreshes(conn, 'leetcode', [(username, _lc_last_activity(data)) for username, data, *_ in items])
+    rows = _drop_unchanged(conn, 'leetcode_profiles', rows)
+    changed = {row[0] for row in rows}
+    history = [(username,) + h for username, data, *_ in items if username in changed
+               for h in _lc_history_rows(data.get('userContestRankingHistory'))]
+    cohorts = _profile_cohorts(conn, 'leetcode_profiles', changed) | {row[1:3] for row in rows}
+    conn.executemany("INSERT OR IGNORE INTO students (name, college, batch) VALUES (?, ?, ?)",
+                     [_student_key(row) for row in rows])
+    conn.executemany("""
         INSERT INTO leetcode_profiles
             (username, college, batch, student_name, easy, medium, hard, total_solved, contest_rating,
-             contests_attended, global_ranking, score, raw_json, fetched_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             contests_attended, global_ranking, score, raw_json, fetched_at, student_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                (SELECT id FROM students WHERE name = ? AND college = ? AND batch = ?))
         ON CONFLICT(username) DO UPDATE SET
             college=excluded.college, batch=excluded.batch, student_name=excluded.student_name,
             easy=excluded.easy, medium=excluded.medium, hard=excluded.hard,
             total_solved=excluded.total_solved, contest_rating=excluded.contest_rating,
             contests_attended=excluded.contests_attended, global_ranking=excluded.global_ranking,
-            score=excluded.score, raw_json=excluded.raw_json, fetched_at=excluded.fetched_at
-    """, (username, college, batch, student_name, easy, medium, hard, total, contest_rating,
-          contests_attended, ranking, score, json.dumps(data),
-          datetime.now().isoformat()))
+            score=excluded.score, raw_json=excluded.raw_json, fetched_at=excluded.fetched_at,
+            student_id=excluded.student_id
+    """, [row + _student_key(row) for row in rows])
+    _replace_contest_history(conn, 'leetcode_contest_history', changed, history)
+    _merge_calendars(conn, 'leetcode', {username: _calendar_counts(_lc_calendar_pairs(data))
+                                        for username, data, *_ in items if username in changed})
+    _refresh_cohort_ranks(conn, 'leetcode_profiles', cohorts)
     conn.commit()
     conn.close()
-
+    return len(items)
+
+# Narrowest dtypes that hold every value the APIs return; college/batch repeat across
+# thousands of rows so they are categoricals. cohort_rank is nullable until the first refresh.
+LC_PROFILE_DTYPES = {
+    'college': 'category', 'batch': 'category',
+    'easy': 'uint16', 'medium': 'uint16', 'hard': 'uint16', 'total_solved': 'uint16',
+    'contest_rating': 'float32', 'contests_attended': 'uint16', 'global_ranking': 'uint32',
+    'score': 'float32', 'cohort_rank': 'UInt32', 'cohort_percentile': 'float32',
+}
+
+@timed('db.load_leetcode')
 def load_all_profiles():
-    """Load all cached profiles from SQLite as a DataFrame."""
+    """Load all cached profiles from SQLite as a compactly typed DataFrame."""
     conn = _get_db()
     df = pd.read_sql_query(
         "SELECT username, student_name, college, batch, easy, medium, hard, total_solved, contest_rating, "
-        "contests_attended, global_ranking, score, fetched_at FROM leetcode_profiles "
-        "ORDER BY score DESC", conn)
+        "contests_attended, global_ranking, score, cohort_rank, cohort_percentile, fetched_at "
+        "FROM leetcode_profiles ORDER BY score DESC", conn,
+        dtype=LC_PROFILE_DTYPES, parse_dates=['fetched_at'])
     conn.close()
     return df
 
 def delete_profile_from_db(username):
     conn = _get_db()
-    cursor = conn.execute("DELETE FROM leetcode_profiles WHERE LOWER(username) = LOWER(?)", (username,))
-    deleted = cursor.rowcount
+    deleted = _delete_profiles(conn, 'leetcode', [username])
     conn.commit()
     conn.close()
     return deleted
 
+def load_stale_contest_histories(contests):
+    """Usernames in `contests` whose attended-contest count differs from the stored one."""
+    contests = {u: c for u, c in contests.items() if c}
+    conn = _get_db()
+    stored = conn.execute(
+        "SELECT username, contests_attended FROM leetcode_profiles "
+        "WHERE username IN (SELECT value FROM json_each(?))", (json.dumps(list(contests)),)).fetchall()
+    conn.close()
+    return [username for username, attended in stored
+            if (contests[username].get('attendedContestsCount') or 0) != attended]
+
+@timed('db.update_contests')
+def update_contest_stats_in_db(contests, histories=None):
+    """Update the contest columns, score and contest history of stored profiles in place."""
+    contests = {u: c for u, c in contests.items() if c}
+    histories = {u: h for u, h in (histories or {}).items() if u in contests and h is not None}
+    if not contests:
+        return 0
+
+    # stale users whose history was not fetched get a full refresh instead
+    stale = set(load_stale_contest_histories(contests)) - set(histories)
+    conn = _get_db()
+    stored = conn.execute(
+        "SELECT username, easy, medium, hard, global_ranking FROM leetcode_profiles "
+        "WHERE username IN (SELECT value FROM json_each(?))", (json.dumps(list(contests)),)).fetchall()
+
+    updates = []
+    for username, easy, medium, hard, ranking in stored:
+        contest = contests[username]
+        rating = contest.get('rating') or 0
+        attended = contest.get('attendedContestsCount', 0) or 0
+        score = _leetcode_score_from_stats(easy, medium, hard, rating, attended, ranking)
+        updates.append((round(rating, 2), attended, score, json.dumps(contest), username))
+
+    conn.executemany("""
+        UPDATE leetcode_profiles SET
+            contest_rating=?, contests_attended=?, score=?,
+            raw_json=json_set(COALESCE(raw_json, '{}'), '$.userContestRanking', json(?))
+        WHERE username=?
+    """, updates)
+    conn.executemany("""
+        UPDATE leetcode_profiles SET
+            raw_json=json_set(COALESCE(raw_json, '{}'), '$.userContestRankingHistory', json(?))
+        WHERE username=?
+    """, [(json.dumps(history), username) for username, history in histories.items()])
+    _replace_contest_history(conn, 'leetcode_contest_history', histories,
+                             [(username,) + h for username, history in histories.items()
+                              for h in _lc_history_rows(history)])
+    conn.execute("""
+        UPDATE refresh_schedule SET next_refresh_at = 0
+        WHERE platform = 'leetcode' AND username IN (SELECT value FROM json_each(?))
+    """, (json.dumps(list(stale)),))
+    _forget_checks(conn, 'leetcode_profiles', [update[-1] for update in updates])
+    _refresh_cohort_ranks(conn, 'leetcode_profiles', _profile_cohorts(conn, 'leetcode_profiles', contests))
+    conn.commit()
+    conn.close()
+    return len(updates)
+
 def clear_all_profiles():
     conn = _get_db()
     conn.execute("DELETE FROM leetcode_profiles")
+    _forget_checks(conn, 'leetcode_profiles')
+    conn.execute("DELETE FROM refresh_schedule WHERE platform = ?", ('leetcode',))
+    conn.execute("DELETE FROM leetcode_contest_history")
+    conn.execute("DELETE FROM leetcode_calendar")
+    _drop_orphan_students(conn)
     conn.commit()
     conn.close()
 
 def _get_cf_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = db.connect()
     conn.execute("""
         CREATE TABLE IF NOT EXISTS codeforces_profiles (
-            username TEXT PRIMARY KEY,
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
             college TEXT DEFAULT '',
             batch TEXT DEFAULT '',
             rating INTEGER DEFAULT 0,
@@ -134,14 +759,137 @@ def _get_cf_db():
         conn.execute("ALTER TABLE codeforces_profiles ADD COLUMN batch TEXT DEFAULT ''")
     if 'student_name' not in existing_cols:
         conn.execute("ALTER TABLE codeforces_profiles ADD COLUMN student_name TEXT DEFAULT ''")
+    _ensure_profile_id(conn, 'codeforces_profiles')
+    _ensure_students_table(conn)
+    _ensure_profile_checks_table(conn)
+    _ensure_change_feed(conn, 'codeforces', 'codeforces_profiles')
+    _ensure_refresh_schedule(conn, 'codeforces', 'codeforces_profiles')
+    _ensure_profile_search(conn, 'codeforces', 'codeforces_profiles')
+    _ensure_data_version(conn, 'codeforces', 'codeforces_profiles')
+    _ensure_cohort_aggregates(conn, 'codeforces', 'codeforces_profiles')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cf_username_nocase ON codeforces_profiles(LOWER(username))")
+    if 'student_id' not in existing_cols:
+        conn.execute("ALTER TABLE codeforces_profiles ADD COLUMN student_id INTEGER REFERENCES students(id)")
+        _link_students(conn, 'codeforces_profiles')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cf_student ON codeforces_profiles(student_id)")
+    if 'cohort_rank' not in existing_cols:
+        conn.execute("ALTER TABLE codeforces_profiles ADD COLUMN cohort_rank INTEGER")
+        conn.execute("ALTER TABLE codeforces_profiles ADD COLUMN cohort_percentile REAL")
+        _refresh_cohort_ranks(conn, 'codeforces_profiles')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cf_cohort_score ON codeforces_profiles(college, batch, score DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cf_cohort_pct ON codeforces_profiles(college, batch, cohort_percentile)")
+    # rating changes, one row per rated contest; backfilled from raw_json on first run
+    new_history = not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'codeforces_rating_history'").fetchone()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS codeforces_rating_history (
+            username TEXT NOT NULL,
+            contest_id INTEGER NOT NULL,
+            contest_name TEXT,
+            contest_rank INTEGER,
+            old_rating INTEGER,
+            new_rating INTEGER,
+            updated_at INTEGER,
+            PRIMARY KEY (username, contest_id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cf_history_time ON codeforces_rating_history(updated_at, contest_id)")
+    if new_history:
+        conn.execute("""
+            INSERT OR IGNORE INTO codeforces_rating_history
+            SELECT p.username, json_extract(h.value, '$.contestId'), json_extract(h.value, '$.contestName'),
+                   json_extract(h.value, '$.rank'), json_extract(h.value, '$.oldRating'),
+                   json_extract(h.value, '$.newRating'), json_extract(h.value, '$.ratingUpdateTimeSeconds')
+            FROM codeforces_profiles p, json_each(p.raw_json, '$.ratingHistory') h
+            WHERE json_valid(p.raw_json)
+        """)
+    # local copy of problemset.problems, refreshed by refresh_cf_problemset()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cf_problems (
+            contest_id INTEGER NOT NULL,
+            problem_index TEXT NOT NULL,
+            name TEXT,
+            rating INTEGER,
+            PRIMARY KEY (contest_id, problem_index)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cf_problem_tags (
+            contest_id INTEGER NOT NULL,
+            problem_index TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (contest_id, problem_index, tag)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cf_problemset_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            fetched_at REAL,
+            problem_count INTEGER
+        )
+    """)
+    # one row per problem a stored profile has solved; backfilled from raw_json on first run
+    new_solved = not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cf_solved'").fetchone()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cf_solved (
+            username TEXT NOT NULL,
+            contest_id INTEGER NOT NULL,
+            problem_index TEXT NOT NULL,
+            solved_at INTEGER,
+            rating INTEGER,
+            PRIMARY KEY (username, contest_id, problem_index)
+        ) WITHOUT ROWID
+    """)
+    if new_solved:
+        conn.execute("""
+            INSERT INTO cf_solved
+            SELECT p.username, json_extract(s.value, '$.problem.contestId'), json_extract(s.value, '$.problem.index'),
+                   MIN(json_extract(s.value, '$.creationTimeSeconds')), MAX(json_extract(s.value, '$.problem.rating'))
+            FROM codeforces_profiles p, json_each(p.raw_json, '$.submissions') s
+            WHERE json_valid(p.raw_json) AND json_extract(s.value, '$.verdict') = 'OK'
+              AND json_extract(s.value, '$.problem.contestId') IS NOT NULL
+              AND json_extract(s.value, '$.problem.index') IS NOT NULL
+            GROUP BY 1, 2, 3
+        """)
+    _ensure_calendar_table(conn, 'codeforces')
+    ensure_profile_versions(conn, 'codeforces_profiles')
     conn.commit()
     return conn
 
-def save_cf_profile_to_db(username, data, college='', batch='', student_name=''):
-    """Extract stats from Codeforces API data and upsert into SQLite."""
-    if not data or not data.get('user'):
-        return
-
+def _cf_solved_rows(submissions):
+    """(contest_id, problem_index, solved_at, rating) per distinct accepted problem, earliest acceptance kept."""
+    solved = {}
+    for sub in submissions or []:
+        problem = sub.get('problem', {})
+        if sub.get('verdict') != 'OK' or 'contestId' not in problem or 'index' not in problem:
+            continue
+        key = (problem['contestId'], problem['index'])
+        at = sub.get('creationTimeSeconds')
+        if key not in solved or (at or 0) < (solved[key][0] or 0):
+            solved[key] = (at, problem.get('rating'))
+    return [key + value for key, value in solved.items()]
+
+def _cf_problem_ratings(conn, keys):
+    """{(contest_id, problem_index): rating} from the cached problemset for the given problems."""
+    if not keys:
+        return {}
+    rows = conn.execute("""
+        SELECT contest_id, problem_index, rating FROM cf_problems
+        WHERE rating IS NOT NULL AND (contest_id, problem_index) IN
+            (SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?))
+    """, (json.dumps(list(keys)),)).fetchall()
+    return {(contest_id, index): rating for contest_id, index, rating in rows}
+
+def _cf_unrated_solved(submissions):
+    """(contestId, index) of accepted submissions whose payload carries no problem rating."""
+    return {(sub['problem']['contestId'], sub['problem']['index']) for sub in submissions or []
+            if sub.get('verdict') == 'OK' and 'rating' not in sub.get('problem', {})
+            and 'contestId' in sub['problem'] and 'index' in sub['problem']}
+
+def _codeforces_profile_row(username, data, college, batch, student_name, ratings=None):
+    """`ratings` fills in problem ratings missing from the submissions (see _cf_problem_ratings)."""
+    ratings = ratings or {}
     user = data['user']
     rating_history = data.get('ratingHistory', [])
     submissions = data.get('submissions', [])
@@ -159,45 +907,105 @@ def save_cf_profile_to_db(username, data, college='', batch='', student_name='')
             if 'contestId' in problem and 'index' in problem:
                 problem_id = f"{problem['contestId']}-{problem['index']}"
                 solved_problems.add(problem_id)
-                if 'rating' in problem:
-                    problem_ratings.append(problem['rating'])
+                rating_value = problem.get('rating') or ratings.get((problem['contestId'], problem['index']))
+                if rating_value:
+                    problem_ratings.append(rating_value)
 
     problems_solved = len(solved_problems)
     avg_problem_rating = int(sum(problem_ratings) / len(problem_ratings)) if problem_ratings else 0
     score = calculate_codeforces_score(data)
 
+    return (username, college, batch, student_name, rating, max_rating, rank, problems_solved,
+            contests_attended, avg_problem_rating, score, json.dumps(data), datetime.now().isoformat())
+
+def _cf_history_rows(rating_history):
+    """(contest_id, contest_name, contest_rank, old_rating, new_rating, updated_at) per rating change, oldest first."""
+    return [(h['contestId'], h.get('contestName'), h.get('rank'), h.get('oldRating'), h.get('newRating'),
+             h.get('ratingUpdateTimeSeconds'))
+            for h in rating_history or []]
+
+def _cf_calendar_pairs(data):
+    """(unix seconds, 1) for every fetched submission."""
+    return [(sub['creationTimeSeconds'], 1) for sub in data.get('submissions') or [] if sub.get('creationTimeSeconds')]
+
+def _cf_last_activity(data):
+    """Unix time of the newest submission or rating change, or None."""
+    times = [sub.get('creationTimeSeconds') or 0 for sub in data.get('submissions') or []]
+    times += [h.get('ratingUpdateTimeSeconds') or 0 for h in data.get('ratingHistory') or []]
+    return max(times, default=None) or None
+
+@timed('db.save_codeforces')
+def save_cf_profile_to_db(username, data, college='', batch='', student_name=''):
+    """Extract stats from Codeforces API data and upsert into SQLite."""
+    save_cf_profiles_to_db([(username, data, college, batch, student_name)])
+
+@timed('db.save_codeforces_bulk')
+def save_cf_profiles_to_db(items):
+    """Bulk upsert of (username, data, college, batch, student_name) tuples, skipping unchanged profiles."""
+    items = [item for item in items if item[1] and item[1].get('user')]
+    if not items:
+        return 0
+
     conn = _get_cf_db()
-    conn.execute("""
+    ratings = _cf_problem_ratings(conn, set().union(*(_cf_unrated_solved(data.get('submissions'))
+                                                     for _, data, *_ in items)))
+    rows = [_codeforces_profile_row(username, data, college, batch, student_name, ratings)
+            for username, data, college, batch, student_name in items]
+    _schedule_refreshes(conn, 'codeforces', [(username, _cf_last_activity(data)) for username, data, *_ in items])
+    rows = _drop_unchanged(conn, 'codeforces_profiles', rows)
+    changed = {row[0] for row in rows}
+    history = [(username,) + h for username, data, *_ in items if username in changed
+               for h in _cf_history_rows(data.get('ratingHistory'))]
+    solved = [(username,) + s for username, data, *_ in items if username in changed
+              for s in _cf_solved_rows(data.get('submissions'))]
+    cohorts = _profile_cohorts(conn, 'codeforces_profiles', changed) | {row[1:3] for row in rows}
+    conn.executemany("INSERT OR IGNORE INTO students (name, college, batch) VALUES (?, ?, ?)",
+                     [_student_key(row) for row in rows])
+    conn.executemany("""
         INSERT INTO codeforces_profiles
             (username, college, batch, student_name, rating, max_rating, rank, problems_solved,
-             contests_attended, avg_problem_rating, score, raw_json, fetched_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             contests_attended, avg_problem_rating, score, raw_json, fetched_at, student_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                (SELECT id FROM students WHERE name = ? AND college = ? AND batch = ?))
         ON CONFLICT(username) DO UPDATE SET
             college=excluded.college, batch=excluded.batch, student_name=excluded.student_name,
             rating=excluded.rating, max_rating=excluded.max_rating, rank=excluded.rank,
             problems_solved=excluded.problems_solved, contests_attended=excluded.contests_attended,
             avg_problem_rating=excluded.avg_problem_rating, score=excluded.score,
-            raw_json=excluded.raw_json, fetched_at=excluded.fetched_at
-    """, (username, college, batch, student_name, rating, max_rating, rank, problems_solved,
-          contests_attended, avg_problem_rating, score, json.dumps(data),
-          datetime.now().isoformat()))
+            raw_json=excluded.raw_json, fetched_at=excluded.fetched_at,
+            student_id=excluded.student_id
+    """, [row + _student_key(row) for row in rows])
+    _replace_contest_history(conn, 'codeforces_rating_history', changed, history)
+    _replace_contest_history(conn, 'cf_solved', changed, solved)
+    _merge_calendars(conn, 'codeforces', {username: _calendar_counts(_cf_calendar_pairs(data))
+                                          for username, data, *_ in items if username in changed})
+    _refresh_cohort_ranks(conn, 'codeforces_profiles', cohorts)
     conn.commit()
     conn.close()
+    return len(items)
+
+CF_PROFILE_DTYPES = {
+    'college': 'category', 'batch': 'category', 'rank': 'category',
+    'rating': 'int16', 'max_rating': 'int16', 'problems_solved': 'uint16',
+    'contests_attended': 'uint16', 'avg_problem_rating': 'int16',
+    'score': 'float32', 'cohort_rank': 'UInt32', 'cohort_percentile': 'float32',
+}
 
+@timed('db.load_codeforces')
 def load_all_cf_profiles():
-    """Load all cached Codeforces profiles from SQLite as a DataFrame."""
+    """Load all cached Codeforces profiles from SQLite as a compactly typed DataFrame."""
     conn = _get_cf_db()
     df = pd.read_sql_query(
         "SELECT username, student_name, college, batch, rating, max_rating, rank, problems_solved, "
-        "contests_attended, avg_problem_rating, score, fetched_at FROM codeforces_profiles "
-        "ORDER BY score DESC", conn)
+        "contests_attended, avg_problem_rating, score, cohort_rank, cohort_percentile, fetched_at "
+        "FROM codeforces_profiles ORDER BY score DESC", conn,
+        dtype=CF_PROFILE_DTYPES, parse_dates=['fetched_at'])
     conn.close()
     return df
 
 def delete_cf_profile_from_db(username):
     conn = _get_cf_db()
-    cursor = conn.execute("DELETE FROM codeforces_profiles WHERE LOWER(username) = LOWER(?)", (username,))
-    deleted = cursor.rowcount
+    deleted = _delete_profiles(conn, 'codeforces', [username])
     conn.commit()
     conn.close()
     return deleted
@@ -205,12 +1013,890 @@ def delete_cf_profile_from_db(username):
 def clear_all_cf_profiles():
     conn = _get_cf_db()
     conn.execute("DELETE FROM codeforces_profiles")
+    _forget_checks(conn, 'codeforces_profiles')
+    conn.execute("DELETE FROM refresh_schedule WHERE platform = ?", ('codeforces',))
+    conn.execute("DELETE FROM codeforces_rating_history")
+    conn.execute("DELETE FROM cf_solved")
+    conn.execute("DELETE FROM codeforces_calendar")
+    _drop_orphan_students(conn)
     conn.commit()
     conn.close()
 
+PROFILE_TABLES = {'leetcode': 'leetcode_profiles', 'codeforces': 'codeforces_profiles'}
+
+def _profile_db(platform):
+    return _get_db() if platform == 'leetcode' else _get_cf_db()
+
+def load_data_version(platform):
+    """Current write counter of a platform's profile table (see _ensure_data_version)."""
+    conn = _profile_db(platform)
+    version = conn.execute("SELECT version FROM data_versions WHERE platform = ?", (platform,)).fetchone()[0]
+    conn.close()
+    return version
+
+def get_cohort_standing(platform, username):
+    """(college, batch, cohort_rank, cohort_percentile) for one stored profile, or None."""
+    conn = _profile_db(platform)
+    row = conn.execute(
+        f"SELECT college, batch, cohort_rank, cohort_percentile FROM {PROFILE_TABLES[platform]} "
+        "WHERE username = ?", (username,)).fetchone()
+    conn.close()
+    return row
+
+def load_top_percent(platform, college, batch, percent=10):
+    """Profiles in the top `percent` of one college/batch, read straight off the percentile index."""
+    conn = _profile_db(platform)
+    df = pd.read_sql_query(
+        f"SELECT username, student_name, score, cohort_rank, cohort_percentile FROM {PROFILE_TABLES[platform]} "
+        "WHERE college = ? AND batch = ? AND cohort_percentile > ? ORDER BY cohort_rank",
+        conn, params=(college, batch, 100 - percent))
+    conn.close()
+    return df
+
+@timed('db.load_combined')
+def load_combined_leaderboard(college=None, batch=None):
+    """One row per student with both platform profiles joined in SQL, best combined score first."""
+    _get_cf_db().close()  # make sure both profile tables exist
+    conn = _get_db()
+    df = pd.read_sql_query("""
+        SELECT s.name AS student_name, s.college, s.batch,
+               lc.username AS leetcode_username, lc.total_solved AS leetcode_solved,
+               lc.contest_rating AS leetcode_rating, lc.score AS leetcode_score,
+               cf.username AS codeforces_username, cf.problems_solved AS codeforces_solved,
+               cf.rating AS codeforces_rating, cf.score AS codeforces_score,
+               ROUND((COALESCE(lc.score, 0) + COALESCE(cf.score, 0)) / 2.0, 2) AS combined_score
+        FROM students s
+        LEFT JOIN leetcode_profiles lc ON lc.student_id = s.id
+        LEFT JOIN codeforces_profiles cf ON cf.student_id = s.id
+        WHERE (lc.username IS NOT NULL OR cf.username IS NOT NULL)
+          AND (? IS NULL OR s.college = ?) AND (? IS NULL OR s.batch = ?)
+        ORDER BY combined_score DESC
+    """, conn, params=(college, college, batch, batch))
+    conn.close()
+    return df
+
+def load_student_cohorts():
+    """Distinct (college, batch) pairs that have at least one profile."""
+    _get_cf_db().close()
+    conn = _get_db()
+    rows = conn.execute("""
+        SELECT DISTINCT s.college, s.batch FROM students s
+        WHERE EXISTS (SELECT 1 FROM leetcode_profiles WHERE student_id = s.id)
+           OR EXISTS (SELECT 1 FROM codeforces_profiles WHERE student_id = s.id)
+    """).fetchall()
+    conn.close()
+    return rows
+
+# table, columns (as produced by _lc_history_rows / _cf_history_rows), rating column, time column
+CONTEST_HISTORY = {
+    'leetcode': ('leetcode_contest_history', ['contest_title', 'start_time', 'rating', 'ranking'],
+                 'rating', 'start_time'),
+    'codeforces': ('codeforces_rating_history',
+                   ['contest_id', 'contest_name', 'contest_rank', 'old_rating', 'new_rating', 'updated_at'],
+                   'new_rating', 'updated_at'),
+}
+
+def _contest_history_frame(platform, rows):
+    """DataFrame of pre-shaped history rows with a parsed `date` column."""
+    _, columns, _, time_col = CONTEST_HISTORY[platform]
+    df = pd.DataFrame(rows, columns=columns)
+    df['date'] = pd.to_datetime(df[time_col], unit='s')
+    return df
+
+def load_contest_history(platform, username):
+    """Stored contest history of one profile, oldest first."""
+    table, columns, _, time_col = CONTEST_HISTORY[platform]
+    conn = _profile_db(platform)
+    rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE username = ? ORDER BY {time_col}",
+                        (username,)).fetchall()
+    conn.close()
+    return _contest_history_frame(platform, rows)
+
+@timed('db.load_trajectory')
+def load_cohort_rating_trajectory(platform, college=None, batch=None, last_n=10):
+    """Average participant rating in each of a cohort's last `last_n` contests, oldest first."""
+    table, _, rating_col, time_col = CONTEST_HISTORY[platform]
+    contest_key, contest_label = (('contest_title', 'contest_title') if platform == 'leetcode'
+                                  else ('contest_id', 'MAX(h.contest_name)'))
+    conn = _profile_db(platform)
+    df = pd.read_sql_query(f"""
+        SELECT {contest_label} AS contest, MAX(h.{time_col}) AS ts,
+               ROUND(AVG(h.{rating_col}), 1) AS avg_rating, COUNT(*) AS participants
+        FROM {table} h JOIN {PROFILE_TABLES[platform]} p ON p.username = h.username
+        WHERE (? IS NULL OR p.college = ?) AND (? IS NULL OR p.batch = ?)
+        GROUP BY h.{contest_key}
+        ORDER BY ts DESC
+        LIMIT ?
+    """, conn, params=(college, college, batch, batch, last_n))
+    conn.close()
+    df = df.iloc[::-1].reset_index(drop=True)
+    df['date'] = pd.to_datetime(df.pop('ts'), unit='s')
+    return df[['contest', 'date', 'avg_rating', 'participants']]
+
+@timed('db.load_cf_tags')
+def load_cf_tag_counts(college=None, batch=None, username=None):
+    """Solved problems per tag (tag, solved, students) for one student or a cohort."""
+    conn = _get_cf_db()
+    df = pd.read_sql_query("""
+        SELECT t.tag, COUNT(*) AS solved, COUNT(DISTINCT s.username) AS students
+        FROM codeforces_profiles p
+        JOIN cf_solved s ON s.username = p.username
+        JOIN cf_problem_tags t ON t.contest_id = s.contest_id AND t.problem_index = s.problem_index
+        WHERE (? IS NULL OR p.college = ?) AND (? IS NULL OR p.batch = ?) AND (? IS NULL OR p.username = ?)
+        GROUP BY t.tag
+        ORDER BY solved DESC, t.tag
+    """, conn, params=(college, college, batch, batch, username, username))
+    conn.close()
+    return df
+
+@timed('db.load_cf_difficulty')
+def load_cf_difficulty_counts(college=None, batch=None, username=None):
+    """Solved problems per problem rating (rating, solved, students) for one student or a cohort."""
+    conn = _get_cf_db()
+    df = pd.read_sql_query("""
+        SELECT COALESCE(s.rating, q.rating) AS rating, COUNT(*) AS solved, COUNT(DISTINCT s.username) AS students
+        FROM codeforces_profiles p
+        JOIN cf_solved s ON s.username = p.username
+        LEFT JOIN cf_problems q ON q.contest_id = s.contest_id AND q.problem_index = s.problem_index
+        WHERE (? IS NULL OR p.college = ?) AND (? IS NULL OR p.batch = ?) AND (? IS NULL OR p.username = ?)
+          AND COALESCE(s.rating, q.rating) IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1
+    """, conn, params=(college, college, batch, batch, username, username))
+    conn.close()
+    return df
+
+def load_calendar_years(platform):
+    """Years with a stored submission calendar, oldest first."""
+    conn = _profile_db(platform)
+    years = [year for (year,) in conn.execute(
+        f"SELECT DISTINCT year FROM {CALENDAR_TABLES[platform]} ORDER BY year")]
+    conn.close()
+    return years
+
+@timed('db.load_calendar')
+def load_calendar_matrix(platform, year, college=None, batch=None):
+    """(usernames, students x CALENDAR_DAYS uint16 array) of a cohort's daily submissions in `year`."""
+    conn = _profile_db(platform)
+    rows = conn.execute(f"""
+        SELECT c.username, c.counts
+        FROM {CALENDAR_TABLES[platform]} c JOIN {PROFILE_TABLES[platform]} p ON p.username = c.username
+        WHERE c.year = ? AND (? IS NULL OR p.college = ?) AND (? IS NULL OR p.batch = ?)
+        ORDER BY c.username
+    """, (year, college, college, batch, batch)).fetchall()
+    conn.close()
+    matrix = np.frombuffer(b''.join(counts for _, counts in rows), dtype='<u2').reshape(len(rows), CALENDAR_DAYS)
+    return [username for username, _ in rows], matrix
+
+def _calendar_span(year):
+    """(days in `year`, days elapsed in `year` up to and including today)."""
+    start = np.datetime64(f'{year}-01-01', 'D')
+    days = int((np.datetime64(f'{year + 1}-01-01', 'D') - start).astype(np.int64))
+    return days, max(0, min(days, int((np.datetime64('today', 'D') - start).astype(np.int64)) + 1))
+
+def calendar_streaks(matrix, year):
+    """Per-student active_days, longest_streak and current_streak over `year` so far."""
+    active = matrix[:, :_calendar_span(year)[1]] > 0
+    run = np.cumsum(active, axis=1, dtype=np.int32)
+    run -= np.maximum.accumulate(np.where(active, 0, run), axis=1)
+    longest = run.max(axis=1, initial=0)
+    if run.shape[1] >= 2:
+        current = np.where(active[:, -1], run[:, -1], run[:, -2])
+    else:
+        current = run[:, -1] if run.shape[1] else np.zeros(len(matrix), dtype=np.int32)
+    return pd.DataFrame({'active_days': active.sum(axis=1), 'longest_streak': longest, 'current_streak': current})
+
+def calendar_heatmap(totals, year):
+    """(7 x 54 weekday-by-week grid of `totals`, matching dates) for a GitHub-style heatmap."""
+    days = _calendar_span(year)[0]
+    start = np.datetime64(f'{year}-01-01', 'D')
+    position = np.arange(days) + (int(start.astype(np.int64)) + 3) % 7  # 1970-01-01 was a Thursday
+    grid = np.full((7, 54), np.nan)
+    dates = np.full((7, 54), '', dtype=object)
+    grid[position % 7, position // 7] = totals[:days]
+    dates[position % 7, position // 7] = (start + np.arange(days)).astype(str)
+    return grid, dates
+
+@timed('db.load_changes')
+def load_changes_since(since, platform=None, fields=None, limit=1000):
+    """Change-feed rows after `since` (datetime or unix seconds) with student and cohort, newest first."""
+    if isinstance(since, datetime):
+        since = since.timestamp()
+    field_list = None if fields is None else json.dumps(list(fields))
+    _get_cf_db().close()
+    conn = _get_db()
+    df = pd.read_sql_query("""
+        SELECT c.id, c.platform, c.username, COALESCE(lc.student_name, cf.student_name) AS student_name,
+               COALESCE(lc.college, cf.college) AS college, COALESCE(lc.batch, cf.batch) AS batch,
+               c.field, c.old_value, c.new_value,
+               CASE WHEN typeof(c.new_value) IN ('integer', 'real') AND typeof(c.old_value) IN ('integer', 'real')
+                    THEN ROUND(c.new_value - c.old_value, 2) END AS delta,
+               datetime(c.changed_at, 'unixepoch', 'localtime') AS changed_at
+        FROM profile_changes c
+        LEFT JOIN leetcode_profiles lc ON c.platform = 'leetcode' AND lc.username = c.username
+        LEFT JOIN codeforces_profiles cf ON c.platform = 'codeforces' AND cf.username = c.username
+        WHERE c.changed_at > ? AND (? IS NULL OR c.platform = ?)
+          AND (? IS NULL OR c.field IN (SELECT value FROM json_each(?)))
+        ORDER BY c.changed_at DESC, c.id DESC
+        LIMIT ?
+    """, conn, params=(since, platform, platform, field_list, field_list, limit), parse_dates=['changed_at'])
+    conn.close()
+    return df
+
+CHANGE_FEED_WINDOWS = {"Last hour": 1, "Last 24 hours": 24, "Last 7 days": 7 * 24, "Last 30 days": 30 * 24}
+
+def display_change_feed(platform):
+    """Who solved new problems or moved in rating within a chosen window."""
+    window = st.select_slider("Window", options=list(CHANGE_FEED_WINDOWS), value="Last 24 hours",
+                              key=f"{platform}_changes_window")
+    changes = load_changes_since(time.time() - CHANGE_FEED_WINDOWS[window] * 3600, platform)
+    if changes.empty:
+        st.info("No changes recorded in this window.")
+        return
+
+    solved_field, rating_field = (('total_solved', 'contest_rating') if platform == 'leetcode'
+                                  else ('problems_solved', 'rating'))
+    solved = changes[(changes['field'] == solved_field) & (changes['delta'] > 0)]
+    rating = changes[changes['field'] == rating_field]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Students with New Solves", solved['username'].nunique())
+    c2.metric("Problems Solved", int(solved['delta'].sum()))
+    c3.metric("Rating Changes", rating['username'].nunique())
+
+    st.dataframe(changes.drop(columns=['id', 'platform']).rename(columns={
+        'username': 'Username', 'student_name': 'Name', 'college': 'College', 'batch': 'Batch',
+        'field': 'Field', 'old_value': 'Old', 'new_value': 'New', 'delta': 'Change', 'changed_at': 'At'}),
+        use_container_width=True, hide_index=True)
+
+def _fts_prefix_query(text):
+    """User input -> FTS5 query where every word must match as a prefix."""
+    words = ''.join(c if c.isalnum() else ' ' for c in text).split()
+    return ' '.join(f'"{w}"*' for w in words)
+
+@timed('db.search')
+def search_profiles(text, platform=None, limit=50):
+    """Stored profiles whose username, student name or college words start with the words of `text`."""
+    query = _fts_prefix_query(text)
+    if not query:
+        return pd.DataFrame(columns=['platform', 'username', 'student_name', 'college', 'batch', 'score'])
+    _get_cf_db().close()
+    conn = _get_db()
+    df = pd.read_sql_query("""
+        SELECT s.platform, s.username, s.student_name, s.college,
+               COALESCE(lc.batch, cf.batch) AS batch, COALESCE(lc.score, cf.score) AS score
+        FROM profile_search s
+        LEFT JOIN leetcode_profiles lc ON s.platform = 'leetcode' AND lc.id = s.rowid / 2
+        LEFT JOIN codeforces_profiles cf ON s.platform = 'codeforces' AND cf.id = s.rowid / 2
+        WHERE profile_search MATCH ? AND (? IS NULL OR s.platform = ?)
+        ORDER BY bm25(profile_search)
+        LIMIT ?
+    """, conn, params=(query, platform, platform, limit))
+    conn.close()
+    return df
+
+# ---- Bulk profile operations ----
+def _select_profiles(conn, platform, usernames=None, college=None, batch=None):
+    """(username, college, batch, student_name) of profiles matching usernames and/or a college/batch filter."""
+    if usernames is None and college is None and batch is None:
+        raise ValueError("Bulk operations need a username list or a college/batch filter")
+    names = None if usernames is None else json.dumps(list(usernames))
+    return conn.execute(f"""
+        SELECT username, college, batch, student_name FROM {PROFILE_TABLES[platform]}
+        WHERE (? IS NULL OR LOWER(username) IN (SELECT LOWER(value) FROM json_each(?)))
+          AND (? IS NULL OR college = ?) AND (? IS NULL OR batch = ?)
+    """, (names, names, college, college, batch, batch)).fetchall()
+
+def _drop_orphan_students(conn):
+    """Remove students no longer linked from either profile table."""
+    tables = [table for (table,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(PROFILE_TABLES.values())),))]
+    conn.execute("DELETE FROM students WHERE " + " AND ".join(
+        f"NOT EXISTS (SELECT 1 FROM {table} WHERE student_id = students.id)" for table in tables))
+
+@timed('db.bulk_delete')
+def bulk_delete_profiles(platform, usernames=None, college=None, batch=None):
+    """Delete every matching profile in one transaction; returns the number deleted."""
+    conn = _profile_db(platform)
+    selected = _select_profiles(conn, platform, usernames, college, batch)
+    deleted = _delete_profiles(conn, platform, [row[0] for row in selected])
+    conn.commit()
+    conn.close()
+    return deleted
+
+@timed('db.bulk_move')
+def bulk_move_profiles(platform, to_college=None, to_batch=None, usernames=None, college=None, batch=None):
+    """Move matching profiles to `to_college` and/or `to_batch`; returns the number moved."""
+    table = PROFILE_TABLES[platform]
+    conn = _profile_db(platform)
+    selected = _select_profiles(conn, platform, usernames, college, batch)
+    names = [row[0] for row in selected]
+    conn.execute(f"""
+        UPDATE {table} SET college = COALESCE(?, college), batch = COALESCE(?, batch)
+        WHERE username IN (SELECT value FROM json_each(?))
+    """, (to_college, to_batch, json.dumps(names)))
+    _link_students(conn, table, names)
+    _forget_checks(conn, table, names)
+    _drop_orphan_students(conn)
+    _refresh_cohort_ranks(conn, table, {row[1:3] for row in selected} | _profile_cohorts(conn, table, names))
+    conn.commit()
+    conn.close()
+    return len(names)
+
+@timed('db.rename_label')
+def rename_cohort_label(field, old, new):
+    """Rename (or merge into) a college or batch label on both platforms; returns the profiles changed."""
+    if field not in ('college', 'batch'):
+        raise ValueError(f"Can only rename college or batch labels, not {field!r}")
+    _get_cf_db().close()
+    conn = _get_db()
+    changed = 0
+    conn.execute(f"UPDATE OR IGNORE students SET {field} = ? WHERE {field} = ?", (new, old))
+    for table in PROFILE_TABLES.values():
+        names = [username for (username,) in conn.execute(
+            f"UPDATE {table} SET {field} = ? WHERE {field} = ? RETURNING username", (new, old))]
+        _link_students(conn, table, names)
+        _forget_checks(conn, table, names)
+        _refresh_cohort_ranks(conn, table, _profile_cohorts(conn, table, names))
+        changed += len(names)
+    _drop_orphan_students(conn)
+    conn.commit()
+    conn.close()
+    return changed
+
+def bulk_refresh_profiles(platform, usernames=None, college=None, batch=None):
+    """Mark every matching profile due for refresh and queue it for the background workers."""
+    conn = _profile_db(platform)
+    selected = _select_profiles(conn, platform, usernames, college, batch)
+    conn.execute("""
+        UPDATE refresh_schedule SET next_refresh_at = 0
+        WHERE platform = ? AND username IN (SELECT value FROM json_each(?))
+    """, (platform, json.dumps([row[0] for row in selected])))
+    conn.commit()
+    conn.close()
+    return enqueue_fetch_jobs(platform, selected)
+
+def _confirm_box(label, key, disabled=False):
+    """Checkbox that destructive buttons require; cleared again after the action ran (see _confirmed_done)."""
+    if st.session_state.pop(f"{key}_reset", False):
+        st.session_state[key] = False
+    return st.checkbox(label, key=key, disabled=disabled)
+
+def _confirmed_done(key, message, result_key):
+    st.session_state[f"{key}_reset"] = True
+    st.session_state[result_key] = message
+    st.rerun()
+
+def display_bulk_actions(platform, cached_df, college, batch, key_prefix):
+    """Confirmed delete / move / rename, and refresh, for a picked list or the current college/batch filter."""
+    result_key = f"{key_prefix}_bulk_result"
+    st.markdown("**Bulk actions**")
+    scope = st.radio("Apply to", ["Selected profiles", "Current filter"], horizontal=True,
+                     key=f"{key_prefix}_bulk_scope")
+    if scope == "Selected profiles":
+        picked = st.multiselect("Profiles", cached_df['username'].tolist(), key=f"{key_prefix}_bulk_users")
+        target = {'usernames': picked} if picked else None
+        affected = len(picked)
+    else:
+        target = {'college': college, 'batch': batch} if college or batch else None
+        in_filter = pd.Series(True, index=cached_df.index)
+        if college:
+            in_filter &= cached_df['college'] == college
+        if batch:
+            in_filter &= cached_df['batch'] == batch
+        affected = int(in_filter.sum())
+        st.caption(f"College: {college or 'All'}, Batch: {batch or 'All'} ({affected} profile(s))")
+
+    m1, m2 = st.columns(2)
+    with m1:
+        to_college = st.text_input("Move to college", key=f"{key_prefix}_bulk_college").strip()
+    with m2:
+        to_batch = st.text_input("Move to batch", key=f"{key_prefix}_bulk_batch").strip()
+
+    confirm_key = f"{key_prefix}_bulk_confirm"
+    confirmed = _confirm_box(f"Yes, delete or move these {affected} profile(s)", confirm_key,
+                             disabled=target is None)
+    b1, b2, b3 = st.columns(3)
+    with b1:
+        if st.button("Delete", key=f"{key_prefix}_bulk_delete", disabled=target is None or not confirmed):
+            _confirmed_done(confirm_key, f"Deleted {bulk_delete_profiles(platform, **target)} profile(s).",
+                            result_key)
+    with b2:
+        if st.button("Move", key=f"{key_prefix}_bulk_move",
+                     disabled=target is None or not confirmed or not (to_college or to_batch)):
+            moved = bulk_move_profiles(platform, to_college or None, to_batch or None, **target)
+            _confirmed_done(confirm_key, f"Moved {moved} profile(s).", result_key)
+    with b3:
+        if st.button("Refresh", key=f"{key_prefix}_bulk_refresh", disabled=target is None,
+                     help="Mark due and queue for fetch_workers.py"):
+            st.session_state[result_key] = f"Queued {bulk_refresh_profiles(platform, **target)} profile(s)."
+    if result_key in st.session_state:
+        st.success(st.session_state.pop(result_key))
+
+    st.markdown("**Rename a label** (both platforms)")
+    r1, r2, r3 = st.columns(3)
+    with r1:
+        field = st.selectbox("Field", ["college", "batch"], key=f"{key_prefix}_rename_field")
+    with r2:
+        old = st.selectbox("From", sorted(cached_df[field].unique().tolist()), key=f"{key_prefix}_rename_old")
+    with r3:
+        new = st.text_input("To", key=f"{key_prefix}_rename_new").strip()
+    rename_key = f"{key_prefix}_rename_confirm"
+    confirmed = _confirm_box(f"Yes, rename {field} '{old}' to '{new}' on both platforms", rename_key,
+                             disabled=not new or new == old)
+    if st.button("Rename", key=f"{key_prefix}_rename", disabled=not new or new == old or not confirmed):
+        renamed = rename_cohort_label(field, old, new)
+        _confirmed_done(rename_key, f"Renamed {field} on {renamed} profile(s).", result_key)
+
+# ---- Refresh scheduling ----
+def load_due_refreshes(platform, limit=None):
+    """(username, college, batch, student_name) of profiles whose refresh is due, most overdue first."""
+    conn = _profile_db(platform)
+    rows = conn.execute(f"""
+        SELECT p.username, p.college, p.batch, p.student_name
+        FROM refresh_schedule r JOIN {PROFILE_TABLES[platform]} p ON p.username = r.username
+        WHERE r.platform = ? AND r.next_refresh_at <= ?
+        ORDER BY r.next_refresh_at
+        LIMIT ?
+    """, (platform, time.time(), -1 if limit is None else limit)).fetchall()
+    conn.close()
+    return rows
+
+def load_refresh_schedule_summary(platform):
+    """Due now, next due time and profile count per refresh interval."""
+    conn = _profile_db(platform)
+    now = time.time()
+    due, next_due = conn.execute(
+        "SELECT SUM(next_refresh_at <= ?), MIN(CASE WHEN next_refresh_at > ? THEN next_refresh_at END) "
+        "FROM refresh_schedule WHERE platform = ?", (now, now, platform)).fetchone()
+    intervals = conn.execute(
+        "SELECT interval_s, COUNT(*) FROM refresh_schedule WHERE platform = ? GROUP BY interval_s ORDER BY interval_s",
+        (platform,)).fetchall()
+    conn.close()
+    return {'due': due or 0, 'next_due': next_due, 'intervals': intervals}
+
+def enqueue_due_refreshes(platform, limit=None):
+    """Queue every profile whose refresh is due for the background workers."""
+    return enqueue_fetch_jobs(platform, load_due_refreshes(platform, limit))
+
+def _format_interval(seconds):
+    if seconds >= 86400:
+        return f"{seconds / 86400:g}d"
+    return f"{seconds / 3600:g}h"
+
+def display_refresh_schedule(platform):
+    """Due count, interval spread and a button to queue the due profiles."""
+    summary = load_refresh_schedule_summary(platform)
+    spread = ", ".join(f"{n} every {_format_interval(interval)}" for interval, n in summary['intervals'])
+    next_due = (f", next at {datetime.fromtimestamp(summary['next_due']).strftime('%Y-%m-%d %H:%M')}"
+                if summary['next_due'] else "")
+    st.caption(f"Refresh schedule: {summary['due']} due now{next_due}. {spread}")
+    if summary['due'] and st.button(f"Queue {summary['due']} Due Refresh(es)", key=f"{platform}_queue_due",
+                                    help="Active students come due hourly, dormant ones back off up to weekly."):
+        queued = enqueue_due_refreshes(platform)
+        st.success(f"Queued {queued} profile(s). Run `python fetch_workers.py --platform {platform}` "
+                   f"to process them.")
+
+def display_queue_controls(platform, rows, key_prefix):
+    """Queue the given rows for fetch_workers.py and show queue progress."""
+    if st.button("Queue for Background Workers", key=f"{key_prefix}_queue",
+                 help="Hand the list to fetch_workers.py processes instead of fetching here."):
+        queued = enqueue_fetch_jobs(platform, rows)
+        st.success(f"Queued {queued} profile(s). Run `python fetch_workers.py --platform {platform} "
+                   f"--workers 4` to process them.")
+    counts = load_queue_status(platform)
+    if counts:
+        st.caption("Queue: " + ", ".join(f"{state} {n}" for state, n in sorted(counts.items())))
+
+# ---- Fetch log ----
+FETCH_LOG_RETENTION_DAYS = int(os.environ.get('FETCH_LOG_RETENTION_DAYS', 30))
+# fetch_log.status values counted as failures (NULL: the request raised)
+FETCH_LOG_FAILED = "(status IS NULL OR status >= 400)"
+
+def _get_log_db():
+    conn = db.connect()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fetch_log (
+            id INTEGER PRIMARY KEY,
+            platform TEXT NOT NULL,
+            username TEXT DEFAULT '',
+            endpoint TEXT DEFAULT '',
+            started_at REAL NOT NULL,
+            duration_ms REAL,
+            status INTEGER,
+            bytes INTEGER DEFAULT 0,
+            retries INTEGER DEFAULT 0,
+            error TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fetch_log_started ON fetch_log(started_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fetch_log_user ON fetch_log(platform, username, started_at)")
+    conn.commit()
+    return conn
+
+@st.cache_resource
+def _fetch_log_buffer():
+    """Rows of the fetches in progress; written once per fetch (see _flushes_fetch_log) and at exit."""
+    atexit.register(lambda: flush_fetch_log())
+    return {'lock': threading.Lock(), 'rows': [], 'last_prune': 0.0}
+
+_FETCH_LOG = _fetch_log_buffer()
+
+def _log_fetch(platform, username, endpoint, started_at, duration_ms, status, size, retries, error):
+    with _FETCH_LOG['lock']:
+        _FETCH_LOG['rows'].append((platform, username or '', endpoint, started_at, round(duration_ms, 2),
+                                   status, size, retries, error))
+
+def _flushes_fetch_log(fetch):
+    """Decorator: write the fetch log when `fetch` returns, one commit for all of its requests."""
+    @functools.wraps(fetch)
+    def wrapper(*args, **kwargs):
+        try:
+            return fetch(*args, **kwargs)
+        finally:
+            flush_fetch_log()
+    return wrapper
+
+def flush_fetch_log():
+    """Write buffered fetch_log rows in one transaction and apply the retention policy daily."""
+    with _FETCH_LOG['lock']:
+        rows, _FETCH_LOG['rows'] = _FETCH_LOG['rows'], []
+        prune = rows and time.time() - _FETCH_LOG['last_prune'] > 86400
+        if prune:
+            _FETCH_LOG['last_prune'] = time.time()
+    if not rows:
+        return
+
+    conn = _get_log_db()
+    with conn:
+        conn.executemany("""
+            INSERT INTO fetch_log
+                (platform, username, endpoint, started_at, duration_ms, status, bytes, retries, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        if prune:
+            conn.execute("DELETE FROM fetch_log WHERE started_at < ?",
+                         (time.time() - FETCH_LOG_RETENTION_DAYS * 86400,))
+    conn.close()
+
+def load_slowest_users(platform=None, days=7, limit=20):
+    """Users with the highest average request latency over the last `days`."""
+    conn = _get_log_db()
+    df = pd.read_sql_query(f"""
+        SELECT platform, username, COUNT(*) AS requests,
+               ROUND(AVG(duration_ms), 1) AS avg_ms, ROUND(MAX(duration_ms), 1) AS max_ms,
+               SUM(retries) AS retries,
+               SUM({FETCH_LOG_FAILED}) AS failures
+        FROM fetch_log
+        WHERE started_at >= ? AND username != '' AND (? IS NULL OR platform = ?)
+        GROUP BY platform, username
+        ORDER BY avg_ms DESC
+        LIMIT ?
+    """, conn, params=(time.time() - days * 86400, platform, platform, limit))
+    conn.close()
+    return df
+
+def load_failure_rate_by_hour(platform=None, days=7):
+    """Request count and failure rate per hour."""
+    conn = _get_log_db()
+    df = pd.read_sql_query(f"""
+        SELECT strftime('%Y-%m-%d %H:00', started_at, 'unixepoch', 'localtime') AS hour,
+               COUNT(*) AS requests,
+               SUM({FETCH_LOG_FAILED}) AS failures,
+               ROUND(100.0 * SUM({FETCH_LOG_FAILED}) / COUNT(*), 2) AS failure_pct
+        FROM fetch_log
+        WHERE started_at >= ? AND (? IS NULL OR platform = ?)
+        GROUP BY hour
+        ORDER BY hour
+    """, conn, params=(time.time() - days * 86400, platform, platform))
+    conn.close()
+    return df
+
+def load_fetch_throughput(platform=None, days=7, bucket_minutes=60):
+    """Requests, bytes and average latency per time bucket."""
+    bucket = bucket_minutes * 60
+    conn = _get_log_db()
+    df = pd.read_sql_query("""
+        SELECT datetime(CAST(started_at / ? AS INTEGER) * ?, 'unixepoch', 'localtime') AS bucket,
+               COUNT(*) AS requests, SUM(bytes) AS bytes, ROUND(AVG(duration_ms), 1) AS avg_ms
+        FROM fetch_log
+        WHERE started_at >= ? AND (? IS NULL OR platform = ?)
+        GROUP BY bucket
+        ORDER BY bucket
+    """, conn, params=(bucket, bucket, time.time() - days * 86400, platform, platform))
+    conn.close()
+    return df
+
+def display_fetch_log_analytics(platform):
+    """Slowest users, hourly failure rate and throughput from the fetch log."""
+    flush_fetch_log()
+    days = st.select_slider("Window (days)", options=[1, 3, 7, 14, 30], value=7, key=f"{platform}_log_days")
+
+    throughput = load_fetch_throughput(platform, days)
+    if throughput.empty:
+        st.info("No fetches logged in this window.")
+        return
+
+    failures = load_failure_rate_by_hour(platform, days)
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = go.Figure(go.Bar(x=throughput['bucket'], y=throughput['requests'], marker_color='#3498db'))
+        fig.update_layout(title="Requests per Hour", height=350, xaxis_title="Hour", yaxis_title="Requests")
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        fig = go.Figure(go.Scatter(x=failures['hour'], y=failures['failure_pct'], mode='lines+markers',
+                                   line=dict(color='#e74c3c', width=2)))
+        fig.update_layout(title="Failure Rate per Hour (%)", height=350, xaxis_title="Hour", yaxis_title="%")
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Slowest Users")
+    st.dataframe(load_slowest_users(platform, days).rename(columns={
+        'platform': 'Platform', 'username': 'Username', 'requests': 'Requests', 'avg_ms': 'Avg ms',
+        'max_ms': 'Max ms', 'retries': 'Retries', 'failures': 'Failures'}),
+        use_container_width=True, hide_index=True)
+
+# ---- Columnar export ----
+def display_export_controls():
+    """Export buttons for the analytics team."""
+    col1, col2 = st.columns(2)
+    with col1:
+        fmt = st.radio("Format", list(EXPORT_FORMATS), horizontal=True, key="export_format")
+    with col2:
+        incremental = st.checkbox("Only profiles changed since the last export", value=True,
+                                  key="export_incremental")
+    if st.button("Export", key="export_run"):
+        _get_db().close()
+        _get_cf_db().close()
+        try:
+            results = export_tables(fmt, incremental)
+        except ImportError as e:
+            st.error(str(e))
+            return
+        st.success(f"Exported to {EXPORT_DIR}")
+        st.dataframe(pd.DataFrame(results, columns=['Table', 'File', 'Rows']),
+                     use_container_width=True, hide_index=True)
+
+STREAM_CHUNK_SIZE = 64 * 1024
+_JSON_WS = re.compile(r'[\s,]*')
+_JSON_SPACE = re.compile(r'\s*')
+_JSON_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+def _stream_json_array(key, keep):
+    """Parser for _http_json that decodes the `key` array item by item while downloading; raises if truncated."""
+    marker = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    decoder = json.JSONDecoder()
+
+    def parse(response):
+        text = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+        buffer, size, head, tail, items, pos = '', 0, None, None, [], 0
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            size += len(chunk)
+            if tail is not None:
+                tail += text.decode(chunk)
+                continue
+            buffer = buffer[pos:] + text.decode(chunk)
+            pos = 0
+            if head is None:
+                found = marker.search(buffer)
+                if not found:
+                    continue
+                head, pos = buffer[:found.start()], found.end()
+            while True:
+                pos = _JSON_WS.match(buffer, pos).end()
+                if pos < len(buffer) and buffer[pos] == ']':
+                    tail = buffer[pos + 1:]
+                    break
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # item continues in the next chunk
+                # a number cut at the chunk edge (12|34, 1.|5, 1.5e|3) decodes short: only take an
+                # item once the separator after it has arrived
+                after = _JSON_SPACE.match(buffer, end).end()
+                if after == len(buffer) or _JSON_NUMBER_TAIL.fullmatch(buffer, end):
+                    break
+                if buffer[after] not in ',]':
+                    raise ValueError(f"Malformed {key!r} array at character {size}")
+                items.append(keep(item))
+                pos = end
+        rest = text.decode(b'', final=True)
+        if head is None:
+            return json.loads(buffer + rest), size
+        if tail is None:
+            raise ValueError(f"Response ended inside the {key!r} array")
+        # the rest of the object, with the array stubbed out; raises if it is cut short too
+        body = json.loads(f'{head}"{key}": null{tail}{rest}')
+        body[key] = items
+        return body, size
+
+    return parse
+
+def _http_json(platform, url, params=None, payload=None, session=None, headers=None, timeout=10,
+               username=None, parse=None):
+    """GET (POST with `payload`) a JSON endpoint through the response cache; returns (status, body)."""
+    variables = payload if payload is not None else params
+    key = http_cache.response_key(url, variables)
+
+    mode = http_cache.HTTP_CACHE_MODE
+    if mode in ('record', 'replay'):
+        body = http_cache.get(key, None if mode == 'replay' else http_cache.HTTP_CACHE_TTL)
+        if body is not None:
+            increment('cache_hits', platform)
+            return 200, body
+        if mode == 'replay':
+            increment('cache_misses', platform)
+            return None, None
+
+    http = session or requests
+    endpoint = url.rsplit('/', 1)[-1]
+    started_at = time.time()
+    start = time.perf_counter()
+    status, size, retry_count = None, 0, 0
+    increment('requests', platform)
+    try:
+        with timed(f"http.{platform}"):
+            if payload is not None:
+                response = http.post(url, json=payload, headers=headers, timeout=timeout)
+            else:
+                response = http.get(url, params=params, headers=headers, timeout=timeout,
+                                    stream=parse is not None)
+        status = response.status_code
+        if parse is None or status != 200:
+            size = len(response.content)
+
+        retries = getattr(response.raw, 'retries', None)
+        if retries is not None and retries.history:
+            retry_count = len(retries.history)
+            increment('retries', platform, retry_count)
+        if status != 200:
+            if status >= 400:
+                increment('failures', platform)
+            _log_fetch(platform, username, endpoint, started_at, (time.perf_counter() - start) * 1000,
+                       status, size, retry_count, None)
+            return status, None
+
+        with timed(f"parse.{platform}"):
+            if parse is None:
+                body = json.loads(response.content)
+            else:
+                with response:
+                    body, size = parse(response)
+    except Exception as e:
+        increment('failures', platform)
+        _log_fetch(platform, username, endpoint, started_at, (time.perf_counter() - start) * 1000,
+                   status, size, retry_count, type(e).__name__)
+        raise
+
+    _log_fetch(platform, username, endpoint, started_at, (time.perf_counter() - start) * 1000,
+               status, size, retry_count, None)
+    if mode == 'record':
+        http_cache.put(key, url, variables, body)
+    return 200, body
+
+# ---- Request coalescing ----
+@st.cache_resource
+def _inflight_registry():
+    """Process-wide map of (platform, username) -> in-flight fetch, shared by every session."""
+    return {'lock': threading.Lock(), 'calls': {}}
+
+_INFLIGHT = _inflight_registry()
+
+def _single_flight(platform):
+    """Decorator: concurrent calls for one username share a single fetch and its read-only result (or error)."""
+    def decorate(fetch):
+        @functools.wraps(fetch)
+        def wrapper(username):
+            key = (platform, username.strip().lower())
+            with _INFLIGHT['lock']:
+                call = _INFLIGHT['calls'].get(key)
+                leader = call is None
+                if leader:
+                    call = _INFLIGHT['calls'][key] = {'done': threading.Event(), 'result': None, 'error': None}
+            if not leader:
+                increment('coalesced', platform)
+                call['done'].wait()
+                if call['error'] is not None:
+                    raise call['error']
+                return call['result']
+            try:
+                call['result'] = fetch(username)
+            except BaseException as e:
+                call['error'] = e
+                raise
+            finally:
+                with _INFLIGHT['lock']:
+                    del _INFLIGHT['calls'][key]
+                call['done'].set()
+            return call['result']
+        return wrapper
+    return decorate
+
+# ---- Concurrent lookups ----
+LOOKUP_TIMEOUT = float(os.environ.get('LOOKUP_TIMEOUT', 20))
+
+@st.cache_resource
+def _http_pool():
+    """Shared threads for upstream calls made on behalf of a single fetch."""
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix='http')
+
+_HTTP_POOL = _http_pool()
+
+def _in_script_thread(fn, *args):
+    """Run fn(*args) on a daemon thread attached to the current script run; returns a Future."""
+    future = Future()
+
+    def run():
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    add_script_run_ctx(thread)
+    thread.start()
+    return future
+
+def fetch_student_profiles(usernames, timeout=None):
+    """Yield (platform, data, error) for each platform as its fetch finishes or times out."""
+    timeout = LOOKUP_TIMEOUT if timeout is None else timeout
+    fetchers = {'leetcode': fetch_leetcode_data, 'codeforces': fetch_codeforces_data}
+    futures = {_in_script_thread(fetchers[platform], username): platform
+               for platform, username in usernames.items() if username}
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            pending.discard(future)
+            error = future.exception()
+            yield futures[future], None if error else future.result(), error and str(error)
+    except TimeoutError:
+        for future in pending:
+            increment('timeouts', futures[future])
+            yield futures[future], None, f"timed out after {timeout:g}s"
+
+LEETCODE_GRAPHQL_URL = os.environ.get('LEETCODE_GRAPHQL_URL', "https://leetcode.com/graphql")
+LEETCODE_HEADERS = {
+    'Content-Type': 'application/json',
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Referer': 'https://leetcode.com',
+    'Origin': 'https://leetcode.com',
+}
+# Number of usernames aliased into one contest-only GraphQL request
+CONTEST_BATCH_SIZE = 25
+
+def _leetcode_session():
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=2, status_forcelist=[429, 500, 502, 503, 504])
+    session.mount('https://', HTTPAdapter(max_retries=retries))
+    session.mount('http://', HTTPAdapter(max_retries=retries))
+    return session
+
+@_single_flight('leetcode')
+@_flushes_fetch_log
+@timed('fetch.leetcode')
 def fetch_leetcode_data(username):
     """Fetch user data from LeetCode GraphQL API"""
-    url = "https://leetcode.com/graphql"
+    url = LEETCODE_GRAPHQL_URL
 
     query = """
     query getUserProfile($username: String!) {
@@ -226,6 +1912,7 @@ def fetch_leetcode_data(username):
                 skillTags
                 countryName
             }
+            submissionCalendar
             submitStats {
                 acSubmissionNum {
                     difficulty
@@ -283,27 +1970,19 @@ def fetch_leetcode_data(username):
     }
     """
 
-    headers = {
-        'Content-Type': 'application/json',
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Referer': 'https://leetcode.com',
-        'Origin': 'https://leetcode.com',
-    }
-
-    session = requests.Session()
-    retries = Retry(total=3, backoff_factor=2, status_forcelist=[429, 500, 502, 503, 504])
-    session.mount('https://', HTTPAdapter(max_retries=retries))
+    session = _leetcode_session()
 
     try:
-        response = session.post(
-            url,
-            json={'query': query, 'variables': {'username': username}},
-            headers=headers,
-            timeout=30
+        status, data = _http_json(
+            'leetcode', url,
+            payload={'query': query, 'variables': {'username': username}},
+            session=session,
+            headers=LEETCODE_HEADERS,
+            timeout=30,
+            username=username
         )
 
-        if response.status_code == 200:
-            data = response.json()
+        if status == 200:
             if data.get('data', {}).get('matchedUser'):
                 return data['data']
             else:
@@ -314,37 +1993,93 @@ def fetch_leetcode_data(username):
         st.error(f"Error fetching data for {username}: {str(e)}")
         return None
 
+# (field, selection) queried per user by fetch_leetcode_contest_batch, keyed by `history`
+CONTEST_BATCH_FIELDS = {
+    False: ("userContestRanking", "{ attendedContestsCount rating globalRanking totalParticipants topPercentage }"),
+    True: ("userContestRankingHistory", "{ attended rating ranking contest { title startTime } }"),
+}
+
+@_flushes_fetch_log
+@timed('fetch.leetcode_contests')
+def fetch_leetcode_contest_batch(usernames, history=False):
+    """{username: contest ranking or history} for several users in one aliased request; None on failure."""
+    if not usernames:
+        return {}
+
+    var_defs = ", ".join(f"$u{i}: String!" for i in range(len(usernames)))
+    field, selection = CONTEST_BATCH_FIELDS[history]
+    fields = "\n".join(f"u{i}: {field}(username: $u{i}) {selection}" for i in range(len(usernames)))
+    query = f"query contestRankings({var_defs}) {{\n{fields}\n}}"
+    variables = {f"u{i}": uname for i, uname in enumerate(usernames)}
+
+    session = _leetcode_session()
+
+    try:
+        status, body = _http_json(
+            'leetcode', LEETCODE_GRAPHQL_URL,
+            payload={'query': query, 'variables': variables},
+            session=session,
+            headers=LEETCODE_HEADERS,
+            timeout=30
+        )
+        if status != 200:
+            return None
+        data = body.get('data') or {}
+        return {uname: data.get(f"u{i}") for i, uname in enumerate(usernames)}
+    except Exception as e:
+        st.error(f"Error fetching contest data: {str(e)}")
+        return None
+
+CODEFORCES_API_URL = os.environ.get('CODEFORCES_API_URL', "https://codeforces.com/api")
+# submissions fetched per user from user.status; 0 fetches the full history
+CF_SUBMISSION_LIMIT = int(os.environ.get('CF_SUBMISSION_LIMIT', 100))
+
+def _trim_cf_submission(sub):
+    """The parts of a user.status submission the app reads: verdict, time and problem id/rating."""
+    problem = sub.get('problem') or {}
+    trimmed = {field: sub[field] for field in ('id', 'contestId', 'creationTimeSeconds', 'verdict') if field in sub}
+    trimmed['problem'] = {field: problem[field] for field in ('contestId', 'index', 'rating') if field in problem}
+    return trimmed
+
+@_single_flight('codeforces')
+@_flushes_fetch_log
+@timed('fetch.codeforces')
 def fetch_codeforces_data(username):
     """Fetch user data from Codeforces API"""
     try:
+        # user.info, user.rating and user.status are independent, so issue them together
+        calls = {
+            'user.info': {'handles': username},
+            'user.rating': {'handle': username},
+            'user.status': ({'handle': username, 'from': 1, 'count': CF_SUBMISSION_LIMIT} if CF_SUBMISSION_LIMIT
+                            else {'handle': username}),
+        }
+        parsers = {'user.status': _stream_json_array('result', _trim_cf_submission)}
+        futures = {method: _HTTP_POOL.submit(_http_json, 'codeforces', f"{CODEFORCES_API_URL}/{method}",
+                                             params=params, username=username, parse=parsers.get(method))
+                   for method, params in calls.items()}
+
         # User info
-        user_url = f"https://codeforces.com/api/user.info?handles={username}"
-        user_response = requests.get(user_url, timeout=10)
+        status, user_data = futures['user.info'].result()
 
-        if user_response.status_code != 200:
+        if status != 200:
             return None
 
-        user_data = user_response.json()
         if user_data.get('status') != 'OK':
             return None
 
         # User rating history
-        rating_url = f"https://codeforces.com/api/user.rating?handle={username}"
-        rating_response = requests.get(rating_url, timeout=10)
+        status, rating_data = futures['user.rating'].result()
         rating_history = []
-        if rating_response.status_code == 200:
-            rating_data = rating_response.json()
+        if status == 200:
             if rating_data.get('status') == 'OK':
                 rating_history = rating_data.get('result', [])
 
-        # User submissions
-        status_url = f"https://codeforces.com/api/user.status?handle={username}&from=1&count=100"
-        status_response = requests.get(status_url, timeout=10)
-        submissions = []
-        if status_response.status_code == 200:
-            status_data = status_response.json()
-            if status_data.get('status') == 'OK':
-                submissions = status_data.get('result', [])
+        # User submissions; without them the profile would be saved with nothing solved
+        status, status_data = futures['user.status'].result()
+        if status != 200 or status_data.get('status') != 'OK':
+            return None
+        submissions = status_data.get('result', [])
 
         return {
             'user': user_data['result'][0],
@@ -356,6 +2091,42 @@ def fetch_codeforces_data(username):
         st.error(f"Error fetching Codeforces data: {str(e)}")
         return None
 
+CF_PROBLEMSET_TTL = int(os.environ.get('CF_PROBLEMSET_TTL', 7 * 86400))
+
+def load_cf_problemset_state():
+    """(fetched_at unix seconds, problem count) of the cached problemset, or None."""
+    conn = _get_cf_db()
+    row = conn.execute("SELECT fetched_at, problem_count FROM cf_problemset_state").fetchone()
+    conn.close()
+    return row
+
+@_flushes_fetch_log
+@timed('fetch.codeforces_problemset')
+def refresh_cf_problemset(force=False):
+    """Re-fetch the cached problemset once it is older than CF_PROBLEMSET_TTL; returns problems stored."""
+    state = load_cf_problemset_state()
+    if not force and state and time.time() - state[0] < CF_PROBLEMSET_TTL:
+        return 0
+    try:
+        status, body = _http_json('codeforces', f"{CODEFORCES_API_URL}/problemset.problems")
+    except Exception:
+        return 0
+    if status != 200 or not body or body.get('status') != 'OK':
+        return 0
+    problems = [p for p in body['result'].get('problems', []) if 'contestId' in p and 'index' in p]
+
+    conn = _get_cf_db()
+    conn.execute("DELETE FROM cf_problems")
+    conn.execute("DELETE FROM cf_problem_tags")
+    conn.executemany("INSERT OR REPLACE INTO cf_problems VALUES (?, ?, ?, ?)",
+                     [(p['contestId'], p['index'], p.get('name'), p.get('rating')) for p in problems])
+    conn.executemany("INSERT OR IGNORE INTO cf_problem_tags VALUES (?, ?, ?)",
+                     [(p['contestId'], p['index'], tag) for p in problems for tag in p.get('tags', [])])
+    conn.execute("INSERT OR REPLACE INTO cf_problemset_state VALUES (1, ?, ?)", (time.time(), len(problems)))
+    conn.commit()
+    conn.close()
+    return len(problems)
+
 def calculate_score(data, platform='leetcode'):
     """Calculate a comprehensive score for LeetCode or Codeforces"""
     if platform == 'leetcode':
@@ -363,38 +2134,51 @@ def calculate_score(data, platform='leetcode'):
     else:
         return calculate_codeforces_score(data)
 
+LC_DIFFICULTIES = ['Easy', 'Medium', 'Hard']
+
+def _lc_stats(data):
+    """Solved counts per difficulty, contest rating/attendance and ranking from a getUserProfile payload."""
+    user = data['matchedUser']
+    contest = data.get('userContestRanking')
+    solved = {item['difficulty']: item['count'] for item in user['submitStats']['acSubmissionNum']}
+    attempted = {item['difficulty']: item['count']
+                 for item in user['submitStats'].get('totalSubmissionNum') or []}
+    easy, medium, hard = (solved.get(d, 0) for d in LC_DIFFICULTIES)
+    return {
+        'easy': easy, 'medium': medium, 'hard': hard, 'total_solved': easy + medium + hard,
+        'attempted': [attempted.get(d, 0) for d in LC_DIFFICULTIES],
+        'contest_rating': (contest.get('rating') or 0) if contest else 0,
+        'contests_attended': (contest.get('attendedContestsCount') or 0) if contest else 0,
+        'ranking': user['profile'].get('ranking'),
+    }
+
+@timed('score.leetcode')
 def calculate_leetcode_score(data):
     """Calculate a comprehensive LeetCode score"""
     if not data or not data.get('matchedUser'):
         return 0
 
-    user = data['matchedUser']
-    contest = data.get('userContestRanking')
+    stats = _lc_stats(data)
+    return _leetcode_score_from_stats(stats['easy'], stats['medium'], stats['hard'], stats['contest_rating'],
+                                      stats['contests_attended'], stats['ranking'])
 
+def _leetcode_score_from_stats(easy, medium, hard, contest_rating, contests_attended, ranking):
+    """Score from already extracted stats, so stored rows can be re-scored without raw_json."""
     # Problem solving score (max 400 points)
-    solved_stats = {item['difficulty']: item['count']
-                   for item in user['submitStats']['acSubmissionNum']}
-
-    easy = solved_stats.get('Easy', 0)
-    medium = solved_stats.get('Medium', 0)
-    hard = solved_stats.get('Hard', 0)
-
     problem_score = (easy * 1) + (medium * 3) + (hard * 5)
     normalized_problem_score = min(problem_score / 10, 400)  # Cap at 400
 
     # Contest rating score (max 300 points)
     contest_score = 0
-    if contest and contest.get('rating'):
-        contest_score = min(contest['rating'] / 10, 300)  # Cap at 300
+    if contest_rating:
+        contest_score = min(contest_rating / 10, 300)  # Cap at 300
 
     # Consistency score (max 200 points)
-    contests_attended = contest.get('attendedContestsCount', 0) if contest else 0
-    consistency_score = min(contests_attended * 2, 200)  # Cap at 200
+    consistency_score = min((contests_attended or 0) * 2, 200)  # Cap at 200
 
     # Ranking bonus (max 100 points)
     ranking_score = 0
-    if user['profile'].get('ranking'):
-        ranking = user['profile']['ranking']
+    if ranking:
         if ranking <= 1000:
             ranking_score = 100
         elif ranking <= 10000:
@@ -410,6 +2194,7 @@ def calculate_leetcode_score(data):
 
     return round(total_score, 2)
 
+@timed('score.codeforces')
 def calculate_codeforces_score(data):
     """Calculate a comprehensive Codeforces score"""
     if not data or not data.get('user'):
@@ -459,10 +2244,41 @@ def calculate_codeforces_score(data):
 
     return round(total_score, 2)
 
-def display_profile_header(user_data):
+@st.cache_data(max_entries=64, show_spinner=False)
+def leetcode_profile_view(username, fetched_at, _data):
+    """Everything the single-user page shows, derived once per (username, fetched_at)."""
+    user = _data['matchedUser']
+    stats = _lc_stats(_data)
+    solved = [stats['easy'], stats['medium'], stats['hard']]
+    breakdown = pd.DataFrame({
+        'Difficulty': LC_DIFFICULTIES,
+        'Solved': solved,
+        'Total Attempted': stats['attempted'],
+        'Acceptance Rate': [f"{(s/t*100):.1f}%" if t > 0 else "0%"
+                            for s, t in zip(solved, stats['attempted'])],
+    })
+    submissions = pd.DataFrame([{
+        'Problem': sub['title'],
+        'Status': sub['statusDisplay'],
+        'Language': sub['lang'],
+        'Time': datetime.fromtimestamp(int(sub['timestamp'])).strftime('%Y-%m-%d %H:%M'),
+    } for sub in _data.get('recentSubmissionList') or []])
+    return {
+        'username': user['username'],
+        'profile': user['profile'],
+        'badges': user.get('badges') or [],
+        'contest': _data.get('userContestRanking'),
+        'stats': stats,
+        'score': _leetcode_score_from_stats(*solved, stats['contest_rating'],
+                                            stats['contests_attended'], stats['ranking']),
+        'breakdown': breakdown,
+        'history': _contest_history_frame('leetcode', _lc_history_rows(_data.get('userContestRankingHistory'))),
+        'submissions': submissions,
+    }
+
+def display_profile_header(view):
     """Display user profile header"""
-    user = user_data['matchedUser']
-    profile = user['profile']
+    profile = view['profile']
 
     col1, col2 = st.columns([1, 3])
 
@@ -471,34 +2287,28 @@ def display_profile_header(user_data):
             st.image(profile['userAvatar'], width=150)
 
     with col2:
-        st.title(f"👤 {user['username']}")
+        st.title(f"👤 {view['username']}")
         if profile.get('realName'):
             st.subheader(profile['realName'])
 
         # Score badge
-        score = calculate_leetcode_score(user_data)
-        st.markdown(f"### 🎯 Overall Score: **{score}/1000**")
+        st.markdown(f"### 🎯 Overall Score: **{view['score']}/1000**")
 
         if profile.get('countryName'):
             st.write(f"📍 {profile['countryName']}")
 
-def display_stats_overview(user_data):
+def display_stats_overview(view):
     """Display key statistics"""
-    user = user_data['matchedUser']
-    contest = user_data.get('userContestRanking')
-    
-    solved_stats = {item['difficulty']: item['count'] 
-                   for item in user['submitStats']['acSubmissionNum']}
-    
-    total_solved = sum(solved_stats.values())
+    stats = view['stats']
+    contest = view['contest']
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Problems Solved", total_solved)
+        st.metric("Problems Solved", stats['total_solved'])
     
     with col2:
-        ranking = user['profile'].get('ranking', 'N/A')
+        ranking = stats['ranking'] or 'N/A'
         st.metric("Global Ranking", f"{ranking:,}" if isinstance(ranking, int) else ranking)
     
     with col3:
@@ -513,36 +2323,20 @@ def display_stats_overview(user_data):
         else:
             st.metric("Contests Attended", 0)
 
-def display_problem_breakdown(user_data):
+def display_problem_breakdown(view):
     """Display problem-solving breakdown with charts"""
-    user = user_data['matchedUser']
-    
-    solved_stats = {item['difficulty']: item['count'] 
-                   for item in user['submitStats']['acSubmissionNum']}
-    total_stats = {item['difficulty']: item['count'] 
-                  for item in user['submitStats']['totalSubmissionNum']}
+    df = view['breakdown']
     
     st.subheader("📊 Problem Solving Breakdown")
     
-    # Create DataFrame
-    difficulties = ['Easy', 'Medium', 'Hard']
-    solved = [solved_stats.get(d, 0) for d in difficulties]
-    total = [total_stats.get(d, 0) for d in difficulties]
-    
     col1, col2 = st.columns(2)
     
     with col1:
         # Bar chart
-        df = pd.DataFrame({
-            'Difficulty': difficulties,
-            'Solved': solved,
-            'Attempted': total
-        })
-        
         fig = go.Figure()
         fig.add_trace(go.Bar(name='Solved', x=df['Difficulty'], y=df['Solved'],
                             marker_color=['#00b8a3', '#ffc01e', '#ef4743']))
-        fig.add_trace(go.Bar(name='Attempted', x=df['Difficulty'], y=df['Attempted'],
+        fig.add_trace(go.Bar(name='Attempted', x=df['Difficulty'], y=df['Total Attempted'],
                             marker_color=['#b3e5df', '#ffe5b3', '#ffc9c7']))
         
         fig.update_layout(
@@ -555,8 +2349,8 @@ def display_problem_breakdown(user_data):
     with col2:
         # Pie chart
         fig = go.Figure(data=[go.Pie(
-            labels=difficulties,
-            values=solved,
+            labels=df['Difficulty'],
+            values=df['Solved'],
             marker=dict(colors=['#00b8a3', '#ffc01e', '#ef4743']),
             hole=.3
         )])
@@ -570,20 +2364,12 @@ def display_problem_breakdown(user_data):
     # Detailed stats table
     st.subheader("📈 Detailed Statistics")
     
-    stats_df = pd.DataFrame({
-        'Difficulty': difficulties,
-        'Solved': solved,
-        'Total Attempted': total,
-        'Acceptance Rate': [f"{(s/t*100):.1f}%" if t > 0 else "0%" 
-                           for s, t in zip(solved, total)]
-    })
-    
-    st.dataframe(stats_df, use_container_width=True, hide_index=True)
+    st.dataframe(df, use_container_width=True, hide_index=True)
 
-def display_contest_stats(user_data):
+def display_contest_stats(view):
     """Display contest statistics and history"""
-    contest = user_data.get('userContestRanking')
-    history = user_data.get('userContestRankingHistory', [])
+    contest = view['contest']
+    df_history = view['history']
     
     st.subheader("🏆 Contest Performance")
     
@@ -604,13 +2390,9 @@ def display_contest_stats(user_data):
         st.metric("Top Percentage", f"{top_percent:.2f}%")
     
     # Contest rating history
-    if history:
+    if not df_history.empty:
         st.subheader("📉 Rating History")
         
-        df_history = pd.DataFrame(history)
-        df_history['date'] = pd.to_datetime(df_history['contest'].apply(lambda x: x['startTime']), unit='s')
-        df_history['contest_name'] = df_history['contest'].apply(lambda x: x['title'])
-        
         fig = go.Figure()
         fig.add_trace(go.Scatter(
             x=df_history['date'],
@@ -635,33 +2417,22 @@ def display_contest_stats(user_data):
         st.subheader("📅 Recent Contests")
         recent_contests = df_history.tail(10).sort_values('date', ascending=False)
         
-        display_df = recent_contests[['contest_name', 'rating', 'ranking', 'date']].copy()
+        display_df = recent_contests[['contest_title', 'rating', 'ranking', 'date']].copy()
         display_df.columns = ['Contest', 'Rating', 'Rank', 'Date']
         display_df['Date'] = display_df['Date'].dt.strftime('%Y-%m-%d')
         
         st.dataframe(display_df, use_container_width=True, hide_index=True)
 
-def display_recent_submissions(user_data):
+def display_recent_submissions(view):
     """Display recent submissions"""
-    submissions = user_data.get('recentSubmissionList', [])
+    df = view['submissions']
     
-    if not submissions:
+    if df.empty:
         st.info("No recent submissions available.")
         return
     
     st.subheader("🔄 Recent Submissions")
     
-    submissions_data = []
-    for sub in submissions:
-        submissions_data.append({
-            'Problem': sub['title'],
-            'Status': sub['statusDisplay'],
-            'Language': sub['lang'],
-            'Time': datetime.fromtimestamp(int(sub['timestamp'])).strftime('%Y-%m-%d %H:%M')
-        })
-    
-    df = pd.DataFrame(submissions_data)
-    
     # Color code status
     def color_status(val):
         if val == 'Accepted':
@@ -671,13 +2442,12 @@ def display_recent_submissions(user_data):
         else:
             return 'background-color: #fff3cd'
     
-    styled_df = df.style.applymap(color_status, subset=['Status'])
+    styled_df = df.style.map(color_status, subset=['Status'])
     st.dataframe(styled_df, use_container_width=True, hide_index=True)
 
-def display_badges(user_data):
+def display_badges(view):
     """Display user badges"""
-    user = user_data['matchedUser']
-    badges = user.get('badges', [])
+    badges = view['badges']
     
     if not badges:
         return
@@ -763,13 +2533,12 @@ def display_codeforces_stats(data):
     if rating_history:
         st.subheader("📉 Rating History")
 
-        df_history = pd.DataFrame(rating_history)
-        df_history['date'] = pd.to_datetime(df_history['ratingUpdateTimeSeconds'], unit='s')
+        df_history = _contest_history_frame('codeforces', _cf_history_rows(rating_history))
 
         fig = go.Figure()
         fig.add_trace(go.Scatter(
             x=df_history['date'],
-            y=df_history['newRating'],
+            y=df_history['new_rating'],
             mode='lines+markers',
             name='Rating',
             line=dict(color='#00a8cc', width=2),
@@ -786,301 +2555,694 @@ def display_codeforces_stats(data):
 
         st.plotly_chart(fig, use_container_width=True)
 
-def display_batch_dashboard_from_db(found_df):
-    """Display aggregate dashboard from SQLite cached DataFrame.
-    Columns: username, easy, medium, hard, total_solved, contest_rating,
-             contests_attended, global_ranking, score, fetched_at
-    """
-    st.header("Batch Dashboard")
+LC_SOLVED_BUCKETS = [
+    ("35+ questions", 35, None),
+    ("20-34 questions", 20, 35),
+    ("10-19 questions", 10, 20),
+    ("5-9 questions", 5, 10),
+    ("< 5 questions", None, 5),
+]
+CF_SOLVED_BUCKETS = [
+    ("50+ problems", 50, None),
+    ("30-49 problems", 30, 50),
+    ("15-29 problems", 15, 30),
+    ("5-14 problems", 5, 15),
+    ("< 5 problems", None, 5),
+]
+CF_RANK_ORDER = ['legendary grandmaster', 'international grandmaster', 'grandmaster',
+                 'international master', 'master', 'candidate master',
+                 'expert', 'specialist', 'pupil', 'newbie', 'unrated']
+
+def _bucket_counts(values, buckets):
+    counts = []
+    for label, lower, upper in buckets:
+        mask = pd.Series(True, index=values.index)
+        if lower is not None:
+            mask &= values >= lower
+        if upper is not None:
+            mask &= values < upper
+        counts.append({'Bucket': label, 'Students': int(mask.sum())})
+    return pd.DataFrame(counts)
+
+def summarize_leetcode_cohort(df):
+    """KPI averages and solved-bucket counts for a load_all_profiles() frame."""
+    return {
+        'total_students': len(df),
+        'avg_solved': df['total_solved'].mean(),
+        'avg_rating': df['contest_rating'].mean(),
+        'avg_score': df['score'].mean(),
+        'avg_contests': df['contests_attended'].mean(),
+        'avg_easy': df['easy'].mean(),
+        'avg_medium': df['medium'].mean(),
+        'avg_hard': df['hard'].mean(),
+        'buckets': _bucket_counts(df['total_solved'], LC_SOLVED_BUCKETS),
+    }
 
-    # Rename columns for display
-    found_df = found_df.rename(columns={
-        'username': 'Username', 'student_name': 'Name', 'college': 'College', 'batch': 'Batch',
-        'easy': 'Easy', 'medium': 'Medium', 'hard': 'Hard',
-        'total_solved': 'Total Solved', 'contest_rating': 'Contest Rating',
-        'contests_attended': 'Contests Attended', 'global_ranking': 'Global Ranking',
-        'score': 'Score',
-    })
+def summarize_codeforces_cohort(df):
+    """KPI averages, solved-bucket counts and rank counts for a load_all_cf_profiles() frame."""
+    ranks = df['rank'].str.lower().value_counts()
+    return {
+        'total_students': len(df),
+        'avg_solved': df['problems_solved'].mean(),
+        'avg_rating': df['rating'].mean(),
+        'avg_max_rating': df['max_rating'].mean(),
+        'avg_score': df['score'].mean(),
+        'avg_contests': df['contests_attended'].mean(),
+        'buckets': _bucket_counts(df['problems_solved'], CF_SOLVED_BUCKETS),
+        'rank_counts': {r: int(ranks.get(r, 0)) for r in CF_RANK_ORDER},
+    }
 
-    # ---- KPI metrics row ----
-    st.subheader("Overview")
-    total_students = len(found_df)
-    avg_solved = found_df['Total Solved'].mean()
-    avg_rating = found_df['Contest Rating'].mean()
-    avg_score = found_df['Score'].mean()
-    avg_contests = found_df['Contests Attended'].mean()
+@timed('db.load_cohort_summary')
+def load_cohort_summary(platform, college=None, batch=None):
+    """summarize_*_cohort() dict for a college/batch filter, read from cohort_aggregates."""
+    columns = list(AGGREGATE_COLUMNS[platform])
+    buckets = LC_SOLVED_BUCKETS if platform == 'leetcode' else CF_SOLVED_BUCKETS
+    conn = _profile_db(platform)
+    row = conn.execute(f"""
+        SELECT COALESCE(SUM(students), 0), {', '.join(f'SUM(sum_{col})' for col in columns)},
+               {', '.join(f'COALESCE(SUM(bucket_{i}), 0)' for i in range(len(buckets)))}
+        FROM cohort_aggregates
+        WHERE platform = ? AND (? IS NULL OR college = ?) AND (? IS NULL OR batch = ?)
+    """, (platform, college, college, batch, batch)).fetchone()
+    ranks = {}
+    if platform == 'codeforces':
+        ranks = dict(conn.execute("""
+            SELECT rank, SUM(students) FROM cohort_rank_counts
+            WHERE (? IS NULL OR college = ?) AND (? IS NULL OR batch = ?) GROUP BY rank
+        """, (college, college, batch, batch)).fetchall())
+    conn.close()
 
-    k1, k2, k3, k4, k5 = st.columns(5)
-    k1.metric("Total Students", total_students)
-    k2.metric("Avg Problems Solved", f"{avg_solved:.1f}")
-    k3.metric("Avg Contest Rating", f"{avg_rating:.1f}")
-    k4.metric("Avg Score", f"{avg_score:.1f}")
-    k5.metric("Avg Contests Attended", f"{avg_contests:.1f}")
+    students = row[0]
+    averages = {col: (total / students if students else float('nan'))
+                for col, total in zip(columns, row[1:1 + len(columns)])}
+    summary = {
+        'total_students': students,
+        'avg_solved': averages['solved'],
+        'avg_rating': averages['rating'],
+        'avg_score': averages['score'],
+        'avg_contests': averages['contests'],
+        'buckets': pd.DataFrame({'Bucket': [label for label, _, _ in buckets],
+                                 'Students': [int(n) for n in row[1 + len(columns):]]}),
+    }
+    if platform == 'leetcode':
+        summary.update(avg_easy=averages['easy'], avg_medium=averages['medium'], avg_hard=averages['hard'])
+    else:
+        summary['avg_max_rating'] = averages['max_rating']
+        summary['rank_counts'] = {r: int(ranks.get(r, 0)) for r in CF_RANK_ORDER}
+    return summary
 
-    # ---- Question bucket breakdown ----
-    st.subheader("Students by Problems Solved")
+def _histogram_figure(values, nbins, color, title, xaxis_title):
+    """Bar chart of `values` binned server-side with numpy, so only the bin counts reach the browser."""
+    counts, edges = np.histogram(np.asarray(values, dtype=float), bins=nbins)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), marker_color=color,
+        customdata=np.column_stack([edges[:-1], edges[1:]]),
+        hovertemplate="%{customdata[0]:.0f} - %{customdata[1]:.0f}: %{y}<extra></extra>",
+    ))
+    fig.update_layout(title=title, height=400, xaxis_title=xaxis_title, yaxis_title="Count", bargap=0.05)
+    return fig
+
+def _bucket_figures(bucket_df, colors):
+    """(bar, pie) figures of a problems-solved bucket frame."""
+    bar = go.Figure(go.Bar(
+        x=bucket_df['Bucket'], y=bucket_df['Students'], marker_color=colors,
+        text=bucket_df['Students'], textposition='auto',
+    ))
+    bar.update_layout(title="Student Distribution by Problems Solved", height=400,
+                      xaxis_title="Problems Solved", yaxis_title="Number of Students")
+    pie = go.Figure(go.Pie(labels=bucket_df['Bucket'], values=bucket_df['Students'],
+                           marker=dict(colors=colors), hole=0.35))
+    pie.update_layout(title="Distribution (%)", height=400)
+    return bar, pie
+
+BUCKET_COLORS = ['#2ecc71', '#27ae60', '#f1c40f', '#e67e22', '#e74c3c']
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def leetcode_dashboard_figures(college, batch, top, version, _found_df):
+    """(summary, {name: figure dict}) for the LeetCode batch dashboard, cached per filter and data version."""
+    summary = (load_cohort_summary('leetcode', college, batch) if top is None
+               else summarize_leetcode_cohort(_found_df))
+    figures = {}
+    figures['buckets_bar'], figures['buckets_pie'] = _bucket_figures(summary['buckets'], BUCKET_COLORS)
 
-    buckets = [
-        ("35+ questions", 35),
-        ("20-34 questions", 20),
-        ("10-19 questions", 10),
-        ("5-9 questions", 5),
-        ("< 5 questions", 0),
-    ]
-
-    bucket_counts = []
-    for label, lower in buckets:
-        if lower == 35:
-            count = len(found_df[found_df['Total Solved'] >= 35])
-        elif lower == 20:
-            count = len(found_df[(found_df['Total Solved'] >= 20) & (found_df['Total Solved'] < 35)])
-        elif lower == 10:
-            count = len(found_df[(found_df['Total Solved'] >= 10) & (found_df['Total Solved'] < 20)])
-        elif lower == 5:
-            count = len(found_df[(found_df['Total Solved'] >= 5) & (found_df['Total Solved'] < 10)])
-        else:
-            count = len(found_df[found_df['Total Solved'] < 5])
-        bucket_counts.append({'Bucket': label, 'Students': count})
+    fig = go.Figure()
+    fig.add_trace(go.Bar(name='Easy', x=_found_df['username'], y=_found_df['easy'], marker_color='#00b8a3'))
+    fig.add_trace(go.Bar(name='Medium', x=_found_df['username'], y=_found_df['medium'], marker_color='#ffc01e'))
+    fig.add_trace(go.Bar(name='Hard', x=_found_df['username'], y=_found_df['hard'], marker_color='#ef4743'))
+    fig.update_layout(barmode='stack', title="Problems Solved by Difficulty per Student",
+                      xaxis_title="Username", yaxis_title="Problems Solved", height=450)
+    figures['difficulty'] = fig
+
+    ratings = _found_df['contest_rating']
+    ratings = ratings[ratings > 0]
+    if not ratings.empty:
+        figures['rating_hist'] = _histogram_figure(ratings, 15, '#3498db', "Contest Rating Histogram",
+                                                   "Contest Rating")
+    figures['score_hist'] = _histogram_figure(_found_df['score'], 15, '#9b59b6', "Overall Score Histogram",
+                                              "Score (/1000)")
+    return summary, {name: fig.to_dict() for name, fig in figures.items()}
+
+CF_RANK_COLORS = {
+    'legendary grandmaster': '#aa0000', 'international grandmaster': '#ff0000',
+    'grandmaster': '#ff0000', 'international master': '#ff8c00',
+    'master': '#ff8c00', 'candidate master': '#aa00aa',
+    'expert': '#0000ff', 'specialist': '#03a89e',
+    'pupil': '#008000', 'newbie': '#808080', 'unrated': '#cccccc',
+}
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def codeforces_dashboard_figures(college, batch, top, version, _found_df):
+    """(summary, {name: figure dict}) for the Codeforces batch dashboard, cached per filter and data version."""
+    summary = (load_cohort_summary('codeforces', college, batch) if top is None
+               else summarize_codeforces_cohort(_found_df))
+    figures = {}
+
+    rank_counts = [{'Rank': r.title(), 'Students': count, 'Color': CF_RANK_COLORS.get(r, '#cccccc')}
+                   for r, count in summary['rank_counts'].items() if count > 0]
+    if rank_counts:
+        rank_df = pd.DataFrame(rank_counts)
+        fig = go.Figure(go.Bar(
+            x=rank_df['Rank'], y=rank_df['Students'],
+            marker_color=rank_df['Color'].tolist(),
+            text=rank_df['Students'], textposition='auto',
+        ))
+        fig.update_layout(title="Student Distribution by Rank", height=400,
+                          xaxis_title="Rank", yaxis_title="Number of Students")
+        figures['ranks_bar'] = fig
+        fig = go.Figure(go.Pie(
+            labels=rank_df['Rank'], values=rank_df['Students'],
+            marker=dict(colors=rank_df['Color'].tolist()), hole=0.35,
+        ))
+        fig.update_layout(title="Rank Distribution (%)", height=400)
+        figures['ranks_pie'] = fig
 
-    bucket_df = pd.DataFrame(bucket_counts)
+    figures['buckets_bar'], figures['buckets_pie'] = _bucket_figures(summary['buckets'], BUCKET_COLORS)
 
-    col1, col2 = st.columns(2)
+    rated = _found_df['rating'] > 0
+    if rated.any():
+        figures['rating_hist'] = _histogram_figure(_found_df.loc[rated, 'rating'], 15, '#00a8cc',
+                                                   "Current Rating Histogram", "Rating")
+        figures['max_rating_hist'] = _histogram_figure(_found_df.loc[rated, 'max_rating'], 15, '#e67e22',
+                                                       "Max Rating Histogram", "Max Rating")
 
-    with col1:
-        fig = go.Figure(go.Bar(
-            x=bucket_df['Bucket'],
-            y=bucket_df['Students'],
-            marker_color=['#2ecc71', '#27ae60', '#f1c40f', '#e67e22', '#e74c3c'],
-            text=bucket_df['Students'],
-            textposition='auto',
+    fig = go.Figure(go.Bar(
+        x=_found_df['username'], y=_found_df['problems_solved'],
+        marker_color='#3498db', text=_found_df['problems_solved'], textposition='auto',
+    ))
+    fig.update_layout(title="Problems Solved per Student", height=450,
+                      xaxis_title="Username", yaxis_title="Problems Solved")
+    figures['per_student'] = fig
+    figures['score_hist'] = _histogram_figure(_found_df['score'], 15, '#9b59b6', "Overall Score Histogram",
+                                              "Score (/1000)")
+    return summary, {name: fig.to_dict() for name, fig in figures.items()}
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def rating_trajectory_figure(platform, college, batch, color, last_n, version):
+    """Figure dict of a cohort's rating trajectory, or None without history."""
+    trajectory = load_cohort_rating_trajectory(platform, college, batch, last_n)
+    if trajectory.empty:
+        return None
+    fig = go.Figure(go.Scatter(
+        x=trajectory['date'], y=trajectory['avg_rating'], mode='lines+markers',
+        text=trajectory['contest'], customdata=trajectory['participants'],
+        hovertemplate="%{text}<br>Avg rating %{y}<br>%{customdata} participants<extra></extra>",
+        line=dict(color=color, width=2), marker=dict(size=6),
+    ))
+    fig.update_layout(title=f"Average Rating over the Last {last_n} Contests", height=400,
+                      xaxis_title="Date", yaxis_title="Average Rating")
+    return fig.to_dict()
+
+def display_rating_trajectory(platform, college=None, batch=None, color='#3498db', last_n=10):
+    """Line chart of the cohort's average rating over its last `last_n` contests."""
+    st.subheader("Rating Trajectory")
+    fig = rating_trajectory_figure(platform, college, batch, color, last_n, load_data_version(platform))
+    if fig is None:
+        st.info("No contest history stored for this cohort.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def activity_figure(platform, year, college, batch, colorscale, version):
+    """(heatmap figure dict, streaks frame) for a cohort's `year`, or None without calendars."""
+    usernames, matrix = load_calendar_matrix(platform, year, college, batch)
+    if not usernames:
+        return None
+
+    grid, dates = calendar_heatmap(matrix.sum(axis=0, dtype=np.int64), year)
+    active = calendar_heatmap((matrix > 0).sum(axis=0), year)[0]
+    fig = go.Figure(go.Heatmap(
+        z=grid, customdata=np.dstack([dates, active]), colorscale=colorscale, xgap=2, ygap=2,
+        y=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+        hovertemplate="%{customdata[0]}<br>%{z} submissions by %{customdata[1]} student(s)<extra></extra>",
+    ))
+    fig.update_layout(title=f"Cohort Submissions per Day, {year}", height=300,
+                      xaxis=dict(title="Week", showgrid=False), yaxis=dict(autorange='reversed', showgrid=False))
+    streaks = calendar_streaks(matrix, year)
+    streaks.insert(0, 'username', usernames)
+    return fig.to_dict(), streaks
+
+def display_activity_heatmap(platform, college=None, batch=None, colorscale='Greens'):
+    """Cohort submission heatmap for one year with streak statistics."""
+    st.subheader("Submission Activity")
+    years = load_calendar_years(platform)
+    if not years:
+        st.info("No submission calendars stored yet.")
+        return
+    year = st.selectbox("Year", years[::-1], key=f"{platform}_calendar_year")
+    activity = activity_figure(platform, year, college, batch, colorscale, load_data_version(platform))
+    if activity is None:
+        st.info(f"No submission calendars stored for this cohort in {year}.")
+        return
+    fig, streaks = activity
+    st.plotly_chart(fig, use_container_width=True)
+
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric("Students with Activity", int((streaks['active_days'] > 0).sum()))
+    k2.metric("Avg Active Days", f"{streaks['active_days'].mean():.1f}")
+    k3.metric("Longest Streak", f"{streaks['longest_streak'].max()} days")
+    k4.metric("On a Streak Now", int((streaks['current_streak'] > 0).sum()))
+    st.dataframe(streaks.sort_values(['current_streak', 'longest_streak'], ascending=False).head(10)
+                 .rename(columns={'username': 'Username', 'active_days': 'Active Days',
+                                  'longest_streak': 'Longest Streak', 'current_streak': 'Current Streak'}),
+                 use_container_width=True, hide_index=True)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cf_problem_figures(college, batch, username, version, problemset_at):
+    """(top tags figure dict, difficulty figure dict) of solved problems, each None when empty."""
+    tags = load_cf_tag_counts(college, batch, username).head(20)
+    tags_fig = None
+    if not tags.empty:
+        tags_fig = go.Figure(go.Bar(
+            x=tags['solved'][::-1], y=tags['tag'][::-1], orientation='h', marker_color='#00a8cc',
+            customdata=tags['students'][::-1],
+            hovertemplate="%{y}: %{x} solved by %{customdata} student(s)<extra></extra>",
         ))
-        fig.update_layout(title="Student Distribution by Problems Solved", height=400,
-                          xaxis_title="Problems Solved", yaxis_title="Number of Students")
-        st.plotly_chart(fig, use_container_width=True)
+        tags_fig.update_layout(title="Top Tags", height=500, xaxis_title="Problems Solved")
+        tags_fig = tags_fig.to_dict()
+
+    difficulty = load_cf_difficulty_counts(college, batch, username)
+    difficulty_fig = None
+    if not difficulty.empty:
+        difficulty_fig = go.Figure(go.Bar(
+            x=difficulty['rating'], y=difficulty['solved'], marker_color='#e67e22',
+            customdata=difficulty['students'],
+            hovertemplate="Rating %{x}: %{y} solved by %{customdata} student(s)<extra></extra>",
+        ))
+        difficulty_fig.update_layout(title="Problem Difficulty", height=500,
+                                     xaxis_title="Problem Rating", yaxis_title="Problems Solved")
+        difficulty_fig = difficulty_fig.to_dict()
+    return tags_fig, difficulty_fig
+
+def display_cf_problem_analytics(found_df, college=None, batch=None):
+    """Tag and difficulty histograms of solved problems for the cohort or one of its students."""
+    st.subheader("Solved Problems by Tag and Difficulty")
+    if not st.session_state.get('cf_problemset_checked'):
+        # at most one download attempt per session; refresh_cf_problemset() itself honours the TTL
+        refresh_cf_problemset()
+        st.session_state['cf_problemset_checked'] = True
+    state = load_cf_problemset_state()
+    student = st.selectbox("Student", ["Whole cohort"] + sorted(found_df['username'].tolist()),
+                           key="cf_analytics_student")
+    username = None if student == "Whole cohort" else student
+    tags_fig, difficulty_fig = cf_problem_figures(college, batch, username, load_data_version('codeforces'),
+                                                  state[0] if state else None)
 
+    col1, col2 = st.columns(2)
+    with col1:
+        if tags_fig is None:
+            st.info("No tagged solved problems yet." if state else "Problemset not cached yet.")
+        else:
+            st.plotly_chart(tags_fig, use_container_width=True)
     with col2:
-        fig = go.Figure(go.Pie(
-            labels=bucket_df['Bucket'],
-            values=bucket_df['Students'],
-            marker=dict(colors=['#2ecc71', '#27ae60', '#f1c40f', '#e67e22', '#e74c3c']),
-            hole=0.35,
-        ))
-        fig.update_layout(title="Distribution (%)", height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        if difficulty_fig is None:
+            st.info("No rated solved problems yet.")
+        else:
+            st.plotly_chart(difficulty_fig, use_container_width=True)
+    if state:
+        st.caption(f"Problemset cached {datetime.fromtimestamp(state[0]):%Y-%m-%d %H:%M} ({state[1]} problems)")
+
+def display_batch_dashboard_from_db(found_df, college=None, batch=None, top=None):
+    """Display aggregate dashboard from a load_all_profiles() frame; the filter arguments key the figure cache."""
+    st.header("Batch Dashboard")
+    mark = stage_clock('dashboard.leetcode')
+    summary, figures = leetcode_dashboard_figures(college, batch, top, load_data_version('leetcode'), found_df)
+
+    # ---- KPI metrics row ----
+    st.subheader("Overview")
+    k1, k2, k3, k4, k5 = st.columns(5)
+    k1.metric("Total Students", summary['total_students'])
+    k2.metric("Avg Problems Solved", f"{summary['avg_solved']:.1f}")
+    k3.metric("Avg Contest Rating", f"{summary['avg_rating']:.1f}")
+    k4.metric("Avg Score", f"{summary['avg_score']:.1f}")
+    k5.metric("Avg Contests Attended", f"{summary['avg_contests']:.1f}")
+
+    mark('overview')
+
+    # ---- Question bucket breakdown ----
+    st.subheader("Students by Problems Solved")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(figures['buckets_bar'], use_container_width=True)
+    with col2:
+        st.plotly_chart(figures['buckets_pie'], use_container_width=True)
+
+    mark('buckets')
 
     # ---- Difficulty breakdown averages ----
     st.subheader("Average Difficulty Breakdown")
     diff_cols = st.columns(3)
-    diff_cols[0].metric("Avg Easy", f"{found_df['Easy'].mean():.1f}")
-    diff_cols[1].metric("Avg Medium", f"{found_df['Medium'].mean():.1f}")
-    diff_cols[2].metric("Avg Hard", f"{found_df['Hard'].mean():.1f}")
+    diff_cols[0].metric("Avg Easy", f"{summary['avg_easy']:.1f}")
+    diff_cols[1].metric("Avg Medium", f"{summary['avg_medium']:.1f}")
+    diff_cols[2].metric("Avg Hard", f"{summary['avg_hard']:.1f}")
 
     # Stacked bar of difficulty per student
-    fig = go.Figure()
-    fig.add_trace(go.Bar(name='Easy', x=found_df['Username'], y=found_df['Easy'], marker_color='#00b8a3'))
-    fig.add_trace(go.Bar(name='Medium', x=found_df['Username'], y=found_df['Medium'], marker_color='#ffc01e'))
-    fig.add_trace(go.Bar(name='Hard', x=found_df['Username'], y=found_df['Hard'], marker_color='#ef4743'))
-    fig.update_layout(barmode='stack', title="Problems Solved by Difficulty per Student",
-                      xaxis_title="Username", yaxis_title="Problems Solved", height=450)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figures['difficulty'], use_container_width=True)
+
+    mark('difficulty')
 
     # ---- Contest Rating distribution ----
     st.subheader("Contest Rating Distribution")
-    rated_df = found_df[found_df['Contest Rating'] > 0]
-    if not rated_df.empty:
-        fig = px.histogram(rated_df, x='Contest Rating', nbins=15,
-                           color_discrete_sequence=['#3498db'],
-                           title="Contest Rating Histogram")
-        fig.update_layout(height=400, xaxis_title="Contest Rating", yaxis_title="Count")
-        st.plotly_chart(fig, use_container_width=True)
+    if 'rating_hist' in figures:
+        st.plotly_chart(figures['rating_hist'], use_container_width=True)
     else:
         st.info("No students have contest ratings.")
 
+    mark('rating_distribution')
+
     # ---- Score distribution ----
     st.subheader("Score Distribution")
-    fig = px.histogram(found_df, x='Score', nbins=15,
-                       color_discrete_sequence=['#9b59b6'],
-                       title="Overall Score Histogram")
-    fig.update_layout(height=400, xaxis_title="Score (/1000)", yaxis_title="Count")
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figures['score_hist'], use_container_width=True)
+
+    mark('score_distribution')
+
+    display_rating_trajectory('leetcode', college, batch, color='#ffc01e')
+    mark('trajectory')
+
+    display_activity_heatmap('leetcode', college, batch, colorscale='YlOrBr')
+    mark('activity')
 
     # ---- Full data table ----
     st.subheader("All Students Data")
-    display_cols = ['Name', 'Username', 'College', 'Batch', 'Easy', 'Medium', 'Hard', 'Total Solved',
-                    'Contest Rating', 'Contests Attended', 'Global Ranking', 'Score']
+    display_cols = {
+        'student_name': 'Name', 'username': 'Username', 'college': 'College', 'batch': 'Batch',
+        'easy': 'Easy', 'medium': 'Medium', 'hard': 'Hard', 'total_solved': 'Total Solved',
+        'contest_rating': 'Contest Rating', 'contests_attended': 'Contests Attended',
+        'global_ranking': 'Global Ranking', 'score': 'Score', 'cohort_rank': 'Cohort Rank',
+        'cohort_percentile': 'Percentile',
+    }
     st.dataframe(
-        found_df[display_cols].sort_values('Score', ascending=False).reset_index(drop=True),
+        found_df[list(display_cols)].sort_values('score', ascending=False).rename(columns=display_cols),
         use_container_width=True,
         hide_index=True,
     )
+    mark('table')
 
 
-def display_cf_batch_dashboard_from_db(found_df):
+def display_cf_batch_dashboard_from_db(found_df, college=None, batch=None, top=None):
     """Display aggregate dashboard from SQLite cached Codeforces DataFrame."""
     st.header("Codeforces Batch Dashboard")
-
-    found_df = found_df.rename(columns={
-        'username': 'Username', 'student_name': 'Name', 'college': 'College', 'batch': 'Batch',
-        'rating': 'Rating', 'max_rating': 'Max Rating', 'rank': 'Rank',
-        'problems_solved': 'Problems Solved', 'contests_attended': 'Contests Attended',
-        'avg_problem_rating': 'Avg Problem Rating', 'score': 'Score',
-    })
+    mark = stage_clock('dashboard.codeforces')
+    summary, figures = codeforces_dashboard_figures(college, batch, top, load_data_version('codeforces'), found_df)
 
     # ---- KPI metrics row ----
     st.subheader("Overview")
-    total_students = len(found_df)
-    avg_solved = found_df['Problems Solved'].mean()
-    avg_rating = found_df['Rating'].mean()
-    avg_max_rating = found_df['Max Rating'].mean()
-    avg_score = found_df['Score'].mean()
-    avg_contests = found_df['Contests Attended'].mean()
-
     k1, k2, k3, k4, k5, k6 = st.columns(6)
-    k1.metric("Total Students", total_students)
-    k2.metric("Avg Problems Solved", f"{avg_solved:.1f}")
-    k3.metric("Avg Rating", f"{avg_rating:.1f}")
-    k4.metric("Avg Max Rating", f"{avg_max_rating:.1f}")
-    k5.metric("Avg Score", f"{avg_score:.1f}")
-    k6.metric("Avg Contests", f"{avg_contests:.1f}")
+    k1.metric("Total Students", summary['total_students'])
+    k2.metric("Avg Problems Solved", f"{summary['avg_solved']:.1f}")
+    k3.metric("Avg Rating", f"{summary['avg_rating']:.1f}")
+    k4.metric("Avg Max Rating", f"{summary['avg_max_rating']:.1f}")
+    k5.metric("Avg Score", f"{summary['avg_score']:.1f}")
+    k6.metric("Avg Contests", f"{summary['avg_contests']:.1f}")
+
+    mark('overview')
 
     # ---- Rank distribution ----
     st.subheader("Students by Rank")
-    rank_order = ['legendary grandmaster', 'international grandmaster', 'grandmaster',
-                  'international master', 'master', 'candidate master',
-                  'expert', 'specialist', 'pupil', 'newbie', 'unrated']
-    rank_colors = {
-        'legendary grandmaster': '#aa0000', 'international grandmaster': '#ff0000',
-        'grandmaster': '#ff0000', 'international master': '#ff8c00',
-        'master': '#ff8c00', 'candidate master': '#aa00aa',
-        'expert': '#0000ff', 'specialist': '#03a89e',
-        'pupil': '#008000', 'newbie': '#808080', 'unrated': '#cccccc',
-    }
-
-    rank_counts = []
-    for r in rank_order:
-        count = len(found_df[found_df['Rank'].str.lower() == r])
-        if count > 0:
-            rank_counts.append({'Rank': r.title(), 'Students': count,
-                                'Color': rank_colors.get(r, '#cccccc')})
-
-    if rank_counts:
-        rank_df = pd.DataFrame(rank_counts)
+    if 'ranks_bar' in figures:
         col1, col2 = st.columns(2)
-
         with col1:
-            fig = go.Figure(go.Bar(
-                x=rank_df['Rank'], y=rank_df['Students'],
-                marker_color=rank_df['Color'].tolist(),
-                text=rank_df['Students'], textposition='auto',
-            ))
-            fig.update_layout(title="Student Distribution by Rank", height=400,
-                              xaxis_title="Rank", yaxis_title="Number of Students")
-            st.plotly_chart(fig, use_container_width=True)
-
+            st.plotly_chart(figures['ranks_bar'], use_container_width=True)
         with col2:
-            fig = go.Figure(go.Pie(
-                labels=rank_df['Rank'], values=rank_df['Students'],
-                marker=dict(colors=rank_df['Color'].tolist()), hole=0.35,
-            ))
-            fig.update_layout(title="Rank Distribution (%)", height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(figures['ranks_pie'], use_container_width=True)
+
+    mark('ranks')
 
     # ---- Problems Solved buckets ----
     st.subheader("Students by Problems Solved")
-    buckets = [
-        ("50+ problems", 50), ("30-49 problems", 30),
-        ("15-29 problems", 15), ("5-14 problems", 5), ("< 5 problems", 0),
-    ]
-    bucket_counts = []
-    for label, lower in buckets:
-        if lower == 50:
-            count = len(found_df[found_df['Problems Solved'] >= 50])
-        elif lower == 30:
-            count = len(found_df[(found_df['Problems Solved'] >= 30) & (found_df['Problems Solved'] < 50)])
-        elif lower == 15:
-            count = len(found_df[(found_df['Problems Solved'] >= 15) & (found_df['Problems Solved'] < 30)])
-        elif lower == 5:
-            count = len(found_df[(found_df['Problems Solved'] >= 5) & (found_df['Problems Solved'] < 15)])
-        else:
-            count = len(found_df[found_df['Problems Solved'] < 5])
-        bucket_counts.append({'Bucket': label, 'Students': count})
-
-    bucket_df = pd.DataFrame(bucket_counts)
     col1, col2 = st.columns(2)
     with col1:
-        fig = go.Figure(go.Bar(
-            x=bucket_df['Bucket'], y=bucket_df['Students'],
-            marker_color=['#2ecc71', '#27ae60', '#f1c40f', '#e67e22', '#e74c3c'],
-            text=bucket_df['Students'], textposition='auto',
-        ))
-        fig.update_layout(title="Student Distribution by Problems Solved", height=400,
-                          xaxis_title="Problems Solved", yaxis_title="Number of Students")
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figures['buckets_bar'], use_container_width=True)
     with col2:
-        fig = go.Figure(go.Pie(
-            labels=bucket_df['Bucket'], values=bucket_df['Students'],
-            marker=dict(colors=['#2ecc71', '#27ae60', '#f1c40f', '#e67e22', '#e74c3c']),
-            hole=0.35,
-        ))
-        fig.update_layout(title="Distribution (%)", height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figures['buckets_pie'], use_container_width=True)
+
+    mark('buckets')
 
     # ---- Rating distribution ----
     st.subheader("Rating Distribution")
-    rated_df = found_df[found_df['Rating'] > 0]
-    if not rated_df.empty:
-        fig = px.histogram(rated_df, x='Rating', nbins=15,
-                           color_discrete_sequence=['#00a8cc'],
-                           title="Current Rating Histogram")
-        fig.update_layout(height=400, xaxis_title="Rating", yaxis_title="Count")
-        st.plotly_chart(fig, use_container_width=True)
-
-        fig2 = px.histogram(rated_df, x='Max Rating', nbins=15,
-                            color_discrete_sequence=['#e67e22'],
-                            title="Max Rating Histogram")
-        fig2.update_layout(height=400, xaxis_title="Max Rating", yaxis_title="Count")
-        st.plotly_chart(fig2, use_container_width=True)
+    if 'rating_hist' in figures:
+        st.plotly_chart(figures['rating_hist'], use_container_width=True)
+        st.plotly_chart(figures['max_rating_hist'], use_container_width=True)
     else:
         st.info("No students have ratings.")
 
+    mark('rating_distribution')
+
     # ---- Problems solved per student bar ----
     st.subheader("Problems Solved per Student")
-    fig = go.Figure(go.Bar(
-        x=found_df['Username'], y=found_df['Problems Solved'],
-        marker_color='#3498db', text=found_df['Problems Solved'], textposition='auto',
-    ))
-    fig.update_layout(title="Problems Solved per Student", height=450,
-                      xaxis_title="Username", yaxis_title="Problems Solved")
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figures['per_student'], use_container_width=True)
+
+    mark('per_student')
 
     # ---- Score distribution ----
     st.subheader("Score Distribution")
-    fig = px.histogram(found_df, x='Score', nbins=15,
-                       color_discrete_sequence=['#9b59b6'],
-                       title="Overall Score Histogram")
-    fig.update_layout(height=400, xaxis_title="Score (/1000)", yaxis_title="Count")
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figures['score_hist'], use_container_width=True)
+
+    mark('score_distribution')
+
+    display_rating_trajectory('codeforces', college, batch, color='#00a8cc')
+    mark('trajectory')
+
+    display_activity_heatmap('codeforces', college, batch, colorscale='Blues')
+    mark('activity')
+
+    display_cf_problem_analytics(found_df, college, batch)
+    mark('problem_analytics')
 
     # ---- Full data table ----
     st.subheader("All Students Data")
-    display_cols = ['Name', 'Username', 'College', 'Batch', 'Rating', 'Max Rating', 'Rank',
-                    'Problems Solved', 'Contests Attended', 'Avg Problem Rating', 'Score']
+    display_cols = {
+        'student_name': 'Name', 'username': 'Username', 'college': 'College', 'batch': 'Batch',
+        'rating': 'Rating', 'max_rating': 'Max Rating', 'rank': 'Rank',
+        'problems_solved': 'Problems Solved', 'contests_attended': 'Contests Attended',
+        'avg_problem_rating': 'Avg Problem Rating', 'score': 'Score',
+        'cohort_rank': 'Cohort Rank', 'cohort_percentile': 'Percentile',
+    }
     st.dataframe(
-        found_df[display_cols].sort_values('Score', ascending=False).reset_index(drop=True),
+        found_df[list(display_cols)].sort_values('score', ascending=False).rename(columns=display_cols),
         use_container_width=True, hide_index=True,
     )
+    mark('table')
+
 
+def display_combined_leaderboard():
+    """Cross-platform leaderboard built from the students table."""
+    st.header("Combined Leaderboard")
+    cohorts = load_student_cohorts()
+    if not cohorts:
+        st.warning("No profiles in database yet. Add students from the Batch Dashboard first.")
+        return
+
+    ff1, ff2 = st.columns(2)
+    with ff1:
+        college_options = ["All"] + sorted({c for c, _ in cohorts})
+        filter_college = st.selectbox("Filter by College", college_options, key="combined_college")
+    with ff2:
+        batch_options = ["All"] + sorted({b for _, b in cohorts})
+        filter_batch = st.selectbox("Filter by Batch", batch_options, key="combined_batch")
+
+    df = load_combined_leaderboard(None if filter_college == "All" else filter_college,
+                                   None if filter_batch == "All" else filter_batch)
+    if df.empty:
+        st.warning("No profiles match the selected filters.")
+        return
+
+    both = df['leetcode_username'].notna() & df['codeforces_username'].notna()
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric("Students", len(df))
+    k2.metric("On Both Platforms", int(both.sum()))
+    k3.metric("Avg Combined Score", f"{df['combined_score'].mean():.1f}")
+    k4.metric("Top Combined Score", f"{df['combined_score'].max():.1f}")
+
+    if both.any():
+        fig = px.scatter(df[both], x='leetcode_score', y='codeforces_score', hover_name='student_name',
+                         color='college', title="LeetCode vs Codeforces Score")
+        fig.update_layout(height=450, xaxis_title="LeetCode Score", yaxis_title="Codeforces Score")
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        df.rename(columns={
+            'student_name': 'Name', 'college': 'College', 'batch': 'Batch',
+            'leetcode_username': 'LeetCode', 'leetcode_solved': 'LC Solved',
+            'leetcode_rating': 'LC Rating', 'leetcode_score': 'LC Score',
+            'codeforces_username': 'Codeforces', 'codeforces_solved': 'CF Solved',
+            'codeforces_rating': 'CF Rating', 'codeforces_score': 'CF Score',
+            'combined_score': 'Combined Score',
+        }),
+        use_container_width=True, hide_index=True,
+    )
+
+
+# Profiles fetched from the dashboard are saved in groups of this size, so an import re-ranks
+# each cohort once per group and an interrupted run keeps what it already fetched
+SAVE_BATCH_SIZE = 25
 
 # Main App
+def display_leetcode_lookup(username, fetched_at, data):
+    """Single-user LeetCode page for a fetched payload (None when the user was not found)."""
+    if not (data and data.get('matchedUser')):
+        st.error(f"User '{username}' not found. Please check the username and try again.")
+        return
+    view = leetcode_profile_view(username, fetched_at, data)
+    st.divider()
+    display_profile_header(view)
+    st.divider()
+    display_stats_overview(view)
+    st.divider()
+    display_problem_breakdown(view)
+    st.divider()
+    display_contest_stats(view)
+    st.divider()
+    display_recent_submissions(view)
+    st.divider()
+    display_badges(view)
+
+    with st.expander("How is the score calculated?"):
+        st.markdown("""
+        **Overall Score (Max: 1000 points)**
+
+        - **Problem Solving (400 points)**: Based on problems solved
+          - Easy: 1 point each
+          - Medium: 3 points each
+          - Hard: 5 points each
+          - Normalized to max 400
+
+        - **Contest Rating (300 points)**: Based on contest performance
+          - Rating / 10 (capped at 300)
+
+        - **Consistency (200 points)**: Based on contest participation
+          - 2 points per contest attended (capped at 200)
+
+        - **Ranking Bonus (100 points)**: Based on global ranking
+          - Top 1000: 100 points
+          - Top 10K: 80 points
+          - Top 50K: 60 points
+          - Top 100K: 40 points
+          - Others: 20 points
+        """)
+
+def display_codeforces_lookup(username, data):
+    """Single-user Codeforces page for a fetched payload (None when the user was not found)."""
+    if not (data and data.get('user')):
+        st.error(f"User '{username}' not found. Please check the username and try again.")
+        return
+    st.divider()
+    display_codeforces_profile(data)
+    st.divider()
+    display_codeforces_stats(data)
+
+    with st.expander("How is the score calculated?"):
+        st.markdown("""
+        **Overall Score (Max: 1000 points)**
+
+        - **Rating (400 points)**: Based on max rating
+          - Max Rating / 7.5 (3000 rating = 400 points)
+
+        - **Contest Participation (300 points)**: Based on contests
+          - 3 points per contest (capped at 300)
+
+        - **Problem Solving (200 points)**: Based on unique problems solved
+          - 2 points per problem (capped at 200)
+
+        - **Rank Bonus (100 points)**: Based on current rank
+          - Legendary Grandmaster: 100
+          - International Grandmaster: 95
+          - Grandmaster: 90
+          - International Master: 80
+          - Master: 70
+          - Candidate Master: 60
+          - Expert: 50
+          - Specialist: 40
+          - Pupil: 30
+          - Newbie: 20
+        """)
+
+LOOKUP_PLATFORMS = {'leetcode': "LeetCode", 'codeforces': "Codeforces"}
+
+def _display_lookup_result(platform, username, fetched_at, data, error):
+    if error:
+        st.warning(f"{LOOKUP_PLATFORMS[platform]} lookup for '{username}' failed: {error}")
+    elif platform == 'leetcode':
+        display_leetcode_lookup(username, fetched_at, data)
+    else:
+        display_codeforces_lookup(username, data)
+
+def display_student_lookup():
+    """Look up one student on both platforms at once, rendering each tab as its fetch finishes."""
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        lc_username = st.text_input("LeetCode Username", placeholder="e.g., john_doe", key="lookup_lc").strip()
+    with col2:
+        cf_username = st.text_input("Codeforces Handle", placeholder="same as LeetCode if blank",
+                                    key="lookup_cf").strip() or lc_username
+    with col3:
+        st.write("")
+        st.write("")
+        search_button = st.button("Search", type="primary", key="lookup_search")
+
+    lookup = {platform: username for platform, username in
+              (('leetcode', lc_username), ('codeforces', cf_username)) if username}
+    if not lookup:
+        if search_button:
+            st.warning("Please enter a username")
+        return
+
+    tabs = dict(zip(lookup, st.tabs([LOOKUP_PLATFORMS[platform] for platform in lookup])))
+    cached = st.session_state.get('student_lookup')
+    if not search_button and cached and cached[0] == lookup:
+        _, fetched_at, results = cached
+        for platform, (data, error) in results.items():
+            with tabs[platform]:
+                _display_lookup_result(platform, lookup[platform], fetched_at, data, error)
+        return
+
+    slots = {}
+    for platform, tab in tabs.items():
+        with tab:
+            slots[platform] = st.empty()
+            slots[platform].info(f"Fetching {LOOKUP_PLATFORMS[platform]} data for {lookup[platform]}...")
+    fetched_at = datetime.now().isoformat()
+    results = {}
+    for platform, data, error in fetch_student_profiles(lookup):
+        results[platform] = (data, error)
+        with slots[platform].container():
+            _display_lookup_result(platform, lookup[platform], fetched_at, data, error)
+    st.session_state['student_lookup'] = (lookup, fetched_at, results)
+
 def main():
     st.title("Coding Profile Analyzer")
     st.markdown("Enter a username to view comprehensive profile statistics")
 
+    if http_cache.HTTP_CACHE_MODE != 'off':
+        st.sidebar.caption(f"HTTP cache: **{http_cache.HTTP_CACHE_MODE}** (TTL {http_cache.HTTP_CACHE_TTL}s)")
+        if st.sidebar.button("Clear HTTP cache", key="clear_http_cache"):
+            http_cache.clear()
+
     # Platform selection
     platform = st.radio("Select Platform", ["LeetCode", "Codeforces"], horizontal=True)
 
     # Mode selection
-    mode = st.radio("Mode", ["Single User", "Batch Dashboard"], horizontal=True)
+    mode = st.radio("Mode", ["Single User", "Both Platforms", "Batch Dashboard", "Combined Leaderboard"],
+                    horizontal=True)
 
     if mode == "Single User":
         # Input section
@@ -1100,87 +3262,26 @@ def main():
                 st.warning("Please enter a username")
                 return
 
-            if platform == "LeetCode":
-                with st.spinner(f"Fetching LeetCode data for {username}..."):
-                    data = fetch_leetcode_data(username)
-
-                if data and data.get('matchedUser'):
-                    st.divider()
-                    display_profile_header(data)
-                    st.divider()
-                    display_stats_overview(data)
-                    st.divider()
-                    display_problem_breakdown(data)
-                    st.divider()
-                    display_contest_stats(data)
-                    st.divider()
-                    display_recent_submissions(data)
-                    st.divider()
-                    display_badges(data)
-
-                    with st.expander("How is the score calculated?"):
-                        st.markdown("""
-                        **Overall Score (Max: 1000 points)**
-
-                        - **Problem Solving (400 points)**: Based on problems solved
-                          - Easy: 1 point each
-                          - Medium: 3 points each
-                          - Hard: 5 points each
-                          - Normalized to max 400
-
-                        - **Contest Rating (300 points)**: Based on contest performance
-                          - Rating / 10 (capped at 300)
-
-                        - **Consistency (200 points)**: Based on contest participation
-                          - 2 points per contest attended (capped at 200)
-
-                        - **Ranking Bonus (100 points)**: Based on global ranking
-                          - Top 1000: 100 points
-                          - Top 10K: 80 points
-                          - Top 50K: 60 points
-                          - Top 100K: 40 points
-                          - Others: 20 points
-                        """)
-                else:
-                    st.error(f"User '{username}' not found. Please check the username and try again.")
+            # reruns (widget clicks, chart hovers) reuse the last payload; Search forces a refetch
+            lookup = (platform, username)
+            cached = st.session_state.get('single_user')
+            if search_button or not cached or cached[0] != lookup:
+                fetch = fetch_leetcode_data if platform == "LeetCode" else fetch_codeforces_data
+                with st.spinner(f"Fetching {platform} data for {username}..."):
+                    cached = (lookup, datetime.now().isoformat(), fetch(username))
+                st.session_state['single_user'] = cached
+            _, fetched_at, data = cached
 
+            if platform == "LeetCode":
+                display_leetcode_lookup(username, fetched_at, data)
             else:  # Codeforces
-                with st.spinner(f"Fetching Codeforces data for {username}..."):
-                    data = fetch_codeforces_data(username)
-
-                if data and data.get('user'):
-                    st.divider()
-                    display_codeforces_profile(data)
-                    st.divider()
-                    display_codeforces_stats(data)
-
-                    with st.expander("How is the score calculated?"):
-                        st.markdown("""
-                        **Overall Score (Max: 1000 points)**
-
-                        - **Rating (400 points)**: Based on max rating
-                          - Max Rating / 7.5 (3000 rating = 400 points)
-
-                        - **Contest Participation (300 points)**: Based on contests
-                          - 3 points per contest (capped at 300)
-
-                        - **Problem Solving (200 points)**: Based on unique problems solved
-                          - 2 points per problem (capped at 200)
-
-                        - **Rank Bonus (100 points)**: Based on current rank
-                          - Legendary Grandmaster: 100
-                          - International Grandmaster: 95
-                          - Grandmaster: 90
-                          - International Master: 80
-                          - Master: 70
-                          - Candidate Master: 60
-                          - Expert: 50
-                          - Specialist: 40
-                          - Pupil: 30
-                          - Newbie: 20
-                        """)
-                else:
-                    st.error(f"User '{username}' not found. Please check the username and try again.")
+                display_codeforces_lookup(username, data)
+
+    elif mode == "Both Platforms":
+        display_student_lookup()
+
+    elif mode == "Combined Leaderboard":
+        display_combined_leaderboard()
 
     else:  # Batch Dashboard
         COLLEGES = ["ADYPU, Pune", "SAGE, Indore", "GDG, Gurugram", "SSU, Gurugram"]
@@ -1214,18 +3315,23 @@ def main():
                         progress = st.progress(0, text="Starting...")
                         success_count = 0
                         fail_list = []
+                        pending = []
 
                         for i, uname in enumerate(usernames):
                             progress.progress((i) / len(usernames), text=f"Fetching {uname} ({i+1}/{len(usernames)})...")
                             data = fetch_leetcode_data(uname)
                             if data and data.get('matchedUser'):
-                                save_profile_to_db(uname, data, college=selected_college, batch=selected_batch)
+                                pending.append((uname, data, selected_college, selected_batch, ''))
+                                if len(pending) == SAVE_BATCH_SIZE:
+                                    save_profiles_to_db(pending)
+                                    pending = []
                                 success_count += 1
                             else:
                                 fail_list.append(uname)
                             if i < len(usernames) - 1:
                                 time.sleep(2)
 
+                        save_profiles_to_db(pending)
                         progress.progress(1.0, text="Done!")
                         status_container.success(f"Fetched {success_count}/{len(usernames)} profiles.")
                         if fail_list:
@@ -1261,12 +3367,19 @@ def main():
                         with uc2:
                             st.write("**Unique Batches:**", ", ".join(csv_df['batch'].unique()))
 
+                        display_queue_controls(
+                            'leetcode',
+                            csv_df.drop_duplicates(subset='profile')[['profile', 'college', 'batch', 'name']]
+                            .itertuples(index=False, name=None),
+                            "lc_csv")
+
                         if st.button("Fetch All from CSV", type="primary", key="csv_fetch"):
                             unique_profiles = csv_df.drop_duplicates(subset='profile')
                             status_container = st.empty()
                             progress = st.progress(0, text="Starting...")
                             success_count = 0
                             fail_list = []
+                            pending = []
 
                             for i, row in enumerate(unique_profiles.itertuples()):
                                 uname = row.profile
@@ -1279,13 +3392,17 @@ def main():
                                 )
                                 data = fetch_leetcode_data(uname)
                                 if data and data.get('matchedUser'):
-                                    save_profile_to_db(uname, data, college=college, batch=batch, student_name=sname)
+                                    pending.append((uname, data, college, batch, sname))
+                                    if len(pending) == SAVE_BATCH_SIZE:
+                                        save_profiles_to_db(pending)
+                                        pending = []
                                     success_count += 1
                                 else:
                                     fail_list.append(uname)
                                 if i < len(unique_profiles) - 1:
                                     time.sleep(2)
 
+                            save_profiles_to_db(pending)
                             progress.progress(1.0, text="Done!")
                             status_container.success(f"Fetched {success_count}/{len(unique_profiles)} profiles.")
                             if fail_list:
@@ -1301,6 +3418,41 @@ def main():
                 st.warning("No profiles in database yet. Enter usernames above and click Fetch & Save All.")
             else:
                 st.success(f"{len(cached_df)} profile(s) in database.")
+                display_refresh_schedule('leetcode')
+
+                if st.button("Refresh Contest Ratings Only", key="lc_contest_refresh",
+                             help="Re-fetch just contest rating/attendance for every stored profile "
+                                  "(e.g. right after a weekly contest)."):
+                    stored_users = cached_df['username'].tolist()
+                    batches = [stored_users[i:i + CONTEST_BATCH_SIZE]
+                               for i in range(0, len(stored_users), CONTEST_BATCH_SIZE)]
+                    progress = st.progress(0, text="Starting...")
+                    updated = 0
+                    failed_batches = 0
+
+                    for i, batch_users in enumerate(batches):
+                        progress.progress(i / len(batches), text=f"Fetching contest data ({i+1}/{len(batches)})...")
+                        contests = fetch_leetcode_contest_batch(batch_users)
+                        if contests is None:
+                            failed_batches += 1
+                        else:
+                            # only users who attended a new contest need their history re-fetched
+                            stale = load_stale_contest_histories(contests)
+                            histories = fetch_leetcode_contest_batch(stale, history=True) if stale else {}
+                            updated += update_contest_stats_in_db(contests, histories)
+                        if i < len(batches) - 1:
+                            time.sleep(2)
+
+                    progress.progress(1.0, text="Done!")
+                    st.session_state['lc_contest_refresh_result'] = (
+                        f"{failed_batches} of {len(batches)} contest requests failed." if failed_batches else None,
+                        f"Updated contest data for {updated} profile(s).")
+                    st.rerun()
+                if 'lc_contest_refresh_result' in st.session_state:
+                    warning, message = st.session_state.pop('lc_contest_refresh_result')
+                    if warning:
+                        st.warning(warning)
+                    st.success(message)
 
                 st.subheader("Filter Dashboard")
                 ff1, ff2 = st.columns(2)
@@ -1310,14 +3462,28 @@ def main():
                 with ff2:
                     batch_options = ["All"] + sorted(cached_df['batch'].unique().tolist())
                     filter_batch = st.selectbox("Filter by Batch", batch_options, key="filter_batch")
+                top_percent = st.radio("Within each college/batch", ["All", "Top 10%", "Top 25%", "Top 50%"],
+                                       horizontal=True, key="filter_top")
 
-                filtered_df = cached_df.copy()
+                # one boolean mask, so the dashboard gets the cached frame itself when unfiltered
+                mask = pd.Series(True, index=cached_df.index)
                 if filter_college != "All":
-                    filtered_df = filtered_df[filtered_df['college'] == filter_college]
+                    mask &= cached_df['college'] == filter_college
                 if filter_batch != "All":
-                    filtered_df = filtered_df[filtered_df['batch'] == filter_batch]
+                    mask &= cached_df['batch'] == filter_batch
+                if top_percent != "All":
+                    cutoff = 100 - int(top_percent.split()[1].rstrip('%'))
+                    mask &= cached_df['cohort_percentile'] > cutoff
+                filtered_df = cached_df if mask.all() else cached_df[mask]
 
                 with st.expander("Manage stored profiles"):
+                    search_text = st.text_input("Search by name, username or college", key="lc_search",
+                                                placeholder="e.g. priya or sage ind")
+                    if search_text.strip():
+                        st.dataframe(search_profiles(search_text, 'leetcode').rename(columns={
+                            'platform': 'Platform', 'username': 'Username', 'student_name': 'Name',
+                            'college': 'College', 'batch': 'Batch', 'score': 'Score'}),
+                            use_container_width=True, hide_index=True)
                     st.dataframe(
                         cached_df[['student_name', 'username', 'college', 'batch', 'total_solved', 'score', 'fetched_at']].rename(
                             columns={'student_name': 'Name', 'username': 'Username', 'college': 'College', 'batch': 'Batch',
@@ -1341,11 +3507,19 @@ def main():
                             clear_all_profiles()
                             st.rerun()
 
+                    display_bulk_actions('leetcode', cached_df,
+                                         None if filter_college == "All" else filter_college,
+                                         None if filter_batch == "All" else filter_batch, 'lc')
+
                 st.divider()
                 if filtered_df.empty:
                     st.warning("No profiles match the selected filters.")
                 else:
-                    display_batch_dashboard_from_db(filtered_df)
+                    display_batch_dashboard_from_db(
+                        filtered_df,
+                        college=None if filter_college == "All" else filter_college,
+                        batch=None if filter_batch == "All" else filter_batch,
+                        top=None if top_percent == "All" else top_percent)
 
         else:  # Codeforces Batch Dashboard
             input_tab, csv_tab = st.tabs(["Manual Entry", "Upload CSV"])
@@ -1376,18 +3550,23 @@ def main():
                         progress = st.progress(0, text="Starting...")
                         success_count = 0
                         fail_list = []
+                        pending = []
 
                         for i, uname in enumerate(usernames):
                             progress.progress((i) / len(usernames), text=f"Fetching {uname} ({i+1}/{len(usernames)})...")
                             data = fetch_codeforces_data(uname)
                             if data and data.get('user'):
-                                save_cf_profile_to_db(uname, data, college=selected_college, batch=selected_batch)
+                                pending.append((uname, data, selected_college, selected_batch, ''))
+                                if len(pending) == SAVE_BATCH_SIZE:
+                                    save_cf_profiles_to_db(pending)
+                                    pending = []
                                 success_count += 1
                             else:
                                 fail_list.append(uname)
                             if i < len(usernames) - 1:
                                 time.sleep(2)
 
+                        save_cf_profiles_to_db(pending)
                         progress.progress(1.0, text="Done!")
                         status_container.success(f"Fetched {success_count}/{len(usernames)} profiles.")
                         if fail_list:
@@ -1423,12 +3602,19 @@ def main():
                         with uc2:
                             st.write("**Unique Batches:**", ", ".join(csv_df['batch'].unique()))
 
+                        display_queue_controls(
+                            'codeforces',
+                            csv_df.drop_duplicates(subset='profile')[['profile', 'college', 'batch', 'name']]
+                            .itertuples(index=False, name=None),
+                            "cf_csv")
+
                         if st.button("Fetch All from CSV", type="primary", key="cf_csv_fetch"):
                             unique_profiles = csv_df.drop_duplicates(subset='profile')
                             status_container = st.empty()
                             progress = st.progress(0, text="Starting...")
                             success_count = 0
                             fail_list = []
+                            pending = []
 
                             for i, row in enumerate(unique_profiles.itertuples()):
                                 uname = row.profile
@@ -1441,13 +3627,17 @@ def main():
                                 )
                                 data = fetch_codeforces_data(uname)
                                 if data and data.get('user'):
-                                    save_cf_profile_to_db(uname, data, college=college, batch=batch, student_name=sname)
+                                    pending.append((uname, data, college, batch, sname))
+                                    if len(pending) == SAVE_BATCH_SIZE:
+                                        save_cf_profiles_to_db(pending)
+                                        pending = []
                                     success_count += 1
                                 else:
                                     fail_list.append(uname)
                                 if i < len(unique_profiles) - 1:
                                     time.sleep(2)
 
+                            save_cf_profiles_to_db(pending)
                             progress.progress(1.0, text="Done!")
                             status_container.success(f"Fetched {success_count}/{len(unique_profiles)} profiles.")
                             if fail_list:
@@ -1463,6 +3653,7 @@ def main():
                 st.warning("No Codeforces profiles in database yet. Enter handles above and click Fetch & Save All.")
             else:
                 st.success(f"{len(cached_df)} Codeforces profile(s) in database.")
+                display_refresh_schedule('codeforces')
 
                 st.subheader("Filter Dashboard")
                 ff1, ff2 = st.columns(2)
@@ -1472,14 +3663,28 @@ def main():
                 with ff2:
                     batch_options = ["All"] + sorted(cached_df['batch'].unique().tolist())
                     filter_batch = st.selectbox("Filter by Batch", batch_options, key="cf_filter_batch")
+                top_percent = st.radio("Within each college/batch", ["All", "Top 10%", "Top 25%", "Top 50%"],
+                                       horizontal=True, key="cf_filter_top")
 
-                filtered_df = cached_df.copy()
+                # one boolean mask, so the dashboard gets the cached frame itself when unfiltered
+                mask = pd.Series(True, index=cached_df.index)
                 if filter_college != "All":
-                    filtered_df = filtered_df[filtered_df['college'] == filter_college]
+                    mask &= cached_df['college'] == filter_college
                 if filter_batch != "All":
-                    filtered_df = filtered_df[filtered_df['batch'] == filter_batch]
+                    mask &= cached_df['batch'] == filter_batch
+                if top_percent != "All":
+                    cutoff = 100 - int(top_percent.split()[1].rstrip('%'))
+                    mask &= cached_df['cohort_percentile'] > cutoff
+                filtered_df = cached_df if mask.all() else cached_df[mask]
 
                 with st.expander("Manage stored profiles"):
+                    search_text = st.text_input("Search by name, username or college", key="cf_search",
+                                                placeholder="e.g. priya or sage ind")
+                    if search_text.strip():
+                        st.dataframe(search_profiles(search_text, 'codeforces').rename(columns={
+                            'platform': 'Platform', 'username': 'Username', 'student_name': 'Name',
+                            'college': 'College', 'batch': 'Batch', 'score': 'Score'}),
+                            use_container_width=True, hide_index=True)
                     st.dataframe(
                         cached_df[['student_name', 'username', 'college', 'batch', 'problems_solved', 'score', 'fetched_at']].rename(
                             columns={'student_name': 'Name', 'username': 'Username', 'college': 'College', 'batch': 'Batch',
@@ -1503,11 +3708,33 @@ def main():
                             clear_all_cf_profiles()
                             st.rerun()
 
+                    display_bulk_actions('codeforces', cached_df,
+                                         None if filter_college == "All" else filter_college,
+                                         None if filter_batch == "All" else filter_batch, 'cf')
+
                 st.divider()
                 if filtered_df.empty:
                     st.warning("No profiles match the selected filters.")
                 else:
-                    display_cf_batch_dashboard_from_db(filtered_df)
+                    display_cf_batch_dashboard_from_db(
+                        filtered_df,
+                        college=None if filter_college == "All" else filter_college,
+                        batch=None if filter_batch == "All" else filter_batch,
+                        top=None if top_percent == "All" else top_percent)
+
+        with st.expander("What changed"):
+            display_change_feed(platform.lower())
+
+        with st.expander("Fetch log analytics"):
+            display_fetch_log_analytics(platform.lower())
+
+        with st.expander("Export for analytics"):
+            display_export_controls()
+
+    flush_fetch_log()
+    if st.sidebar.checkbox("Show performance metrics", key="show_metrics"):
+        display_metrics_panel()
+    write_metrics_file()
 
     # Footer
     st.divider()
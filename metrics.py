@@ -0,0 +1,127 @@
+"""Per-stage timings and per-platform HTTP counters.
+
+The dashboard shows them in the sidebar and writes them to METRICS_PATH in Prometheus
+text format after every run.
+"""
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+METRICS_PATH = os.environ.get(
+    'METRICS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics.prom"))
+
+@st.cache_resource
+def _metrics_registry():
+    """Process-wide timings and counters; cache_resource keeps it alive across reruns."""
+    return {'lock': threading.Lock(), 'timings': {}, 'counters': {}}
+
+_METRICS = _metrics_registry()
+
+def record_timing(stage, seconds):
+    with _METRICS['lock']:
+        entry = _METRICS['timings'].setdefault(stage, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+def increment(name, platform, n=1):
+    with _METRICS['lock']:
+        key = (name, platform)
+        _METRICS['counters'][key] = _METRICS['counters'].get(key, 0) + n
+
+@contextmanager
+def timed(stage):
+    """Time a block (or, used as a decorator, every call of a function) under `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(stage, time.perf_counter() - start)
+
+def stage_clock(prefix):
+    """Returns mark(section), which records the time since the previous mark as prefix.section."""
+    last = [time.perf_counter()]
+
+    def mark(section):
+        now = time.perf_counter()
+        record_timing(f"{prefix}.{section}", now - last[0])
+        last[0] = now
+    return mark
+
+def reset_metrics():
+    with _METRICS['lock']:
+        _METRICS['timings'].clear()
+        _METRICS['counters'].clear()
+
+def metrics_snapshot():
+    """(timings DataFrame, counters DataFrame) for display."""
+    with _METRICS['lock']:
+        timings = [(stage, n, total * 1000, total / n * 1000, worst * 1000)
+                   for stage, (n, total, worst) in _METRICS['timings'].items()]
+        counters = [(name, platform, value) for (name, platform), value in _METRICS['counters'].items()]
+    timings_df = pd.DataFrame(timings, columns=['Stage', 'Calls', 'Total ms', 'Avg ms', 'Max ms'])
+    counters_df = pd.DataFrame(counters, columns=['Counter', 'Platform', 'Value'])
+    return timings_df.sort_values('Total ms', ascending=False), counters_df.sort_values(['Counter', 'Platform'])
+
+def write_metrics_file(path=None):
+    """Write the registry in Prometheus text exposition format."""
+    path = path or METRICS_PATH
+    with _METRICS['lock']:
+        timings = sorted(_METRICS['timings'].items())
+        counters = sorted(_METRICS['counters'].items())
+
+    lines = [
+        "# HELP coding_profiles_stage_seconds_total Wall time spent per stage.",
+        "# TYPE coding_profiles_stage_seconds_total counter",
+    ]
+    lines += [f'coding_profiles_stage_seconds_total{{stage="{stage}"}} {total:.6f}'
+              for stage, (_, total, _) in timings]
+    lines += [
+        "# HELP coding_profiles_stage_calls_total Number of timed calls per stage.",
+        "# TYPE coding_profiles_stage_calls_total counter",
+    ]
+    lines += [f'coding_profiles_stage_calls_total{{stage="{stage}"}} {n}' for stage, (n, _, _) in timings]
+    lines += [
+        "# HELP coding_profiles_stage_seconds_max Slowest single call per stage.",
+        "# TYPE coding_profiles_stage_seconds_max gauge",
+    ]
+    lines += [f'coding_profiles_stage_seconds_max{{stage="{stage}"}} {worst:.6f}'
+              for stage, (_, _, worst) in timings]
+    for name in sorted({name for (name, _), _ in counters}):
+        lines += [
+            f"# HELP coding_profiles_{name}_total Upstream HTTP {name} per platform.",
+            f"# TYPE coding_profiles_{name}_total counter",
+        ]
+        lines += [f'coding_profiles_{name}_total{{platform="{platform}"}} {value}'
+                  for (n, platform), value in counters if n == name]
+
+    # one tmp file per call: Streamlit sessions are threads of one process and write concurrently
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600; scrapers run as other users
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def display_metrics_panel():
+    """Sidebar panel with per-stage timings and per-platform request counters."""
+    timings_df, counters_df = metrics_snapshot()
+    st.sidebar.subheader("Performance")
+    if timings_df.empty:
+        st.sidebar.caption("No timings recorded yet.")
+    else:
+        st.sidebar.dataframe(timings_df.round(2), use_container_width=True, hide_index=True)
+    if not counters_df.empty:
+        st.sidebar.dataframe(counters_df, use_container_width=True, hide_index=True)
+    st.sidebar.caption(f"Prometheus file: `{METRICS_PATH}`")
+    if st.sidebar.button("Reset metrics", key="reset_metrics"):
+        reset_metrics()
@@ -0,0 +1,176 @@
+"""Incremental Parquet / Arrow IPC export of the stored profiles and contest history.
+
+Files are written under EXPORT_DIR/<table>/ for notebooks; pyarrow is optional and only
+imported on export. Incremental files hold the profiles inserted, changed or deleted since
+the previous export of that table and format: readers keep the rows with the highest
+change_seq per username and drop usernames whose latest row has deleted = 1.
+"""
+import os
+from datetime import datetime
+
+import db
+from metrics import timed
+
+EXPORT_DIR = os.environ.get(
+    'EXPORT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports"))
+EXPORT_ROW_GROUP_SIZE = 10_000
+# export name -> (profile table, table, columns); history rows are exported with their profile's fetched_at
+EXPORT_TABLES = {
+    'leetcode_profiles': ('leetcode_profiles', 'leetcode_profiles', [
+        'username', 'student_name', 'college', 'batch', 'easy', 'medium', 'hard', 'total_solved',
+        'contest_rating', 'contests_attended', 'global_ranking', 'score', 'cohort_rank',
+        'cohort_percentile', 'fetched_at']),
+    'codeforces_profiles': ('codeforces_profiles', 'codeforces_profiles', [
+        'username', 'student_name', 'college', 'batch', 'rating', 'max_rating', 'rank',
+        'problems_solved', 'contests_attended', 'avg_problem_rating', 'score', 'cohort_rank',
+        'cohort_percentile', 'fetched_at']),
+    'leetcode_contest_history': ('leetcode_profiles', 'leetcode_contest_history', [
+        'username', 'contest_title', 'start_time', 'rating', 'ranking']),
+    'codeforces_rating_history': ('codeforces_profiles', 'codeforces_rating_history', [
+        'username', 'contest_id', 'contest_name', 'contest_rank', 'old_rating', 'new_rating', 'updated_at']),
+}
+EXPORT_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+def _get_export_db():
+    conn = db.connect()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS export_state (
+            name TEXT NOT NULL,
+            format TEXT NOT NULL,
+            last_seq INTEGER,
+            exported_at TEXT,
+            rows INTEGER DEFAULT 0,
+            PRIMARY KEY (name, format)
+        )
+    """)
+    # migrate: the watermark used to be the newest fetched_at; states without last_seq re-export in full
+    if 'last_seq' not in {row[1] for row in conn.execute("PRAGMA table_info(export_state)")}:
+        conn.execute("ALTER TABLE export_state ADD COLUMN last_seq INTEGER")
+    conn.commit()
+    return conn
+
+def _arrow_schema(pa, conn, table, columns):
+    """Arrow schema from the declared SQLite column types, plus the change_seq / deleted columns."""
+    declared = {row[1]: (row[2] or '').upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+    types = {'INTEGER': pa.int64(), 'REAL': pa.float64()}
+    return pa.schema([(col, types.get(declared.get(col), pa.string())) for col in columns]
+                     + [('change_seq', pa.int64()), ('deleted', pa.int8())])
+
+def _export_one(pa, conn, name, fmt, since, until, directory):
+    """Write one table's rows (plus tombstones when `since` is set) to a new file; returns (path, rows)."""
+    profiles, table, columns = EXPORT_TABLES[name]
+    if table == profiles:
+        select = f"SELECT {', '.join('p.' + c for c in columns)}"
+        source = f"{table} p"
+    else:
+        select = f"SELECT {', '.join('h.' + c for c in columns)}, p.fetched_at"
+        source = f"{table} h JOIN {profiles} p ON p.username = h.username"
+        columns = columns + ['fetched_at']
+    nulls = ', '.join(['NULL'] * (len(columns) - 1))
+    cursor = conn.execute(f"""
+        {select}, v.seq, 0 FROM {source}
+        JOIN profile_versions v ON v.profile_table = ? AND v.username = p.username
+        WHERE v.seq > COALESCE(?, 0) AND v.seq <= ?
+        UNION ALL
+        SELECT v.username, {nulls}, v.seq, 1 FROM profile_versions v
+        WHERE ? IS NOT NULL AND v.profile_table = ? AND v.deleted AND v.seq > ? AND v.seq <= ?
+    """, (profiles, since, until, since, profiles, since, until))
+    schema = _arrow_schema(pa, conn, table, columns)
+
+    stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    path = os.path.join(directory, name, f"{name}-{stamp}{EXPORT_FORMATS[fmt]}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    writer = None
+    rows = 0
+    try:
+        while True:
+            chunk = cursor.fetchmany(EXPORT_ROW_GROUP_SIZE)
+            if not chunk:
+                break
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(zip(*chunk), schema)], schema=schema)
+            if writer is None:
+                if fmt == 'parquet':
+                    import pyarrow.parquet as pq
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                else:
+                    writer = pa.ipc.new_file(tmp_path, schema)
+            writer.write_batch(batch)
+            rows += len(chunk)
+        if writer is not None:
+            writer, closing = None, writer
+            closing.close()
+            os.replace(tmp_path, path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return (path if rows else None), rows
+
+@timed('export.tables')
+def export_tables(fmt='parquet', incremental=True, names=None, directory=None):
+    """Export each table to a new Parquet / Arrow IPC file under `directory`; returns [(name, path, rows)]."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("Columnar export needs pyarrow: pip install pyarrow") from None
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    directory = directory or EXPORT_DIR
+
+    names = names or list(EXPORT_TABLES)
+    conn = _get_export_db()
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'profile_versions'").fetchone():
+        conn.close()
+        return [(name, None, 0) for name in names]  # no profiles saved yet
+    results = []
+    for name in names:
+        profiles, _, _ = EXPORT_TABLES[name]
+        until = conn.execute("SELECT MAX(seq) FROM profile_versions WHERE profile_table = ?",
+                             (profiles,)).fetchone()[0]
+        state = conn.execute("SELECT last_seq FROM export_state WHERE name = ? AND format = ?",
+                             (name, fmt)).fetchone()
+        since = state[0] if state and incremental else None
+        if until is None or (since is not None and since >= until):
+            results.append((name, None, 0))
+            continue
+        path, rows = _export_one(pa, conn, name, fmt, since, until, directory)
+        conn.execute("""
+            INSERT INTO export_state (name, format, last_seq, exported_at, rows) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(name, format) DO UPDATE SET
+                last_seq=excluded.last_seq, exported_at=excluded.exported_at, rows=excluded.rows
+        """, (name, fmt, until, datetime.now().isoformat(), rows))
+        conn.commit()
+        results.append((name, path, rows))
+    conn.close()
+    return results
+
+def ensure_profile_versions(conn, table):
+    """Triggers recording each profile's latest change sequence, and deletes, in profile_versions."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS profile_versions (
+            profile_table TEXT NOT NULL,
+            username TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            deleted INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (profile_table, username)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_profile_versions_seq ON profile_versions(seq)")
+    next_seq = "(SELECT COALESCE(MAX(seq), 0) + 1 FROM profile_versions)"
+    watched = [c for c in EXPORT_TABLES[table][2] if c != 'username'] + ['raw_json']
+    changed = ' OR '.join(f"OLD.{c} IS NOT NEW.{c}" for c in watched)
+    for event, row, deleted, when in (('INSERT', 'NEW', 0, ''), ('DELETE', 'OLD', 1, ''),
+                                      ('UPDATE', 'NEW', 0, f"WHEN {changed}")):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_seq_{event.lower()} AFTER {event} ON {table} {when}
+            BEGIN
+                INSERT INTO profile_versions VALUES ('{table}', {row}.username, {next_seq}, {deleted})
+                ON CONFLICT(profile_table, username) DO UPDATE SET seq = excluded.seq, deleted = excluded.deleted;
+            END
+        """)
+    # profiles saved before versioning existed all start at the same sequence number
+    if not conn.execute("SELECT 1 FROM profile_versions WHERE profile_table = ? LIMIT 1", (table,)).fetchone():
+        conn.execute(f"INSERT OR IGNORE INTO profile_versions SELECT '{table}', username, {next_seq}, 0 FROM {table}")
@@ -0,0 +1,38 @@
+import logging
+import os
+import sys
+import tempfile
+import warnings
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'bench')]
+
+# never touch the checked-in leetcode_cache.db, even from code that runs at exit
+os.environ['LEETCODE_DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'default.db')
+
+# leetcode.py is a Streamlit script; importing it outside `streamlit run` is fine but noisy
+warnings.filterwarnings('ignore')
+logging.disable(logging.WARNING)
+
+import db  # noqa: E402
+import leetcode  # noqa: E402
+import mock_server  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app module pointed at a fresh database."""
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'test.db'))
+    return leetcode
+
+
+@pytest.fixture
+def mock_api(app, monkeypatch):
+    """Local mock LeetCode / Codeforces API; returns its base URL."""
+    server, base = mock_server.start_in_thread(port=0)
+    monkeypatch.setattr(app, 'LEETCODE_GRAPHQL_URL', f"{base}/graphql")
+    monkeypatch.setattr(app, 'CODEFORCES_API_URL', f"{base}/api")
+    yield base
+    server.shutdown()
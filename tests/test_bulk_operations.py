@@ -0,0 +1,135 @@
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import synthetic
+
+
+def _save(app, rows):
+    app.save_profiles_to_db([(u, synthetic.leetcode_profile(u), college, batch, name)
+                             for u, college, batch, name in rows])
+
+
+def _cohorts(app):
+    df = app.load_all_profiles()
+    return dict(zip(df['username'], zip(df['college'].astype(str), df['batch'].astype(str))))
+
+
+def _students(app):
+    conn = app._get_db()
+    students = conn.execute("SELECT name, college, batch FROM students ORDER BY name").fetchall()
+    conn.close()
+    return students
+
+
+def test_moved_profile_moves_back_on_a_normal_resave(app):
+    rows = synthetic.cohort(4)
+    _save(app, rows)
+    username, college, batch, name = rows[0]
+    assert app.bulk_move_profiles('leetcode', to_college='X', usernames=[username]) == 1
+    assert _cohorts(app)[username] == ('X', batch)
+
+    _save(app, [rows[0]])
+    assert _cohorts(app)[username] == (college, batch)
+
+
+def test_renamed_label_reverts_on_a_normal_resave(app):
+    rows = synthetic.cohort(4)
+    _save(app, rows)
+    college = rows[0][1]
+    assert app.rename_cohort_label('college', college, 'Renamed') == 1
+    _save(app, [rows[0]])
+    assert _cohorts(app)[rows[0][0]][0] == college
+
+
+def test_delete_and_move_drop_orphaned_students(app):
+    rows = synthetic.cohort(4)
+    _save(app, rows)
+    app.bulk_move_profiles('leetcode', to_batch='2030', usernames=[rows[0][0]])
+    app.bulk_delete_profiles('leetcode', usernames=[rows[1][0]])
+    app.delete_profile_from_db(rows[2][0])
+    (_, college0, _, name0), (_, college3, batch3, name3) = rows[0], rows[3]
+    assert _students(app) == [(name0, college0, '2030'), (name3, college3, batch3)]
+
+
+def test_bulk_filter_needs_a_criterion(app):
+    try:
+        app.bulk_delete_profiles('leetcode')
+    except ValueError:
+        return
+    raise AssertionError("deleting without a filter should be refused")
+
+
+def _assert_aggregates_match_frames(app):
+    """load_cohort_summary (from cohort_aggregates / cohort_rank_counts) equals summarize_* of the loaded frames."""
+    for platform, load, summarize in (('leetcode', app.load_all_profiles, app.summarize_leetcode_cohort),
+                                      ('codeforces', app.load_all_cf_profiles, app.summarize_codeforces_cohort)):
+        df = load()
+        df = df.assign(college=df['college'].astype(str), batch=df['batch'].astype(str))
+        filters = [(None, None)] + sorted(set(zip(df['college'], df['batch']))) + [(synthetic.COLLEGES[0], None)]
+        for college, batch in filters:
+            mask = df['college'].notna()
+            if college:
+                mask &= df['college'] == college
+            if batch:
+                mask &= df['batch'] == batch
+            subset = df[mask]
+            expected, stored = summarize(subset), app.load_cohort_summary(platform, college, batch)
+            assert set(stored) == set(expected)
+            for key, value in expected.items():
+                if key == 'buckets':
+                    assert stored[key].values.tolist() == value.values.tolist(), (platform, college, batch)
+                elif key == 'rank_counts':
+                    assert stored[key] == value, (platform, college, batch)
+                else:
+                    assert stored[key] == pytest.approx(value, nan_ok=True), (platform, college, batch, key)
+
+
+def test_cohort_aggregates_follow_deletes_moves_and_renames(app):
+    rows = synthetic.cohort(12)
+    _save(app, rows)
+    app.save_cf_profiles_to_db([(u, synthetic.codeforces_profile(u, count=20), college, batch, name)
+                                for u, college, batch, name in rows])
+    _assert_aggregates_match_frames(app)
+
+    for platform in ('leetcode', 'codeforces'):
+        assert app.bulk_delete_profiles(platform, usernames=[rows[0][0], rows[5][0]]) == 2
+    _assert_aggregates_match_frames(app)
+
+    for platform in ('leetcode', 'codeforces'):
+        assert app.bulk_move_profiles(platform, to_college='Moved', to_batch='2030',
+                                      usernames=[rows[1][0], rows[2][0]]) == 2
+        assert app.bulk_move_profiles(platform, to_batch='2023', college=rows[3][1], batch=rows[3][2]) > 0
+    _assert_aggregates_match_frames(app)
+
+    assert app.rename_cohort_label('college', rows[4][1], 'Moved') > 0
+    assert app.rename_cohort_label('batch', '2024', '2031') > 0
+    _assert_aggregates_match_frames(app)
+
+
+def _bulk_page():
+    import leetcode
+    leetcode.display_bulk_actions('leetcode', leetcode.load_all_profiles(), 'ADYPU, Pune', None, 'lc')
+
+
+def test_bulk_delete_and_rename_need_confirmation(app):
+    rows = synthetic.cohort(8)
+    _save(app, rows)
+    at = AppTest.from_function(_bulk_page).run()
+    at.radio(key='lc_bulk_scope').set_value("Current filter").run()
+    assert at.button(key='lc_bulk_delete').disabled
+
+    at.checkbox(key='lc_bulk_confirm').check().run()
+    assert not at.button(key='lc_bulk_delete').disabled
+    at.button(key='lc_bulk_delete').click().run()
+    assert not at.exception
+    assert sorted(app.load_all_profiles()['username']) == sorted(u for u, c, *_ in rows if c != 'ADYPU, Pune')
+    assert not at.checkbox(key='lc_bulk_confirm').value
+
+    at.selectbox(key='lc_rename_field').set_value('batch').run()
+    at.selectbox(key='lc_rename_old').set_value('2024').run()
+    at.text_input(key='lc_rename_new').input('2024-old').run()
+    assert at.button(key='lc_rename').disabled
+    at.checkbox(key='lc_rename_confirm').check().run()
+    at.button(key='lc_rename').click().run()
+    assert not at.exception
+    assert '2024-old' in set(app.load_all_profiles()['batch'].astype(str))
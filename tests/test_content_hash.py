@@ -0,0 +1,81 @@
+import synthetic
+
+
+def _stored(app, username):
+    conn = app._get_db()
+    row = conn.execute("SELECT fetched_at, total_solved FROM leetcode_profiles WHERE username = ?",
+                       (username,)).fetchone()
+    changes = conn.execute("SELECT COUNT(*) FROM profile_changes WHERE username = ?", (username,)).fetchone()[0]
+    conn.close()
+    return row, changes
+
+
+def _save(app, username, data):
+    app.save_profiles_to_db([(username, data, 'College', '2025', 'Name')])
+
+
+def test_unchanged_payload_is_not_rewritten(app):
+    username = 'student_0001'
+    _save(app, username, synthetic.leetcode_profile(username))
+    before = _stored(app, username)
+
+    _save(app, username, synthetic.leetcode_profile(username))
+    assert _stored(app, username) == before
+
+
+def test_changed_payload_is_rewritten(app):
+    username = 'student_0001'
+    data = synthetic.leetcode_profile(username)
+    _save(app, username, data)
+    (fetched_at, solved), changes = _stored(app, username)
+
+    for entry in data['matchedUser']['submitStats']['acSubmissionNum'][:2]:  # All and Easy
+        entry['count'] += 1
+    _save(app, username, data)
+    (new_fetched_at, new_solved), new_changes = _stored(app, username)
+    assert new_fetched_at > fetched_at
+    assert new_solved == solved + 1
+    assert new_changes > changes
+
+
+def test_forgotten_hash_forces_a_rewrite(app):
+    username = 'student_0001'
+    _save(app, username, synthetic.leetcode_profile(username))
+    (fetched_at, _), _ = _stored(app, username)
+
+    conn = app._get_db()
+    app._forget_checks(conn, 'leetcode_profiles', [username])
+    conn.commit()
+    conn.close()
+    _save(app, username, synthetic.leetcode_profile(username))
+    assert _stored(app, username)[0][0] > fetched_at
+
+
+def _ranks_and_versions(app):
+    conn = app._get_db()
+    rows = conn.execute("""
+        SELECT p.username, p.cohort_rank, p.cohort_percentile, v.seq FROM leetcode_profiles p
+        JOIN profile_versions v ON v.profile_table = 'leetcode_profiles' AND v.username = p.username
+    """).fetchall()
+    conn.close()
+    return {username: (rank, pct, seq) for username, rank, pct, seq in rows}
+
+
+def test_one_changed_profile_leaves_the_rest_of_its_cohort_alone(app):
+    rows = [(u, 'College', '2025', name) for u, _, _, name in synthetic.cohort(30)]
+    app.save_profiles_to_db([(u, synthetic.leetcode_profile(u), c, b, n) for u, c, b, n in rows])
+    before, version = _ranks_and_versions(app), app.load_data_version('leetcode')
+
+    username = rows[0][0]
+    data = synthetic.leetcode_profile(username)
+    for entry in data['matchedUser']['submitStats']['acSubmissionNum'][:2]:
+        entry['count'] += 200
+    app.save_profile_to_db(username, data, *rows[0][1:])
+    after = _ranks_and_versions(app)
+
+    moved = {u for u in after if after[u][:2] != before[u][:2]} | {username}
+    assert len(moved) < len(rows)
+    assert all(after[u][2] == before[u][2] for u in after if u not in moved)
+    assert after[username][2] > before[username][2]
+    # one write for the profile plus one per re-ranked row, not one per cohort member
+    assert app.load_data_version('leetcode') - version <= len(moved) + 1
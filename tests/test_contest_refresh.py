@@ -0,0 +1,82 @@
+import copy
+import json
+
+import synthetic
+
+
+def _contest_users(n):
+    return [u for u in synthetic.usernames(40)
+            if (synthetic.leetcode_contest(u) or {}).get('attendedContestsCount', 0) >= 2][:n]
+
+
+def _save_one_contest_behind(app, username):
+    data = copy.deepcopy(synthetic.leetcode_profile(username))
+    data['userContestRankingHistory'] = data['userContestRankingHistory'][:-1]
+    data['userContestRanking']['attendedContestsCount'] -= 1
+    app.save_profile_to_db(username, data, 'C', '2024')
+
+
+def _history(app, username):
+    conn = app._get_db()
+    rows = conn.execute("SELECT COUNT(*) FROM leetcode_contest_history WHERE username = ?", (username,)).fetchone()[0]
+    raw = json.loads(conn.execute("SELECT raw_json FROM leetcode_profiles WHERE username = ?",
+                                  (username,)).fetchone()[0])
+    due = conn.execute("SELECT next_refresh_at FROM refresh_schedule WHERE platform = 'leetcode' AND username = ?",
+                       (username,)).fetchone()[0]
+    conn.close()
+    return rows, len(raw['userContestRankingHistory']), due
+
+
+def test_contest_refresh_replaces_stale_history(app, mock_api):
+    users = _contest_users(3)
+    for username in users:
+        _save_one_contest_behind(app, username)
+
+    contests = app.fetch_leetcode_contest_batch(users)
+    stale = app.load_stale_contest_histories(contests)
+    assert sorted(stale) == sorted(users)
+    histories = app.fetch_leetcode_contest_batch(stale, history=True)
+    assert app.update_contest_stats_in_db(contests, histories) == len(users)
+
+    for username in users:
+        attended = synthetic.leetcode_contest(username)['attendedContestsCount']
+        rows, raw_rows, due = _history(app, username)
+        assert rows == attended
+        assert raw_rows == len(synthetic.leetcode_profile(username)['userContestRankingHistory'])
+        assert due > 0
+    assert app.load_stale_contest_histories(contests) == []
+
+
+def test_contest_refresh_without_history_marks_profile_due(app, mock_api):
+    username = _contest_users(1)[0]
+    _save_one_contest_behind(app, username)
+
+    app.update_contest_stats_in_db(app.fetch_leetcode_contest_batch([username]))
+    rows, _, due = _history(app, username)
+    assert rows == synthetic.leetcode_contest(username)['attendedContestsCount'] - 1
+    assert due == 0
+
+
+def test_contest_refresh_with_a_failed_history_fetch_marks_profile_due(app, mock_api):
+    username = _contest_users(1)[0]
+    _save_one_contest_behind(app, username)
+
+    app.update_contest_stats_in_db(app.fetch_leetcode_contest_batch([username]), {username: None})
+    rows, _, due = _history(app, username)
+    assert rows == synthetic.leetcode_contest(username)['attendedContestsCount'] - 1
+    assert due == 0
+
+
+def test_contest_refresh_result_survives_the_rerun(app, mock_api, monkeypatch):
+    from streamlit.testing.v1 import AppTest
+
+    users = _contest_users(2)
+    for username in users:
+        _save_one_contest_behind(app, username)
+    monkeypatch.setenv('LEETCODE_GRAPHQL_URL', f"{mock_api}/graphql")
+
+    at = AppTest.from_file(app.__file__, default_timeout=60).run()
+    next(r for r in at.radio if r.label == "Mode").set_value("Batch Dashboard").run()
+    at.button(key='lc_contest_refresh').click().run()
+    assert not at.exception
+    assert f"Updated contest data for {len(users)} profile(s)." in [s.value for s in at.success]
@@ -0,0 +1,98 @@
+import os
+import types
+
+import pytest
+
+import profile_export
+import synthetic
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.parquet as pq  # noqa: E402
+
+
+def _save(app, rows):
+    app.save_profiles_to_db([(u, synthetic.leetcode_profile(u), college, batch, name)
+                             for u, college, batch, name in rows])
+
+
+def _export(app, tmp_path, **kwargs):
+    results = profile_export.export_tables('parquet', names=['leetcode_profiles', 'leetcode_contest_history'],
+                                           directory=str(tmp_path / 'exports'), **kwargs)
+    return {name: pq.read_table(path).to_pylist() if path else [] for name, path, _ in results}
+
+
+def _latest(rows):
+    return {row['username']: row for row in rows}
+
+
+def test_incremental_export_follows_changes_not_fetched_at(app, tmp_path):
+    rows = synthetic.cohort(6)
+    _save(app, rows)
+    full = _export(app, tmp_path)
+    assert len(full['leetcode_profiles']) == 6
+    assert not any(row['deleted'] for row in full['leetcode_profiles'])
+    assert full['leetcode_contest_history']
+
+    # re-saving identical payloads changes nothing
+    _save(app, rows)
+    assert _export(app, tmp_path) == {'leetcode_profiles': [], 'leetcode_contest_history': []}
+
+    # a changed payload
+    data = synthetic.leetcode_profile(rows[3][0])
+    data['matchedUser']['submitStats']['acSubmissionNum'][1]['count'] += 1
+    app.save_profile_to_db(rows[3][0], data, *rows[3][1:])
+    assert rows[3][0] in _latest(_export(app, tmp_path)['leetcode_profiles'])
+
+    # a contest-only refresh leaves fetched_at alone
+    username = rows[0][0]
+    app.update_contest_stats_in_db({username: {'attendedContestsCount': 99, 'rating': 2999.0}})
+    changed = _latest(_export(app, tmp_path)['leetcode_profiles'])
+    assert changed[username]['contest_rating'] == 2999.0
+    assert changed[username]['fetched_at'] == _latest(full['leetcode_profiles'])[username]['fetched_at']
+
+    # moves and renames
+    app.bulk_move_profiles('leetcode', to_batch='2030', usernames=[rows[1][0]])
+    assert _latest(_export(app, tmp_path)['leetcode_profiles'])[rows[1][0]]['batch'] == '2030'
+    app.rename_cohort_label('college', rows[2][1], 'Renamed')
+    renamed = _export(app, tmp_path)['leetcode_profiles']
+    assert {row['college'] for row in renamed} == {'Renamed'}
+    assert rows[2][0] in _latest(renamed)
+
+
+def test_deletes_are_exported_as_tombstones(app, tmp_path):
+    rows = synthetic.cohort(3)
+    _save(app, rows)
+    _export(app, tmp_path)
+
+    app.delete_profile_from_db(rows[0][0])
+    exported = _export(app, tmp_path)
+    tombstones = [row for row in exported['leetcode_profiles'] if row['deleted']]
+    assert [row['username'] for row in tombstones] == [rows[0][0]]
+    assert tombstones[0]['score'] is None
+    assert [row['username'] for row in exported['leetcode_contest_history'] if row['deleted']] == [rows[0][0]]
+
+    # a full export is a snapshot of what exists now
+    snapshot = _export(app, tmp_path, incremental=False)['leetcode_profiles']
+    assert sorted(row['username'] for row in snapshot) == sorted(u for u, *_ in rows[1:])
+
+
+def test_failed_export_leaves_no_partial_file(app, tmp_path, monkeypatch):
+    _save(app, synthetic.cohort(3))
+    app._get_db().close()
+    monkeypatch.setattr(profile_export, 'EXPORT_ROW_GROUP_SIZE', 1)
+    calls = []
+
+    def from_arrays(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > 1:
+            raise OSError("disk full")
+        return pa.RecordBatch.from_arrays(*args, **kwargs)
+
+    flaky = types.SimpleNamespace(**{name: getattr(pa, name) for name in
+                                     ('schema', 'int8', 'int64', 'float64', 'string', 'array', 'ipc')})
+    flaky.RecordBatch = types.SimpleNamespace(from_arrays=from_arrays)
+    conn = profile_export._get_export_db()
+    with pytest.raises(OSError):
+        profile_export._export_one(flaky, conn, 'leetcode_profiles', 'arrow', None, 10**9, str(tmp_path))
+    conn.close()
+    assert os.listdir(tmp_path / 'leetcode_profiles') == []
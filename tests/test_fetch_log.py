@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+from conftest import ROOT
+
+
+def _log_rows(app):
+    conn = app._get_log_db()
+    rows = conn.execute("SELECT platform, username, endpoint, status FROM fetch_log ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+
+def test_fetch_rows_are_written_when_the_fetch_returns(app, mock_api):
+    assert app.fetch_codeforces_data('student000001')['user']
+    assert sorted(endpoint for _, _, endpoint, _ in _log_rows(app)) == ['user.info', 'user.rating', 'user.status']
+    assert not app._FETCH_LOG['rows']
+
+
+def test_only_errors_count_as_failures(app):
+    now = time.time()
+    for status, error in [(200, None), (304, None), (404, None), (None, 'ConnectionError')]:
+        app._log_fetch('codeforces', 'someone', 'user.info', now, 5.0, status, 0, 0, error)
+    app.flush_fetch_log()
+
+    hourly = app.load_failure_rate_by_hour('codeforces', days=1)
+    assert hourly['requests'].sum() == 4
+    assert hourly['failures'].sum() == 2
+    assert app.load_slowest_users('codeforces', days=1)['failures'].tolist() == [2]
+
+
+def test_buffered_rows_are_written_at_exit(tmp_path):
+    db = tmp_path / 'exit.db'
+    script = ("import time, warnings; warnings.filterwarnings('ignore'); import leetcode; "
+              "leetcode._log_fetch('leetcode', 'someone', 'graphql', time.time(), 1.0, 200, 10, 0, None)")
+    subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True, capture_output=True,
+                   env={**os.environ, 'LEETCODE_DB_PATH': str(db)})
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT username, status FROM fetch_log").fetchall() == [('someone', 200)]
+    conn.close()
@@ -0,0 +1,120 @@
+import time
+
+import pytest
+
+import fetch_queue
+import fetch_workers
+import synthetic
+
+ROWS = [(f"user{i}", 'C', '2024', f"User {i}") for i in range(4)]
+
+
+def _states():
+    conn = fetch_queue._get_queue_db()
+    states = dict(conn.execute("SELECT username, state || ':' || attempts FROM fetch_queue").fetchall())
+    conn.close()
+    return states
+
+
+def _expire_leases():
+    conn = fetch_queue._get_queue_db()
+    conn.execute("UPDATE fetch_queue SET lease_expires = 0 WHERE state = 'leased'")
+    conn.close()
+
+
+def test_claims_are_exclusive_until_the_lease_expires(app):
+    fetch_queue.enqueue_fetch_jobs('leetcode', ROWS)
+    first = fetch_queue.claim_fetch_jobs('leetcode', 'w1', 3, 60)
+    second = fetch_queue.claim_fetch_jobs('leetcode', 'w2', 3, 60)
+    assert [job[1] for job in first] == ['user0', 'user1', 'user2']
+    assert [job[1] for job in second] == ['user3']
+    assert fetch_queue.claim_fetch_jobs('leetcode', 'w3', 3, 60) == []
+
+    _expire_leases()
+    reclaimed = fetch_queue.claim_fetch_jobs('leetcode', 'w3', 10, 60)
+    assert sorted((job[1], job[-1]) for job in reclaimed) == [(f"user{i}", 2) for i in range(4)]
+    # the original owner can no longer complete a job it lost
+    fetch_queue.complete_fetch_jobs('w1', [first[0][0]], [])
+    assert _states()['user0'] == 'leased:2'
+
+
+def test_expired_leases_fail_after_max_attempts(app, monkeypatch):
+    monkeypatch.setattr(fetch_queue, 'WORKER_MAX_ATTEMPTS', 2)
+    fetch_queue.enqueue_fetch_jobs('leetcode', ROWS[:1])
+    for _ in range(2):
+        assert fetch_queue.claim_fetch_jobs('leetcode', 'crashing', 1, 60)
+        _expire_leases()
+    assert fetch_queue.claim_fetch_jobs('leetcode', 'next', 1, 60) == []
+    assert _states() == {'user0': 'failed:2'}
+
+
+def test_failed_jobs_return_to_pending_until_max_attempts(app, monkeypatch):
+    monkeypatch.setattr(fetch_queue, 'WORKER_MAX_ATTEMPTS', 2)
+    fetch_queue.enqueue_fetch_jobs('leetcode', ROWS[:1])
+    job_id = fetch_queue.claim_fetch_jobs('leetcode', 'w', 1, 60)[0][0]
+    fetch_queue.complete_fetch_jobs('w', [], [job_id])
+    assert _states() == {'user0': 'pending:1'}
+    fetch_queue.claim_fetch_jobs('leetcode', 'w', 1, 60)
+    fetch_queue.complete_fetch_jobs('w', [], [job_id])
+    assert _states() == {'user0': 'failed:2'}
+
+
+def test_worker_retries_a_batch_whose_save_fails(app, monkeypatch):
+    monkeypatch.setattr(app, 'fetch_leetcode_data', synthetic.leetcode_profile)
+
+    def broken_save(results):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(app, 'save_profiles_to_db', broken_save)
+    fetch_queue.enqueue_fetch_jobs('leetcode', ROWS[:2])
+    assert fetch_workers.run_fetch_worker('leetcode', 'w', batch_size=2, rate=1000) == 2 * fetch_queue.WORKER_MAX_ATTEMPTS
+    assert set(_states().values()) == {f"failed:{fetch_queue.WORKER_MAX_ATTEMPTS}"}
+
+
+def test_worker_saves_fetched_profiles(app, monkeypatch):
+    monkeypatch.setattr(app, 'fetch_leetcode_data', synthetic.leetcode_profile)
+    fetch_queue.enqueue_fetch_jobs('leetcode', ROWS)
+    assert fetch_workers.run_fetch_worker('leetcode', 'w', batch_size=3, rate=1000) == len(ROWS)
+    assert set(_states().values()) == {'done:1'}
+    assert sorted(app.load_all_profiles()['username']) == [row[0] for row in ROWS]
+
+
+@pytest.mark.parametrize('platform', ['leetcode', 'codeforces'])
+def test_queue_status_counts_states(app, platform):
+    fetch_queue.enqueue_fetch_jobs(platform, ROWS)
+    fetch_queue.claim_fetch_jobs(platform, 'w', 1, 60)
+    assert fetch_queue.load_queue_status(platform) == {'leased': 1, 'pending': 3}
+
+
+def test_worker_renews_its_lease_while_throttled(app, monkeypatch):
+    stolen = []
+
+    def slow_fetch(username):
+        time.sleep(0.7)
+        stolen.extend(fetch_queue.claim_fetch_jobs('leetcode', 'w2', 10, 60))
+        return synthetic.leetcode_profile(username)
+
+    monkeypatch.setattr(app, 'fetch_leetcode_data', slow_fetch)
+    fetch_queue.enqueue_fetch_jobs('leetcode', ROWS[:3])
+    # 3 jobs x 0.7s outlast a 1s lease unless it is renewed after each job
+    assert fetch_workers.run_fetch_worker('leetcode', 'w1', batch_size=3, lease_seconds=1, rate=1000) == 3
+    assert stolen == []
+    assert set(_states().values()) == {'done:1'}
+
+
+def test_worker_skips_jobs_reclaimed_mid_batch(app, monkeypatch):
+    fetched = []
+
+    def fetch(username):
+        fetched.append(username)
+        _expire_leases()
+        fetch_queue.claim_fetch_jobs('leetcode', 'w2', 10, 60)
+        return synthetic.leetcode_profile(username)
+
+    monkeypatch.setattr(app, 'fetch_leetcode_data', fetch)
+    fetch_queue.enqueue_fetch_jobs('leetcode', ROWS[:2])
+    assert fetch_workers.run_fetch_worker('leetcode', 'w1', batch_size=2, rate=1000) == 0
+    # w1 neither saved the job it lost nor fetched the one w2 now holds
+    assert fetched == ['user0']
+    assert app.load_all_profiles().empty
+    assert _states() == {'user0': 'leased:2', 'user1': 'leased:2'}
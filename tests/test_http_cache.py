@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import http_cache
+
+
+def test_recorded_responses_replay_without_the_network(app, mock_api, tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, 'HTTP_CACHE_DIR', str(tmp_path / 'http_cache'))
+    url, params = f"{mock_api}/api/user.info", {'handles': 'student_0001'}
+
+    monkeypatch.setattr(http_cache, 'HTTP_CACHE_MODE', 'record')
+    status, recorded = app._http_json('codeforces', url, params=params)
+    assert status == 200 and recorded['status'] == 'OK'
+
+    monkeypatch.setattr(http_cache, 'HTTP_CACHE_MODE', 'replay')
+    monkeypatch.setattr(app.requests, 'get', None)  # any network call would raise
+    assert app._http_json('codeforces', url, params=params) == (200, recorded)
+    assert app._http_json('codeforces', url, params={'handles': 'student_0002'}) == (None, None)
+
+    http_cache.clear()
+    assert app._http_json('codeforces', url, params=params) == (None, None)
+
+
+def test_concurrent_puts_of_one_response_leave_a_whole_entry(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, 'HTTP_CACHE_DIR', str(tmp_path / 'http_cache'))
+    key = http_cache.response_key('user.info', {'handles': 'x'})
+    body = {'result': list(range(5000))}
+
+    with ThreadPoolExecutor(16) as pool:
+        list(pool.map(lambda _: http_cache.put(key, 'user.info', {'handles': 'x'}, body), range(48)))
+
+    assert http_cache.get(key, None) == body
+    assert [p.name for p in (tmp_path / 'http_cache' / key[:2]).iterdir()] == [f"{key}.json"]
@@ -0,0 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+
+def test_concurrent_metrics_writes_publish_whole_files(tmp_path):
+    path = str(tmp_path / 'metrics.prom')
+    for stage in range(50):
+        metrics.record_timing(f"test.stage{stage}", 0.001)
+
+    with ThreadPoolExecutor(16) as pool:
+        list(pool.map(lambda _: metrics.write_metrics_file(path), range(48)))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['metrics.prom']
+    with open(path) as f:
+        text = f.read()
+    assert text.endswith("\n") and 'stage="test.stage49"' in text
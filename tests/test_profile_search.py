@@ -0,0 +1,43 @@
+import sqlite3
+
+import synthetic
+
+
+def test_search_survives_rowids_renumbered_before_the_id_migration(app):
+    # a database from before profiles had an id: rowids implicit, search rows keyed on them
+    conn = sqlite3.connect(app.db.DB_PATH)
+    conn.execute("""
+        CREATE TABLE leetcode_profiles (
+            username TEXT PRIMARY KEY, college TEXT DEFAULT '', batch TEXT DEFAULT '', easy INTEGER DEFAULT 0,
+            medium INTEGER DEFAULT 0, hard INTEGER DEFAULT 0, total_solved INTEGER DEFAULT 0,
+            contest_rating REAL DEFAULT 0, contests_attended INTEGER DEFAULT 0, global_ranking INTEGER DEFAULT 0,
+            score REAL DEFAULT 0, raw_json TEXT, fetched_at TEXT, student_name TEXT DEFAULT ''
+        )
+    """)
+    conn.executemany("INSERT INTO leetcode_profiles (username, college, batch, score, student_name) "
+                     "VALUES (?, 'College', '2025', ?, ?)",
+                     [('alice_lc', 10, 'Alice'), ('bob_lc', 20, 'Bob'), ('carol_lc', 30, 'Carol')])
+    conn.execute("CREATE VIRTUAL TABLE profile_search USING fts5("
+                 "platform UNINDEXED, username, student_name, college, prefix = '2 3')")
+    # as a VACUUM that renumbered rowids would leave it: every search row points at another profile
+    conn.executemany("INSERT INTO profile_search (rowid, platform, username, student_name, college) "
+                     "VALUES (?, 'leetcode', ?, ?, 'College')",
+                     [(4, 'alice_lc', 'Alice'), (6, 'bob_lc', 'Bob'), (2, 'carol_lc', 'Carol')])
+    conn.commit()
+    conn.close()
+
+    conn = app._get_db()
+    columns = {row[1]: row[5] for row in conn.execute("PRAGMA table_info(leetcode_profiles)")}
+    ids = dict(conn.execute("SELECT username, id FROM leetcode_profiles"))
+    conn.close()
+    assert columns['id'] == 1
+    assert ids == {'alice_lc': 1, 'bob_lc': 2, 'carol_lc': 3}
+
+    found = app.search_profiles('bob')
+    assert found[['username', 'score']].values.tolist() == [['bob_lc', 20.0]]
+
+    app.save_profiles_to_db([('dave_lc', synthetic.leetcode_profile('dave_lc'), 'College', '2025', 'Dave')])
+    app.bulk_delete_profiles('leetcode', usernames=['alice_lc'])
+    assert app.search_profiles('alice').empty
+    assert app.search_profiles('dave')['username'].tolist() == ['dave_lc']
+    assert sorted(app.search_profiles('college')['username']) == ['bob_lc', 'carol_lc', 'dave_lc']
@@ -0,0 +1,61 @@
+import time
+
+import synthetic
+
+
+def _profile(username, last_active):
+    """Codeforces payload whose only activity is one submission at `last_active` (None: no activity)."""
+    data = synthetic.codeforces_profile(username, count=1)
+    data['ratingHistory'] = []
+    data['submissions'] = [dict(data['submissions'][0], creationTimeSeconds=last_active)] if last_active else []
+    return data
+
+
+def _schedule(app):
+    conn = app._get_cf_db()
+    rows = conn.execute("SELECT username, interval_s, next_refresh_at - ? FROM refresh_schedule "
+                        "WHERE platform = 'codeforces'", (time.time(),)).fetchall()
+    conn.close()
+    return {username: (interval, wait) for username, interval, wait in rows}
+
+
+def test_refresh_interval_is_hourly_while_active_and_doubles_to_a_week_while_idle(app):
+    now = time.time()
+    activity = {'active': now - 600, 'idle': now - 30 * 86400, 'quiet': None}
+    intervals = {username: [] for username in activity}
+    for _ in range(9):
+        app.save_cf_profiles_to_db([(u, _profile(u, t), 'College', '2025', u) for u, t in activity.items()])
+        for username, (interval, wait) in _schedule(app).items():
+            intervals[username].append(interval)
+            assert interval - 60 < wait <= interval
+
+    hour, week = app.REFRESH_MIN_INTERVAL, app.REFRESH_MAX_INTERVAL
+    assert (hour, week) == (3600, 7 * 86400)
+    assert intervals['active'] == [hour] * 9
+    doubling = [hour * 2, hour * 4, hour * 8, hour * 16, hour * 32, hour * 64, hour * 128, week, week]
+    assert intervals['idle'] == intervals['quiet'] == doubling
+
+    # activity again drops an idle profile straight back to hourly
+    app.save_cf_profile_to_db('idle', _profile('idle', time.time()), 'College', '2025', 'idle')
+    assert _schedule(app)['idle'][0] == hour
+
+
+def test_due_refreshes_come_most_overdue_first(app):
+    now = time.time()
+    users = ['early', 'late', 'later', 'future']
+    app.save_cf_profiles_to_db([(u, _profile(u, now), 'College', '2025', u) for u in users])
+    assert app.load_due_refreshes('codeforces') == []
+
+    conn = app._get_cf_db()
+    conn.executemany("UPDATE refresh_schedule SET next_refresh_at = ? WHERE platform = 'codeforces' AND username = ?",
+                     [(now - 60, 'early'), (now - 7200, 'late'), (now - 86400, 'later')])
+    conn.commit()
+    conn.close()
+
+    due = app.load_due_refreshes('codeforces')
+    assert [row[0] for row in due] == ['later', 'late', 'early']
+    assert due[0] == ('later', 'College', '2025', 'later')
+    assert [row[0] for row in app.load_due_refreshes('codeforces', limit=2)] == ['later', 'late']
+    summary = app.load_refresh_schedule_summary('codeforces')
+    assert summary['due'] == 3
+    assert summary['intervals'] == [(app.REFRESH_MIN_INTERVAL, 4)]
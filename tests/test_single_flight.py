@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import metrics
+
+
+def _counter(name, platform='leetcode'):
+    counters = metrics.metrics_snapshot()[1]
+    return int(counters[(counters['Counter'] == name) & (counters['Platform'] == platform)]['Value'].sum())
+
+
+def _when_coalesced(n, timeout=10):
+    """Block until `n` callers are waiting on an in-flight fetch."""
+    deadline = time.monotonic() + timeout
+    while _counter('coalesced') < n:
+        assert time.monotonic() < deadline, "callers never coalesced"
+        time.sleep(0.01)
+
+
+def test_concurrent_fetches_of_one_user_make_one_upstream_request(app, mock_api, monkeypatch):
+    metrics.reset_metrics()
+    assert app.fetch_leetcode_data('warmup') is not None
+    per_fetch = _counter('requests')
+
+    callers = 8
+    http_json = app._http_json
+
+    def leader_waits_for_the_others(*args, **kwargs):
+        _when_coalesced(callers - 1)
+        return http_json(*args, **kwargs)
+
+    monkeypatch.setattr(app, '_http_json', leader_waits_for_the_others)
+    metrics.reset_metrics()
+    with ThreadPoolExecutor(callers) as pool:
+        results = list(pool.map(app.fetch_leetcode_data, ['alice', 'Alice', ' alice'] + ['alice'] * (callers - 3)))
+
+    assert _counter('requests') == per_fetch
+    assert _counter('coalesced') == callers - 1
+    assert results[0] is not None and all(result is results[0] for result in results)
+    assert not app._INFLIGHT['calls']
+
+
+def test_waiters_get_the_leaders_error(app):
+    metrics.reset_metrics()
+    callers = 4
+    calls = []
+
+    @app._single_flight('leetcode')
+    def fetch(username):
+        calls.append(username)
+        _when_coalesced(callers - 1)
+        raise RuntimeError(f"upstream down for {username}")
+
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(fetch, 'bob') for _ in range(callers)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="upstream down for bob"):
+                future.result(timeout=10)
+
+    assert calls == ['bob']
+    assert not app._INFLIGHT['calls']
+    # the failed fetch is not remembered: the next call tries again
+    with pytest.raises(RuntimeError):
+        fetch('bob')
+    assert calls == ['bob', 'bob']
@@ -0,0 +1,105 @@
+import json
+import types
+
+import pytest
+
+import synthetic
+
+BODY = json.dumps({'status': 'OK', 'result': [
+    {'id': 1, 'verdict': 'OK', 'problem': {'contestId': 12, 'index': 'A', 'name': 'Thé "]" problem'}},
+    {'id': 22, 'verdict': 'WRONG_ANSWER', 'problem': {'contestId': 3456, 'index': 'B1', 'rating': 1900}},
+    123456789, -0.25e3, "tail ✓", None,
+]}, ensure_ascii=False).encode()
+
+
+class FakeResponse:
+    def __init__(self, body, chunk_size, status_code=200):
+        self.body, self.chunk_size, self.status_code = body, chunk_size, status_code
+        self.encoding = 'utf-8'
+        self.raw = types.SimpleNamespace()
+
+    @property
+    def content(self):
+        return self.body
+
+    def iter_content(self, chunk_size):
+        return (self.body[i:i + self.chunk_size] for i in range(0, len(self.body), self.chunk_size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _parse(app, body, chunk_size, keep=lambda item: item):
+    return app._stream_json_array('result', keep)(FakeResponse(body, chunk_size))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64 * 1024])
+def test_matches_a_full_parse_at_any_chunk_boundary(app, chunk_size):
+    body, size = _parse(app, BODY, chunk_size)
+    assert body == json.loads(BODY)
+    assert size == len(BODY)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 64 * 1024])
+def test_every_truncated_body_is_rejected(app, chunk_size):
+    for cut in range(len(BODY)):
+        with pytest.raises(ValueError):
+            _parse(app, BODY[:cut], chunk_size)
+
+
+@pytest.mark.parametrize('body', [b'{"result": [1 2]}', b'{"result": [{"a": 1} x]}', b'{"result": [1.5e3e]}'])
+def test_malformed_arrays_are_rejected(app, body):
+    for chunk_size in (1, 3, 1024):
+        with pytest.raises(ValueError):
+            _parse(app, body, chunk_size)
+
+
+def test_fields_after_the_array_are_kept(app):
+    body = b'{"result": [{"a": 1}, {"a": 2}], "status": "OK", "meta": {"n": [1, 2]}}'
+    for chunk_size in (1, 4, 1024):
+        assert _parse(app, body, chunk_size)[0] == json.loads(body)
+    with pytest.raises(ValueError):
+        _parse(app, body[:-1], 4)
+
+
+def test_error_reply_without_the_array_is_parsed_whole(app):
+    body = b'{"status": "FAILED", "comment": "handle: User not found"}'
+    assert _parse(app, body, 3)[0] == json.loads(body)
+
+
+def test_keep_trims_each_item(app):
+    subs = synthetic.codeforces_submissions('student000001', 50)
+    body = json.dumps({'status': 'OK', 'result': subs}).encode()
+    parsed, _ = _parse(app, body, 1000, app._trim_cf_submission)
+    assert parsed['result'] == [app._trim_cf_submission(sub) for sub in subs]
+    assert 'programmingLanguage' not in parsed['result'][0]
+
+
+def test_streamed_user_status_matches_the_mock_api(app, mock_api):
+    status, body = app._http_json('codeforces', f"{mock_api}/api/user.status",
+                                  params={'handle': 'student000004', 'from': 1, 'count': 3000},
+                                  parse=app._stream_json_array('result', app._trim_cf_submission))
+    assert status == 200
+    assert body['result'] == [app._trim_cf_submission(sub)
+                              for sub in synthetic.codeforces_submissions('student000004', 3000)]
+
+
+def test_truncated_submissions_do_not_overwrite_the_stored_profile(app, mock_api, monkeypatch):
+    username = 'student000004'
+    app.save_cf_profile_to_db(username, synthetic.codeforces_profile(username), 'C', '2024')
+    solved = app.load_all_cf_profiles()['problems_solved'].tolist()
+    real_get = app.requests.get
+
+    def truncating_get(url, **kwargs):
+        if url.endswith('/user.status'):
+            body = json.dumps({'status': 'OK', 'result': synthetic.codeforces_submissions(username)}).encode()
+            return FakeResponse(body[:len(body) // 2], 4096)
+        return real_get(url, **kwargs)
+
+    monkeypatch.setattr(app.requests, 'get', truncating_get)
+    data = app.fetch_codeforces_data(username)
+    assert data is None
+    assert app.load_all_cf_profiles()['problems_solved'].tolist() == solved